@@ -11,6 +11,8 @@ import sys
 import requests
 
 from api_client import authenticate, get_balances
+from money import DEFAULT_SCALE, format_amount
+from reference_data import amount_scales, payment_currencies
 
 
 def main() -> None:
@@ -22,6 +24,10 @@ def main() -> None:
     except requests.HTTPError as exc:
         print(f"Failed to retrieve balances: {exc}", file=sys.stderr)
         sys.exit(1)
+    try:
+        scales = amount_scales(payment_currencies(token))
+    except (requests.RequestException, ValueError):
+        scales = {}  # amounts still print, at the default scale
 
     print("\n--- Current Wallet Balances ---")
     print(f"{'Currency':<12}{'Available':>14}{'Reserved':>14}{'Total':>14}")
@@ -29,10 +35,11 @@ def main() -> None:
 
     for bal in balances:
         currency = bal.get("currencyCode", "N/A")
-        available = bal.get("balanceAvailable", 0)
-        reserved = bal.get("activeHoldsTotal", 0)
-        total = bal.get("balance", 0)
-        print(f"{currency:<12}{available:>14,.2f}{reserved:>14,.2f}{total:>14,.2f}")
+        scale = scales.get(currency, DEFAULT_SCALE)
+        available = format_amount(bal.get("balanceAvailable"), scale)
+        reserved = format_amount(bal.get("activeHoldsTotal"), scale)
+        total = format_amount(bal.get("balance"), scale)
+        print(f"{currency:<12}{available:>14}{reserved:>14}{total:>14}")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,9 @@
 """Fetch and display account statements with interactive account and date selection.
 
+Statements are served from the local statement store (``statement_store.py``),
+which only fetches the days not synced yet. Set ``WALLET_STATEMENT_DB=""`` to
+always fetch the full range from the API instead.
+
 Usage:
     export WALLET_USERNAME="your_user"
     export WALLET_PASSWORD="your_pass"
@@ -11,7 +15,9 @@ from datetime import datetime, timedelta
 
 import requests
 
-from api_client import BASE_URL, auth_headers, authenticate, get_balances
+from api_client import BASE_URL, REQUEST_TIMEOUT, api_request, authenticate, get_balances
+from models import StatementResponse
+from money import DEFAULT_SCALE, format_amount, from_minor, to_minor
 
 
 def select_account(balances: list[dict]) -> dict:
@@ -20,8 +26,8 @@ def select_account(balances: list[dict]) -> dict:
     for idx, bal in enumerate(balances, start=1):
         currency = bal.get("currencyCode", "N/A")
         account_number = bal.get("accountNumber", "N/A")
-        available = bal.get("balanceAvailable", 0)
-        print(f"  {idx}. {currency:<8} (Account: {account_number}) - Balance: {available:,.2f}")
+        available = format_amount(bal.get("balanceAvailable"))
+        print(f"  {idx}. {currency:<8} (Account: {account_number}) - Balance: {available}")
 
     print("\n=== SELECT ACCOUNT ===")
     raw = input(f"Enter account number (1-{len(balances)}): ")
@@ -38,6 +44,15 @@ def select_account(balances: list[dict]) -> dict:
     return selected
 
 
+def find_account(balances: list[dict], key: str) -> dict | None:
+    """Return the account whose currency code, account number or account ID is ``key``."""
+    wanted = key.strip().upper()
+    for bal in balances:
+        if wanted in (str(bal.get("currencyCode", "")).upper(), str(bal.get("accountNumber", "")).upper(), str(bal.get("accountId", "")).upper()):
+            return bal
+    return None
+
+
 def select_date_range() -> tuple[datetime, datetime]:
     """Prompt the user for a date range and return (start, end) datetimes."""
     print("\n=== SELECT DATE RANGE ===")
@@ -79,13 +94,50 @@ def select_date_range() -> tuple[datetime, datetime]:
     return start_date, end_date
 
 
-def display_statement(data: dict, start_date: datetime, end_date: datetime) -> None:
+def fetch_statement(
+    token: str,
+    account_id: str,
+    start_date: datetime,
+    end_date: datetime,
+    timeout: float = REQUEST_TIMEOUT,
+) -> StatementResponse:
+    """Fetch the statement for one account and date range (dates are inclusive).
+
+    Entries are decoded into compact models on first access; the result reads
+    like the response dict (``data.get("entries")``).
+    """
+    params = {
+        "accountId": account_id,
+        "strStartDate": start_date.strftime("%Y-%m-%d"),
+        "strEndDate": end_date.strftime("%Y-%m-%d"),
+    }
+    response = api_request("GET", "/CustomerAccountStatement", token, params=params, timeout=timeout)
+    return StatementResponse.from_response(response)
+
+
+def load_statement(token: str, account: dict, start_date: datetime, end_date: datetime) -> StatementResponse:
+    """Return the statement for a range, syncing it into the local store when enabled."""
+    from statement_store import StatementStore, configured_db_path
+
+    db_path = configured_db_path()
+    if db_path is None:
+        return fetch_statement(token, account.get("accountId"), start_date, end_date)
+
+    with StatementStore(db_path) as store:
+        fetched = store.sync(token, account, start_date, end_date)
+        print(f"  Synced {fetched} entries from the API; reading from {db_path}")
+        return store.query(account.get("accountId"), start_date, end_date)
+
+
+def display_statement(data: StatementResponse, start_date: datetime, end_date: datetime) -> None:
     """Pretty-print the account statement response."""
     print("\n" + "=" * 60)
     print("              ACCOUNT STATEMENT")
     print("=" * 60)
 
-    account_info = data.get("accountInfo", {})
+    account_info = data.accountInfo or {}
+    scale = account_info.get("accountCurrencyScale")
+    scale = DEFAULT_SCALE if scale is None else scale
     if account_info:
         currency = account_info.get("accountCurrencyCode", "")
         print("\nAccount Details:")
@@ -94,10 +146,10 @@ def display_statement(data: dict, start_date: datetime, end_date: datetime) -> N
         print(f"  Account Name:     {account_info.get('accountName')}")
         print(f"  Currency:         {currency}")
         print(f"  Currency Scale:   {account_info.get('accountCurrencyScale')}")
-        print(f"\n  Beginning Balance: {account_info.get('beginningBalance', 0):,.2f} {currency}")
-        print(f"  Ending Balance:    {account_info.get('endingBalance', 0):,.2f} {currency}")
+        print(f"\n  Beginning Balance: {format_amount(account_info.get('beginningBalance'), scale)} {currency}")
+        print(f"  Ending Balance:    {format_amount(account_info.get('endingBalance'), scale)} {currency}")
 
-    entries = data.get("entries", [])
+    entries = data.entries
     if not entries:
         print("\n  No transactions found for this period.")
         return
@@ -109,39 +161,52 @@ def display_statement(data: dict, start_date: datetime, end_date: datetime) -> N
     print(header)
     print("-" * len(header))
 
-    total_debit = 0.0
-    total_credit = 0.0
+    # Totals are accumulated exactly in integer minor units.
+    total_debit = 0
+    total_credit = 0
 
     for entry in entries:
-        txn_time = entry.get("transactionTime")
-        if txn_time:
-            try:
-                dt = datetime.fromisoformat(txn_time)
-                date_str = dt.strftime("%Y-%m-%d %H:%M")
-            except (ValueError, TypeError):
-                date_str = "N/A"
-        else:
-            date_str = "N/A"
-
-        txn_type = entry.get("transactionType", "")
-        description = entry.get("description", "")
-        debit = entry.get("debitAmount", 0) or 0
-        credit = entry.get("creditAmount", 0) or 0
-        balance = entry.get("runningBalance", 0)
+        # "2026-02-28T10:30:00.0000000" -> "2026-02-28 10:30" without a per-row datetime parse
+        txn_time = entry.transactionTime or ""
+        date_str = f"{txn_time[:10]} {txn_time[11:16]}" if len(txn_time) >= 16 and txn_time[10] == "T" else "N/A"
+
+        txn_type = entry.transactionType or ""
+        description = entry.description or ""
+        debit = to_minor(entry.debitAmount, scale)
+        credit = to_minor(entry.creditAmount, scale)
 
         total_debit += debit
         total_credit += credit
 
-        debit_str = f"{debit:,.2f}" if debit > 0 else ""
-        credit_str = f"{credit:,.2f}" if credit > 0 else ""
+        debit_str = format_amount(from_minor(debit, scale), scale) if debit > 0 else ""
+        credit_str = format_amount(from_minor(credit, scale), scale) if credit > 0 else ""
+        balance_str = format_amount(entry.runningBalance, scale)
 
-        print(f"{date_str:<18}{txn_type:<16}{description:<30}{debit_str:>12}{credit_str:>12}{balance:>12,.2f}")
+        print(f"{date_str:<18}{txn_type:<16}{description:<30}{debit_str:>12}{credit_str:>12}{balance_str:>12}")
 
     currency = account_info.get("accountCurrencyCode", "")
     print("\nSummary:")
-    print(f"  Total Debits:  {total_debit:,.2f} {currency}")
-    print(f"  Total Credits: {total_credit:,.2f} {currency}")
-    print(f"  Net Change:    {total_credit - total_debit:,.2f} {currency}")
+    print(f"  Total Debits:  {format_amount(from_minor(total_debit, scale), scale)} {currency}")
+    print(f"  Total Credits: {format_amount(from_minor(total_credit, scale), scale)} {currency}")
+    print(f"  Net Change:    {format_amount(from_minor(total_credit - total_debit, scale), scale)} {currency}")
+
+
+def show_statement(token: str, account: dict, start_date: datetime, end_date: datetime) -> None:
+    """Load and display the statement of ``account`` for a date range."""
+    currency = account.get("currencyCode")
+    print("\n=== FETCHING ACCOUNT STATEMENT ===")
+    print(f"  Currency: {currency}")
+    print(f"  Period: {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d}\n")
+
+    try:
+        statement_data = load_statement(token, account, start_date, end_date)
+    except requests.HTTPError as exc:
+        print(f"Failed to retrieve statement: {exc}", file=sys.stderr)
+        print(f"\nAPI URL attempted: {BASE_URL}/CustomerAccountStatement", file=sys.stderr)
+        sys.exit(1)
+
+    display_statement(statement_data, start_date, end_date)
+    print("\nStatement retrieved successfully.")
 
 
 def main() -> None:
@@ -158,30 +223,7 @@ def main() -> None:
     selected_account = select_account(balances)
     start_date, end_date = select_date_range()
 
-    account_id = selected_account.get("accountId")
-    currency = selected_account.get("currencyCode")
-    print("\n=== FETCHING ACCOUNT STATEMENT ===")
-    print(f"  Currency: {currency}")
-    print(f"  Period: {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d}\n")
-
-    url = f"{BASE_URL}/CustomerAccountStatement"
-    params = {
-        "accountId": account_id,
-        "strStartDate": start_date.strftime("%Y-%m-%d"),
-        "strEndDate": end_date.strftime("%Y-%m-%d"),
-    }
-
-    try:
-        response = requests.get(url, params=params, headers=auth_headers(token), timeout=30)
-        response.raise_for_status()
-        statement_data = response.json()
-    except requests.HTTPError as exc:
-        print(f"Failed to retrieve statement: {exc}", file=sys.stderr)
-        print(f"\nAPI URL attempted: {url}", file=sys.stderr)
-        sys.exit(1)
-
-    display_statement(statement_data, start_date, end_date)
-    print("\nStatement retrieved successfully.")
+    show_statement(token, selected_account, start_date, end_date)
     print("\n=== COMPLETE ===")
 
 
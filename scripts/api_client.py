@@ -2,14 +2,30 @@
 
 Handles configuration, authentication, and common HTTP interactions
 so individual scripts stay focused on their specific tasks.
+
+All HTTP traffic goes through a single pooled ``requests.Session`` so
+connections (and their TLS handshakes) are reused across calls. Tokens are
+owned by a ``TokenManager`` that persists them in the on-disk token cache,
+refreshes them shortly before expiry, and collapses concurrent 401s into a
+single refresh. Every call can be traced through the hooks in
+``instrumentation.py`` and is paced by its endpoint family's limiter in
+``rate_limit.py``.
 """
 
 import os
 import sys
+import threading
+import time
 from pathlib import Path
 
 import requests
 from dotenv import load_dotenv
+from urllib3.util.retry import Retry
+
+from instrumentation import InstrumentedAdapter, begin_request, finish_request, install_from_env
+from models import response_json
+from rate_limit import OVERLOAD_STATUSES, get_limiter
+from token_cache import TokenCache
 
 # Load .env from the same directory as this module
 load_dotenv(Path(__file__).resolve().parent / ".env")
@@ -17,6 +33,329 @@ load_dotenv(Path(__file__).resolve().parent / ".env")
 BASE_URL = os.environ.get("WALLET_API_URL", "https://www.bizcurrency.com:20500/api/v1")
 CALLER_ID = os.environ.get("WALLET_CALLER_ID", "12FDEC27-6E1F-4EC5-BF15-1C7E75A99117")
 
+# Connection pool / retry tuning
+POOL_SIZE = int(os.environ.get("WALLET_POOL_SIZE", "10"))
+MAX_RETRIES = int(os.environ.get("WALLET_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.environ.get("WALLET_BACKOFF_FACTOR", "0.5"))
+REQUEST_TIMEOUT = float(os.environ.get("WALLET_TIMEOUT", "30"))
+
+# Refresh the access token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = int(os.environ.get("WALLET_TOKEN_REFRESH_MARGIN", "120"))
+
+# Statuses worth retrying. Only idempotent methods are retried on these;
+# POST/PATCH are retried solely on connection errors (request never sent).
+RETRY_STATUSES = (429, 502, 503, 504)
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+# Access tokens mapped back to the TokenManager that issued them (its first and current ones)
+_token_owners: dict[str, "TokenManager"] = {}
+_default_manager: "TokenManager | None" = None
+_manager_lock = threading.Lock()
+
+# Exporters requested via WALLET_METRICS_FILE / WALLET_TRACE_FILE
+install_from_env()
+
+
+class AuthenticationError(requests.RequestException):
+    """A login the API answered without an access token."""
+
+
+def build_session(
+    pool_size: int = POOL_SIZE,
+    max_retries: int = MAX_RETRIES,
+    backoff_factor: float = BACKOFF_FACTOR,
+) -> requests.Session:
+    """Create a keep-alive session with a sized connection pool and retry policy."""
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = InstrumentedAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive", "Content-Type": "application/json"})
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide shared session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def configure_session(**kwargs) -> requests.Session:
+    """Replace the shared session with one built from ``build_session(**kwargs)``.
+
+    Batch scripts call this to size the pool to their worker count so no
+    worker has to open (and handshake) a connection outside the pool.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = build_session(**kwargs)
+    return _session
+
+
+def close_session() -> None:
+    """Close the shared session and release its pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def api_request(method: str, path: str, token: str | None = None, **kwargs) -> requests.Response:
+    """Send a request to ``BASE_URL + path`` over the shared session.
+
+    Adds the bearer header when a token is given, applies the default timeout,
+    and raises ``requests.HTTPError`` for 4xx/5xx responses. Tokens issued by a
+    ``TokenManager`` are swapped for its current token before sending, and a
+    401 triggers one refresh-and-retry.
+    """
+    headers = kwargs.pop("headers", None) or {}
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+    record = begin_request(method, path)
+    response = None
+    sends = 0
+
+    try:
+        manager = _token_owners.get(token) if token else None
+        if manager is not None:
+            token = manager.get_token()
+            if record is not None and record["children"]:
+                record["authRefresh"] = "expiring"
+        if token:
+            headers.update(auth_headers(token))
+
+        url = f"{BASE_URL}{path}"
+        sends += 1
+        response = _send(method, url, path, record, headers=headers, **kwargs)
+        if response.status_code == 401 and manager is not None:
+            if record is not None:
+                record["authRefresh"] = "unauthorized"
+            headers.update(auth_headers(manager.handle_unauthorized(token)))
+            if hasattr(kwargs.get("data"), "seek"):
+                kwargs["data"].seek(0)  # A streamed body was consumed by the first send.
+            sends += 1
+            response = _send(method, url, path, record, headers=headers, **kwargs)
+
+        response.raise_for_status()
+    except Exception as exc:
+        if record is not None:
+            record["retries"] = max(0, record["attempts"] - sends)
+            finish_request(record, response, exc)
+        raise
+
+    if record is not None:
+        record["retries"] = max(0, record["attempts"] - sends)
+        finish_request(record, response)
+    return response
+
+
+def _send(method: str, url: str, path: str, record: dict | None, **kwargs) -> requests.Response:
+    """Send one request through the session, holding a slot of the path's rate limiter."""
+    limiter = get_limiter(path)
+    if limiter is None:
+        return get_session().request(method, url, **kwargs)
+
+    with limiter.slot() as outcome:
+        if record is not None:
+            record["queueMs"] += outcome["queued"] * 1000
+        response = get_session().request(method, url, **kwargs)
+        outcome["status"] = response.status_code
+        outcome["retry_after"] = _retry_after(response)
+        # urllib3 may already have retried a 429/503 before handing us the final response.
+        retries = getattr(response.raw, "retries", None)
+        outcome["throttled"] = any(entry.status in OVERLOAD_STATUSES for entry in getattr(retries, "history", ()))
+    return response
+
+
+def _retry_after(response: requests.Response) -> float | None:
+    """Seconds from a numeric ``Retry-After`` header, if any."""
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+class TokenManager:
+    """Access/refresh token lifecycle for one login, backed by the on-disk cache.
+
+    ``get_token`` returns a token that is valid for at least the refresh
+    margin, refreshing (or logging in again) as needed. ``handle_unauthorized``
+    refreshes only if nobody else has replaced the rejected token yet, so a
+    burst of 401s from many threads or processes costs a single refresh.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        cache: TokenCache | None = None,
+        refresh_margin: int = TOKEN_REFRESH_MARGIN,
+    ) -> None:
+        self.username = username
+        self._password = password
+        self._cache = cache if cache is not None else TokenCache()
+        self._key = f"{BASE_URL}|{username}"
+        self._refresh_margin = refresh_margin
+        self._entry: dict | None = None
+        self._handle: str | None = None  # first token handed out; callers may hold it for a whole run
+        self._lock = threading.RLock()
+
+    @property
+    def customer_id(self) -> str | None:
+        """The organizationId (customerId) of the logged-in user."""
+        if self._entry is None:
+            self.get_token()
+        return self._entry.get("customerId")
+
+    def current_token(self) -> str | None:
+        """The access token if it is not about to expire, else None. Never blocks on a lock or the network."""
+        entry = self._entry
+        if entry is not None and not self._expiring(entry):
+            return entry["accessToken"]
+        return None
+
+    def get_token(self) -> str:
+        """Return a fresh access token, renewing it if it is about to expire."""
+        token = self.current_token()
+        if token is not None:
+            return token
+
+        with self._lock:
+            if self._entry is None or self._expiring(self._entry):
+                self._renew()
+            return self._entry["accessToken"]
+
+    def handle_unauthorized(self, rejected_token: str) -> str:
+        """Replace a token the server rejected with 401 and return its successor."""
+        with self._lock:
+            current = self._entry
+            if current is not None and current["accessToken"] != rejected_token and not self._expiring(current):
+                return current["accessToken"]
+            self._renew(rejected_token)
+            return self._entry["accessToken"]
+
+    def login(self) -> dict:
+        """Force a full login, store the new tokens, and return the raw response."""
+        with self._lock, self._cache.locked(self._key):
+            data = self._authenticate()
+            entry = self._entry_from_tokens(data.get("tokens", {}), data.get("userSettings", {}))
+            self._cache.store(self._key, entry)
+            self._adopt(entry)
+        return data
+
+    def _expiring(self, entry: dict) -> bool:
+        return entry.get("expiresAt", 0) - self._refresh_margin <= time.time()
+
+    def _renew(self, rejected_token: str | None = None) -> None:
+        # Called under self._lock, so one thread per login renews; the per-login file
+        # lock does the same across processes without holding up other logins.
+        with self._cache.locked(self._key):
+            # Another process may have renewed while we waited for the lock.
+            cached = self._cache.load(self._key)
+            if cached is not None and cached["accessToken"] != rejected_token and not self._expiring(cached):
+                self._adopt(cached)
+                return
+
+            current = cached or self._entry
+            entry = None
+            if current is not None and current.get("refreshExpiresAt", 0) > time.time():
+                entry = self._refresh(current)
+            if entry is None:
+                data = self._authenticate()
+                entry = self._entry_from_tokens(data.get("tokens", {}), data.get("userSettings", {}))
+
+            self._cache.store(self._key, entry)
+            self._adopt(entry)
+
+    def _refresh(self, entry: dict) -> dict | None:
+        body = {"accessToken": entry["accessToken"], "refreshToken": entry["refreshToken"]}
+        try:
+            response = api_request("POST", "/Authenticate/Refresh", json=body)
+        except requests.RequestException:
+            return None
+
+        tokens = response_json(response).get("tokens") or {}
+        if not tokens.get("accessToken"):
+            return None
+        return self._entry_from_tokens(tokens, {"organizationId": entry.get("customerId")})
+
+    def _authenticate(self) -> dict:
+        auth_body = {
+            "loginId": self.username,
+            "password": self._password,
+            "callerId": CALLER_ID,
+            "includeUserSettingsInResponse": True,
+            "includeAccessRightsWithUserSettings": False,
+        }
+
+        print(f"Authenticating with {BASE_URL}...")
+        data = response_json(api_request("POST", "/authenticate", json=auth_body))
+        if not data.get("tokens", {}).get("accessToken"):
+            # Raised rather than exiting, so a batch over many logins can report it per login.
+            raise AuthenticationError(f"Authentication failed for {self.username} — no access token received.")
+
+        print("Login successful.")
+        return data
+
+    @staticmethod
+    def _entry_from_tokens(tokens: dict, settings: dict) -> dict:
+        now = time.time()
+        return {
+            "accessToken": tokens.get("accessToken"),
+            "refreshToken": tokens.get("refreshToken"),
+            "expiresAt": now + (tokens.get("accessTokenExpiresInMinutes") or 0) * 60,
+            "refreshExpiresAt": now + (tokens.get("refreshTokenExpiresInHours") or 0) * 3600,
+            "customerId": settings.get("organizationId"),
+        }
+
+    def _adopt(self, entry: dict) -> None:
+        # Only the first token and the current one stay mapped, so a long-running
+        # process does not accumulate every token it was ever issued.
+        previous = self._entry
+        if previous is not None and previous["accessToken"] not in (self._handle, entry["accessToken"]):
+            _token_owners.pop(previous["accessToken"], None)
+        if self._handle is None:
+            self._handle = entry["accessToken"]
+        self._entry = entry
+        _token_owners[entry["accessToken"]] = self
+
+
+def token_login(token: str) -> str | None:
+    """Username of the ``TokenManager`` that issued ``token``, or None for a token from elsewhere."""
+    manager = _token_owners.get(token)
+    return manager.username if manager is not None else None
+
+
+def get_token_manager() -> TokenManager:
+    """Return the process-wide token manager for the configured credentials."""
+    global _default_manager
+    if _default_manager is None:
+        with _manager_lock:
+            if _default_manager is None:
+                username, password = get_credentials()
+                _default_manager = TokenManager(username, password)
+    return _default_manager
+
 
 def get_credentials() -> tuple[str, str]:
     """Read username and password from environment variables."""
@@ -29,31 +368,18 @@ def get_credentials() -> tuple[str, str]:
 
 
 def authenticate() -> tuple[str, str]:
-    """Authenticate against the API and return (access_token, customer_id)."""
-    username, password = get_credentials()
-
-    auth_body = {
-        "loginId": username,
-        "password": password,
-        "callerId": CALLER_ID,
-        "includeUserSettingsInResponse": True,
-        "includeAccessRightsWithUserSettings": False,
-    }
-
-    print(f"Authenticating with {BASE_URL}...")
-    response = requests.post(f"{BASE_URL}/authenticate", json=auth_body, timeout=30)
-    response.raise_for_status()
-
-    data = response.json()
-    token = data.get("tokens", {}).get("accessToken")
-    customer_id = data.get("userSettings", {}).get("organizationId")
-
-    if not token:
-        print("Error: Authentication failed — no access token received.", file=sys.stderr)
-        sys.exit(1)
+    """Return (access_token, customer_id), reusing cached tokens when still valid.
 
-    print("Login successful.")
-    return token, customer_id
+    Only logs in against the API when there is no usable cached token and the
+    refresh token cannot be used to obtain a new one.
+    """
+    manager = get_token_manager()
+    try:
+        token = manager.get_token()
+    except AuthenticationError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    return token, manager.customer_id
 
 
 def auth_headers(token: str) -> dict[str, str]:
@@ -61,13 +387,33 @@ def auth_headers(token: str) -> dict[str, str]:
     return {"Authorization": f"Bearer {token}"}
 
 
+def check_response(data: dict, context: str) -> None:
+    """Raise ValueError when a response reports failure: ``IsSuccessful`` false or an error problem.
+
+    Handles both casings the API uses (``Problems``/``problems``, ...); problems
+    without a type count as errors, warnings do not.
+    """
+    problems = data.get("Problems") or data.get("problems") or []
+    errors = [problem for problem in problems if problem.get("ProblemType", problem.get("problemType")) in (1, "1", "Error", None)]
+    if data.get("IsSuccessful", data.get("isSuccessful", True)) is not False and not errors:
+        return
+    messages = data.get("ErrorMessages") or data.get("errorMessages") or []
+    detail = next(
+        (problem.get(name) for problem in errors or problems for name in ("Message", "message", "MessageDetails", "messageDetails") if problem.get(name)),
+        messages[0] if messages else None,
+    )
+    raise ValueError(f"{context} failed: {detail or errors or 'IsSuccessful is false'}")
+
+
+def fetch_balances(token: str, customer_id: str) -> list[dict]:
+    """Fetch account balances for a customer. Returns the (possibly empty) balances list."""
+    response = api_request("GET", f"/CustomerAccountBalance/{customer_id}", token)
+    return response_json(response).get("balances") or []
+
+
 def get_balances(token: str, customer_id: str) -> list[dict]:
     """Fetch account balances for a customer. Returns the balances list."""
-    url = f"{BASE_URL}/CustomerAccountBalance/{customer_id}"
-    response = requests.get(url, headers=auth_headers(token), timeout=30)
-    response.raise_for_status()
-
-    balances = response.json().get("balances", [])
+    balances = fetch_balances(token, customer_id)
     if not balances:
         print("Error: No balances found.", file=sys.stderr)
         sys.exit(1)
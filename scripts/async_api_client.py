@@ -0,0 +1,213 @@
+"""Asyncio counterpart to ``api_client`` for high-concurrency wallet operations.
+
+Uses ``aiohttp`` with one pooled connector per client. Concurrency is bounded
+twice: a global limit on in-flight requests and a per-endpoint-family
+semaphore, so e.g. a burst of statement pulls cannot starve balance checks.
+These in-flight caps are the only limit: requests do not go through the
+``rate_limit`` token buckets (``WALLET_RATE_LIMITS`` has no effect here),
+whose blocking waits would stall the event loop. Tokens come from the same
+``TokenManager`` (and on-disk cache) as the sync client.
+
+Requires:
+    uv pip install aiohttp
+
+Usage:
+    python scripts/async_api_client.py            # balances + 30-day statements for every account
+"""
+
+import asyncio
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import aiohttp
+
+from api_client import BASE_URL, REQUEST_TIMEOUT, TokenManager, get_token_manager
+from money import DEFAULT_SCALE, format_amount, to_wire
+from rate_limit import endpoint_family
+from reference_data import amount_scales
+
+MAX_CONCURRENCY = int(os.environ.get("WALLET_ASYNC_CONCURRENCY", "50"))
+
+# In-flight request limits per endpoint family
+ENDPOINT_LIMITS = {
+    "auth": 2,
+    "balance": 20,
+    "statement": 10,
+    "fx": 5,
+    "payment": 10,
+    "search": 5,
+    "document": 4,
+    "other": 10,
+}
+
+
+class AsyncWalletClient:
+    """Pooled aiohttp client with bounded, per-endpoint concurrency.
+
+    Use as an async context manager::
+
+        async with AsyncWalletClient() as client:
+            balances = await client.get_balances()
+    """
+
+    def __init__(
+        self,
+        manager: TokenManager | None = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        endpoint_limits: dict[str, int] | None = None,
+    ) -> None:
+        self._manager = manager
+        self._max_concurrency = max_concurrency
+        self._limits = {**ENDPOINT_LIMITS, **(endpoint_limits or {})}
+        self._session: aiohttp.ClientSession | None = None
+        self._global: asyncio.Semaphore | None = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> "AsyncWalletClient":
+        connector = aiohttp.TCPConnector(limit=self._max_concurrency, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            headers={"Content-Type": "application/json"},
+        )
+        self._global = asyncio.Semaphore(self._max_concurrency)
+        self._semaphores = {family: asyncio.Semaphore(limit) for family, limit in self._limits.items()}
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def authenticate(self) -> tuple[str, str]:
+        """Return (access_token, customer_id), reusing cached tokens when possible."""
+        if self._manager is None:
+            self._manager = get_token_manager()
+        token = self._manager.current_token()
+        if token is None:
+            # Only a login or refresh blocks, so only then does it need a thread off the event loop.
+            token = await asyncio.to_thread(self._manager.get_token)
+        return token, self._manager.customer_id
+
+    async def request(self, method: str, path: str, authenticated: bool = True, **kwargs) -> dict:
+        """Send a request within the concurrency limits and return the decoded JSON body.
+
+        Raises ``aiohttp.ClientResponseError`` for 4xx/5xx responses. A 401 on an
+        authenticated call triggers one token refresh and retry.
+        """
+        if self._session is None:
+            raise RuntimeError("AsyncWalletClient must be used as an async context manager.")
+
+        token = None
+        if authenticated:
+            token, _customer_id = await self.authenticate()
+
+        family = endpoint_family(path)
+        async with self._semaphores[family], self._global:
+            status, data = await self._send(method, path, token, **kwargs)
+            if status == 401 and token is not None:
+                token = await asyncio.to_thread(self._manager.handle_unauthorized, token)
+                status, data = await self._send(method, path, token, **kwargs)
+        return data
+
+    async def _send(self, method: str, path: str, token: str | None, **kwargs) -> tuple[int, dict]:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        async with self._session.request(method, f"{BASE_URL}{path}", headers=headers, **kwargs) as response:
+            if response.status == 401 and token is not None:
+                return response.status, {}
+            response.raise_for_status()
+            return response.status, await response.json(content_type=None) or {}
+
+    async def get_balances(self, customer_id: str | None = None) -> list[dict]:
+        """Fetch account balances for a customer (defaults to the logged-in customer)."""
+        if customer_id is None:
+            _token, customer_id = await self.authenticate()
+        data = await self.request("GET", f"/CustomerAccountBalance/{customer_id}")
+        return data.get("balances", [])
+
+    async def get_payment_currencies(self) -> list[dict]:
+        """Fetch the currencies available for instant payments."""
+        data = await self.request("GET", "/PaymentCurrencyList")
+        return data.get("currencies", [])
+
+    async def get_statement(self, account_id: str, start_date: date, end_date: date) -> dict:
+        """Fetch the account statement for a date range."""
+        params = {
+            "accountId": account_id,
+            "strStartDate": start_date.strftime("%Y-%m-%d"),
+            "strEndDate": end_date.strftime("%Y-%m-%d"),
+        }
+        return await self.request("GET", "/CustomerAccountStatement", params=params)
+
+    async def get_fx_quote(self, buy_ccy: str, sell_ccy: str, amount: Decimal, amount_ccy: str) -> dict:
+        """Request an FX deal quote."""
+        payload = {
+            "buyCurrencyCode": buy_ccy,
+            "sellCurrencyCode": sell_ccy,
+            "amount": to_wire(amount),
+            "amountCurrencyCode": amount_ccy,
+            "dealType": "SPOT",
+            "windowOpenDate": "",
+            "finalValueDate": "",
+            "isForCurrencyCalculator": False,
+        }
+        return await self.request("POST", "/FXDealQuote", json=payload)
+
+    async def book_fx_deal(self, quote_id: str) -> dict:
+        """Book an FX deal and instant deposit using the quote ID."""
+        return await self.request("PATCH", f"/FXDealQuote/{quote_id}/BookAndInstantDeposit")
+
+    async def create_payment(self, from_customer: str, to_customer: str, amount: Decimal, currency: str) -> dict:
+        """Create an instant payment (step 1 of 2)."""
+        payload = {
+            "fromCustomer": from_customer,
+            "toCustomer": to_customer,
+            "paymentTypeId": 1,
+            "amount": to_wire(amount),
+            "currencyCode": currency,
+            "valueDate": datetime.now(tz=timezone.utc).strftime("%Y-%m-%d"),
+            "reasonForPayment": "Instant Payment",
+            "externalReference": "",
+            "memo": "",
+        }
+        return await self.request("POST", "/InstantPayment", json=payload)
+
+    async def confirm_payment(self, payment_id: str, timestamp: str) -> dict:
+        """Confirm/post a previously created instant payment (step 2 of 2)."""
+        payload = {"instantPaymentId": payment_id, "timestamp": timestamp}
+        return await self.request("PATCH", "/InstantPayment/Post", json=payload)
+
+
+async def _demo() -> None:
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=30)
+
+    async with AsyncWalletClient() as client:
+        balances, currencies = await asyncio.gather(client.get_balances(), client.get_payment_currencies())
+        scales = amount_scales(currencies)
+        print(f"\nFetching {len(balances)} statement(s) concurrently...")
+        statements = await asyncio.gather(
+            *(client.get_statement(bal.get("accountId"), start_date, end_date) for bal in balances),
+            return_exceptions=True,
+        )
+
+    print(f"\n{'Currency':<12}{'Available':>14}{'Entries (30d)':>16}")
+    print("-" * 42)
+    for bal, statement in zip(balances, statements):
+        entries = "error" if isinstance(statement, Exception) else len(statement.get("entries") or [])
+        currency = bal.get("currencyCode", "N/A")
+        print(f"{currency:<12}{format_amount(bal.get('balanceAvailable'), scales.get(currency, DEFAULT_SCALE)):>14}{entries:>16}")
+
+
+def main() -> None:
+    try:
+        asyncio.run(_demo())
+    except aiohttp.ClientError as exc:
+        print(f"Request failed: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
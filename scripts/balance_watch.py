@@ -0,0 +1,406 @@
+"""Watch balances of many customers and emit only what changed.
+
+Long-running counterpart to ``account_balances.py`` / ``treasury.py``. Each
+customer's ``/CustomerAccountBalance/{customerId}`` is polled on its own
+schedule, by a pool of ``--workers`` threads, so a slow customer delays only
+its own next poll. Every poll that finds no change stretches that customer's
+interval by ``--backoff`` (up to ``--max-interval``), and any change snaps it
+back to ``--min-interval``, so quiet customers cost a few calls an hour while
+active ones are followed closely. The endpoint returns all of a customer's accounts
+at once, so the most active account sets the pace for its customer. Polls are
+conditional: when the server sent an ETag, ``If-None-Match`` lets it answer
+304 without a body.
+
+The last balances of every account are kept in a compact table of integer
+minor-unit columns (``array('q')``) and every response is diffed against it.
+Only differences are emitted, one JSON object per line, to stdout or to every
+client connected to ``--socket`` (a local Unix socket):
+
+    {"event": "changed", "time": "...", "customerId": "...", "label": "...",
+     "accountId": "...", "accountNumber": "...", "currencyCode": "USD",
+     "balance": "1250.00", "balanceAvailable": "1200.00", "activeHoldsTotal": "50.00",
+     "previous": {"balance": "1000.00", "balanceAvailable": "1000.00", "activeHoldsTotal": "0.00"}}
+
+``added`` and ``removed`` events report accounts appearing or disappearing
+after the first poll, whose balances are only recorded (``--emit-initial``
+emits them as ``snapshot`` events). A removed account's row is freed, so if
+it comes back it is reported as ``added``. Errors go to stderr.
+
+Input file (CSV header or JSONL keys), as for ``treasury.py``:
+    username, password   Login for this customer (optional)
+    customer_id          Customer ID (optional when a login is given)
+    label                Display name (optional)
+
+Without an input file the customer of the configured login is watched.
+
+Usage:
+    python scripts/balance_watch.py customers.csv --min-interval 5 --max-interval 300
+    python scripts/balance_watch.py --duration 60 --emit-initial
+    python scripts/balance_watch.py customers.csv --socket /tmp/balances.sock
+    socat - UNIX-CONNECT:/tmp/balances.sock    # follow the changes
+"""
+
+import argparse
+import contextlib
+import heapq
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+
+from api_client import TokenManager, api_request, configure_session, get_token_manager
+from batch_input import read_rows
+from models import response_json
+from money import from_minor, quantize, scale_of, to_minor
+
+# Decimal places kept in the table; int64 minor units then hold amounts up to about 9 * 10**12.
+SCALE = 6
+
+AMOUNT_FIELDS = ("balance", "balanceAvailable", "activeHoldsTotal")
+
+
+class BalanceTable:
+    """Last seen balances of every watched account, in flat integer columns.
+
+    Accounts are rows addressed through ``index`` (account ID -> row, with
+    ``ids`` mapping back); the three amounts are ``array('q')`` minor units at
+    ``SCALE`` decimals, so a watched account costs a few dozen bytes besides
+    its ID.
+    """
+
+    __slots__ = ("index", "ids", "balances", "available", "holds")
+
+    def __init__(self) -> None:
+        self.index: dict[str, int] = {}
+        self.ids: list[str] = []
+        self.balances = array("q")
+        self.available = array("q")
+        self.holds = array("q")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def row(self, account_id: str) -> tuple[int, int, int] | None:
+        """The stored (balance, available, holds) of an account, or None if unseen."""
+        i = self.index.get(account_id)
+        if i is None:
+            return None
+        return self.balances[i], self.available[i], self.holds[i]
+
+    def update(self, account_id: str, values: tuple[int, int, int]) -> tuple[int, int, int] | None:
+        """Store an account's amounts and return the previous ones (None for a new account)."""
+        i = self.index.get(account_id)
+        if i is None:
+            self.index[account_id] = len(self.balances)
+            self.ids.append(account_id)
+            self.balances.append(values[0])
+            self.available.append(values[1])
+            self.holds.append(values[2])
+            return None
+        previous = self.balances[i], self.available[i], self.holds[i]
+        self.balances[i], self.available[i], self.holds[i] = values
+        return previous
+
+    def remove(self, account_id: str) -> tuple[int, int, int] | None:
+        """Free an account's row and return its last amounts (None if unseen)."""
+        i = self.index.pop(account_id, None)
+        if i is None:
+            return None
+        previous = self.balances[i], self.available[i], self.holds[i]
+        last = len(self.balances) - 1
+        if i != last:
+            # Move the last row into the hole so the columns stay dense.
+            moved = self.ids[i] = self.ids[last]
+            self.index[moved] = i
+            self.balances[i], self.available[i], self.holds[i] = self.balances[last], self.available[last], self.holds[last]
+        for column in (self.ids, self.balances, self.available, self.holds):
+            column.pop()
+        return previous
+
+
+class WatchedCustomer:
+    """Polling state of one customer: its schedule, validator and known accounts."""
+
+    __slots__ = ("position", "label", "customer_id", "manager", "interval", "etag", "baselined", "accounts", "polls", "not_modified", "errors")
+
+    def __init__(self, position: int, label: str, customer_id: str | None, manager: TokenManager, interval: float) -> None:
+        self.position = position
+        self.label = label
+        self.customer_id = customer_id
+        self.manager = manager
+        self.interval = interval
+        self.etag: str | None = None
+        self.baselined = False  # set once a full response has been recorded
+        self.accounts: dict[str, dict] = {}  # account ID -> accountNumber / currencyCode
+        self.polls = 0
+        self.not_modified = 0
+        self.errors = 0
+
+
+class ChangeEmitter:
+    """Writes events as JSON lines to stdout, or to every client of a Unix socket."""
+
+    def __init__(self, socket_path: Path | None = None) -> None:
+        self.socket_path = socket_path
+        self._stream = sys.stdout  # captured before main() points stdout at stderr
+        self._clients: list[socket.socket] = []
+        self._lock = threading.Lock()
+        self._server = None
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._server.bind(str(socket_path))
+            self._server.listen()
+            threading.Thread(target=self._accept, name="balance-watch-accept", daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                client, _address = self._server.accept()
+            except OSError:
+                return  # Closed.
+            # Non-blocking, so a client that stops reading cannot stall the polling thread in emit().
+            client.setblocking(False)
+            with self._lock:
+                self._clients.append(client)
+
+    def emit(self, event: dict) -> None:
+        line = json.dumps(event) + "\n"
+        if self._server is None:
+            self._stream.write(line)
+            self._stream.flush()
+            return
+        data = line.encode()
+        with self._lock:
+            for client in list(self._clients):
+                try:
+                    complete = client.send(data) == len(data)
+                except OSError:  # including BlockingIOError: its buffer is full
+                    complete = False
+                if not complete:
+                    # A client that went away or fell behind is dropped rather than sent half a line.
+                    self._clients.remove(client)
+                    client.close()
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients.clear()
+        self.socket_path.unlink(missing_ok=True)
+
+
+def account_values(bal: dict) -> tuple[int, int, int]:
+    return tuple(to_minor(bal.get(name), SCALE) for name in AMOUNT_FIELDS)
+
+
+def amounts(values: tuple[int, int, int]) -> dict[str, str]:
+    """Event amounts as exact decimal strings, with at least two decimals."""
+    result = {}
+    for name, units in zip(AMOUNT_FIELDS, values):
+        amount = from_minor(units, SCALE)
+        result[name] = str(quantize(amount, scale_of(amount.normalize())))
+    return result
+
+
+def poll_customer(customer: WatchedCustomer) -> dict:
+    """Fetch one customer's balances, conditionally. Never raises; errors are reported in the result."""
+    try:
+        token = customer.manager.get_token()
+        customer_id = customer.customer_id or customer.manager.customer_id
+        headers = {"If-None-Match": customer.etag} if customer.etag else None
+        response = api_request("GET", f"/CustomerAccountBalance/{customer_id}", token, headers=headers)
+        balances = None if response.status_code == 304 else response_json(response).get("balances") or []
+    except Exception as exc:  # a failed login, bad body or anything else is this customer's error, not the watcher's
+        return {"customer": customer, "status": "error", "error": str(exc) or type(exc).__name__}
+
+    customer.customer_id = customer_id
+    if balances is None:
+        return {"customer": customer, "status": "not_modified"}
+    return {"customer": customer, "status": "ok", "balances": balances, "etag": response.headers.get("ETag")}
+
+
+def diff_balances(customer: WatchedCustomer, balances: list[dict], table: BalanceTable, emit_initial: bool) -> list[dict]:
+    """Update the table from a balances response and return the events for what changed."""
+    first = not customer.baselined
+    customer.baselined = True
+    now = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+    base = {"customerId": customer.customer_id, "label": customer.label}
+    events = []
+    current = set()
+    for bal in balances:
+        account_id = bal.get("accountId")
+        if not account_id:
+            continue
+        current.add(account_id)
+        values = account_values(bal)
+        previous = table.update(account_id, values)
+        customer.accounts[account_id] = {"accountNumber": bal.get("accountNumber"), "currencyCode": bal.get("currencyCode")}
+        if previous == values:
+            continue
+        if previous is None:
+            if first and not emit_initial:
+                continue
+            event = "snapshot" if first else "added"
+        else:
+            event = "changed"
+        record = {"event": event, "time": now, **base, "accountId": account_id, **customer.accounts[account_id], **amounts(values)}
+        if previous is not None:
+            record["previous"] = amounts(previous)
+        events.append(record)
+
+    for account_id in [account_id for account_id in customer.accounts if account_id not in current]:
+        info = customer.accounts.pop(account_id)
+        events.append({"event": "removed", "time": now, **base, "accountId": account_id, **info, "previous": amounts(table.remove(account_id))})
+    return events
+
+
+def load_customers(path: Path | None, interval: float) -> list[WatchedCustomer]:
+    """One WatchedCustomer per input row (or for the configured login without an input file)."""
+    if path is None:
+        manager = get_token_manager()
+        return [WatchedCustomer(0, manager.username, None, manager, interval)]
+
+    customers = []
+    managers: dict[str, TokenManager] = {}
+    for row in read_rows(path):
+        username = row.get("username")
+        if username:
+            if username not in managers:
+                managers[username] = TokenManager(username, row.get("password") or "")
+            manager = managers[username]
+        elif row.get("customer_id"):
+            manager = get_token_manager()
+        else:
+            print(f"Warning: Line {row['line']}: needs a username or customer_id; skipped.", file=sys.stderr)
+            continue
+        label = row.get("label") or row.get("customer_id") or username
+        customers.append(WatchedCustomer(len(customers), str(label), row.get("customer_id") or None, manager, interval))
+    return customers
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Poll balances of many customers and emit only changes, as JSON lines.")
+    parser.add_argument("input", type=Path, nargs="?", help="CSV or JSONL file of customers/credentials (default: the configured login)")
+    parser.add_argument("--min-interval", type=float, default=5.0, help="Seconds between polls of an active customer (default 5)")
+    parser.add_argument("--max-interval", type=float, default=300.0, help="Longest interval for a quiet customer (default 300)")
+    parser.add_argument("--backoff", type=float, default=1.5, help="Interval multiplier per unchanged poll (default 1.5)")
+    parser.add_argument("--workers", type=int, default=16, help="Polls in flight at once (default 16)")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds (default: run until Ctrl+C)")
+    parser.add_argument("--socket", type=Path, help="Serve events on this Unix socket instead of stdout")
+    parser.add_argument("--emit-initial", action="store_true", help="Emit the first poll's balances as snapshot events")
+    return parser.parse_args()
+
+
+def record_poll(result: dict, table: BalanceTable, emitter: ChangeEmitter, args: argparse.Namespace) -> int:
+    """Apply one poll's result, emit its events and set the customer's next interval. Returns the events emitted."""
+    customer = result["customer"]
+    customer.polls += 1
+    events = []
+    if result["status"] == "error":
+        customer.errors += 1
+        print(f"Warning: {customer.label}: {result['error']}", file=sys.stderr)
+    elif result["status"] == "not_modified":
+        customer.not_modified += 1
+    else:
+        customer.etag = result["etag"]
+        events = diff_balances(customer, result["balances"], table, args.emit_initial)
+        for event in events:
+            emitter.emit(event)
+
+    # Active customers are polled at the minimum interval; each quiet poll stretches it.
+    changed = any(event["event"] != "snapshot" for event in events)
+    customer.interval = args.min_interval if changed else min(args.max_interval, customer.interval * args.backoff)
+    return len(events)
+
+
+def watch(customers: list[WatchedCustomer], table: BalanceTable, emitter: ChangeEmitter, args: argparse.Namespace, started: float) -> int:
+    """Poll every customer on its own schedule until ``--duration`` or Ctrl+C. Returns the events emitted.
+
+    Polls run in a thread pool and each customer is rescheduled as soon as its
+    own poll finishes; results are applied on this thread, which owns the table.
+    """
+    # Spread the first polls over one interval so a large list does not start as a burst.
+    schedule = [(started + args.min_interval * customer.position / len(customers), customer.position, customer) for customer in customers]
+    deadline = None if args.duration is None else started + args.duration
+    in_flight = set()
+    emitted = 0
+    pool = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="balance-watch")
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            now = time.monotonic()
+            while schedule and schedule[0][0] <= now and len(in_flight) < args.workers:
+                in_flight.add(pool.submit(poll_customer, heapq.heappop(schedule)[2]))
+
+            # Wake for the next due poll (if a worker is free for it), the end of the run, or a finished poll.
+            wake = schedule[0][0] if schedule and len(in_flight) < args.workers else None
+            if deadline is not None:
+                wake = deadline if wake is None else min(wake, deadline)
+            timeout = None if wake is None else max(0.0, wake - now)
+            if not in_flight:
+                time.sleep(timeout)
+                continue
+
+            done, in_flight = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                emitted += record_poll(result, table, emitter, args)
+                customer = result["customer"]
+                jitter = random.uniform(0.9, 1.1)
+                heapq.heappush(schedule, (time.monotonic() + customer.interval * jitter, customer.position, customer))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Polls still running are abandoned; their results would arrive after the summary.
+        pool.shutdown(wait=False, cancel_futures=True)
+    return emitted
+
+
+def main() -> None:
+    args = parse_args()
+    if args.input is not None and not args.input.is_file():
+        print(f"Error: Input file not found: {args.input}", file=sys.stderr)
+        sys.exit(1)
+    if args.min_interval <= 0 or args.max_interval < args.min_interval or args.backoff < 1 or args.workers < 1:
+        print("Error: Need 0 < --min-interval <= --max-interval, --backoff >= 1 and --workers >= 1.", file=sys.stderr)
+        sys.exit(1)
+
+    customers = load_customers(args.input, args.min_interval)
+    if not customers:
+        print("Error: No customers to watch.", file=sys.stderr)
+        sys.exit(1)
+
+    configure_session(pool_size=args.workers)
+    emitter = ChangeEmitter(args.socket)
+    table = BalanceTable()
+    started = time.monotonic()
+    print(f"Watching {len(customers)} customer(s) every {args.min_interval:g}-{args.max_interval:g}s; events to {args.socket or 'stdout'}.", file=sys.stderr)
+    try:
+        # Login and token refresh messages go to stderr, keeping stdout a clean event stream.
+        with contextlib.redirect_stdout(sys.stderr):
+            emitted = watch(customers, table, emitter, args, started)
+    finally:
+        emitter.close()
+
+    elapsed = time.monotonic() - started
+    polls = sum(customer.polls for customer in customers)
+    fixed = sum(int(elapsed / args.min_interval) + 1 for _customer in customers)
+    print(
+        f"\nStopped after {elapsed:.0f}s: {polls} poll(s) ({sum(c.not_modified for c in customers)} not modified, "
+        f"{sum(c.errors for c in customers)} failed), {emitted} event(s) for {len(table)} account(s); "
+        f"fixed {args.min_interval:g}s polling would have made {fixed}.",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
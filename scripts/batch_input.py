@@ -0,0 +1,23 @@
+"""Row input shared by the batch scripts: CSV or JSONL files, streamed.
+
+A ``.jsonl`` / ``.ndjson`` file holds one JSON object per line; anything else
+is read as CSV with a header row. Every row is tagged with the ``line`` it
+came from, so results and errors can point back into the file.
+"""
+
+import csv
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+
+def read_rows(path: Path) -> Iterator[dict]:
+    """Stream rows from a CSV or JSONL file, tagging each with its line number."""
+    with open(path, encoding="utf-8", newline="") as handle:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            for line_no, line in enumerate(handle, start=1):
+                if line.strip():
+                    yield {**json.loads(line), "line": line_no}
+        else:
+            for line_no, row in enumerate(csv.DictReader(handle), start=2):
+                yield {**row, "line": line_no}
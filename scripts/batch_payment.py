@@ -0,0 +1,300 @@
+"""Send instant payments in bulk from a CSV or JSONL file, non-interactively.
+
+Each row goes through the same two steps as ``instant_payment.py``
+(POST /InstantPayment, then PATCH /InstantPayment/Post), but a pool of
+workers keeps many payments in flight at once over the shared pooled
+session. The input is streamed, and every outcome is appended to a CSV
+results ledger as soon as it is known.
+
+Progress is also written to a SQLite journal (see ``payment_journal.py``)
+between the create and post steps. Re-running the same file after a crash
+skips payments that were already posted and posts already-created ones
+without creating them again; ``--post-pending`` posts only those.
+
+Input columns (CSV header or JSONL keys):
+    to_customer   Receiver PayID (required)
+    amount        Positive amount within the currency's scale (required)
+    currency      Payment currency code (default USD)
+    reason        Reason for payment (default "Instant Payment")
+    reference     External reference (optional)
+    memo          Memo (optional)
+    key           Unique idempotency key (optional; by default a payout is
+                  identified by its payee, amount, currency and reference,
+                  and by how many identical rows come before it)
+
+Payouts are journaled by that identity rather than by line number, so
+editing the file (adding, removing or reordering rows) between runs does
+not send an already posted payout again.
+
+Each run appends to the ledger, so it keeps the outcome of every attempt;
+the last row for a payout is its current state.
+
+Usage:
+    python scripts/batch_payment.py payouts.csv --workers 16 --ledger results.csv
+    python scripts/batch_payment.py payouts.jsonl --dry-run
+    python scripts/batch_payment.py payouts.csv --post-pending
+"""
+
+import argparse
+import csv
+import sys
+import time
+from collections import Counter
+from functools import partial
+from pathlib import Path
+from typing import TextIO
+
+import requests
+
+from api_client import authenticate, configure_session, get_credentials
+from batch_input import read_rows
+from concurrency import bounded_map
+from instant_payment import confirm_payment, create_payment
+from money import parse_amount
+from payment_journal import PaymentJournal, number_occurrences, payment_key
+from reference_data import amount_scales, payment_currencies
+
+# Ledger statuses in summary order; in_progress means another worker or run holds the payment.
+LEDGER_STATUSES = ("posted", "already_posted", "in_progress", "create_failed", "post_failed", "invalid")
+
+LEDGER_FIELDS = [
+    "line",
+    "to_customer",
+    "amount",
+    "currency",
+    "reference",
+    "status",
+    "payment_id",
+    "payment_reference",
+    "error",
+]
+
+
+def open_ledger(path: Path) -> tuple[TextIO, csv.DictWriter]:
+    """Open a results ledger for appending, writing the header only to a new or empty file.
+
+    Raises ValueError if the file already has a different header.
+    """
+    handle = open(path, "a+", encoding="utf-8", newline="")
+    handle.seek(0)
+    header = next(csv.reader(handle), None)
+    ledger = csv.DictWriter(handle, fieldnames=LEDGER_FIELDS)
+    if header is None:
+        ledger.writeheader()
+    elif header != LEDGER_FIELDS:
+        handle.close()
+        raise ValueError(f"{path} is not a payment ledger (header {','.join(header)})")
+    return handle, ledger
+
+
+def currency_scales(token: str) -> dict[str, int] | None:
+    """Amount scale of every payment currency, or None when the list cannot be fetched."""
+    try:
+        return amount_scales(payment_currencies(token))
+    except requests.RequestException as exc:
+        print(f"Warning: Cannot fetch payment currencies ({exc}); amounts are validated by the server.", file=sys.stderr)
+        return None
+
+
+def validate_row(row: dict, scales: dict[str, int] | None = None) -> dict:
+    """Normalise a raw input row. Raises ValueError describing the first problem found.
+
+    With ``scales`` (see ``currency_scales``) the currency must be a payment
+    currency and the amount must fit its scale.
+    """
+    to_customer = str(row.get("to_customer") or "").strip()
+    if not to_customer:
+        raise ValueError("to_customer is required")
+
+    currency = str(row.get("currency") or "USD").strip().upper()
+    if scales is not None and currency not in scales:
+        raise ValueError(f"{currency} is not a payment currency")
+
+    amount = parse_amount(row.get("amount"), scale=scales[currency] if scales is not None else None)
+    if amount <= 0:
+        raise ValueError("amount must be positive")
+
+    return {
+        "line": row.get("line"),
+        "key": str(row.get("key") or "").strip(),
+        "occurrence": row.get("occurrence", 1),
+        "to_customer": to_customer,
+        "amount": amount,
+        "currency": currency,
+        "reason": str(row.get("reason") or "Instant Payment"),
+        "reference": str(row.get("reference") or ""),
+        "memo": str(row.get("memo") or ""),
+    }
+
+
+def ledger_record(row: dict, status: str, **fields) -> dict:
+    """Build a ledger row for ``row`` with the given outcome."""
+    record = {name: row.get(name, "") for name in ("line", "to_customer", "amount", "currency", "reference")}
+    record.update(status=status, payment_id="", payment_reference="", error="")
+    record.update(fields)
+    return record
+
+
+def post_payment(row: dict, key: str, payment: dict, token: str, journal: PaymentJournal) -> dict:
+    """Claim, post and journal a created payment. Never raises."""
+    payment_id = payment["payment_id"]
+    payment_ref = payment.get("payment_reference") or ""
+    if not journal.claim_post(key):
+        entry = journal.get(key) or {}
+        if entry.get("status") == "posted":
+            return ledger_record(row, "already_posted", payment_id=payment_id, payment_reference=payment_ref)
+        return ledger_record(row, "in_progress", payment_id=payment_id, error="Being posted by another worker or run.")
+    try:
+        post_result = confirm_payment(token, payment_id, payment["timestamp"])
+        error = post_result.get("problems")
+    except requests.RequestException as exc:
+        error = exc
+
+    if error:
+        journal.record(key, row, "post_failed", error=str(error))
+        return ledger_record(row, "post_failed", payment_id=payment_id, payment_reference=payment_ref, error=str(error))
+
+    journal.record(key, row, "posted", error=None)
+    return ledger_record(row, "posted", payment_id=payment_id, payment_reference=payment_ref)
+
+
+def process_payment(row: dict, token: str, from_customer: str, journal: PaymentJournal, scales: dict[str, int] | None = None) -> dict:
+    """Create (unless journaled) and post one payment. Never raises; failures go to the ledger."""
+    try:
+        payment_row = validate_row(row, scales)
+    except ValueError as exc:
+        return ledger_record(row, "invalid", error=str(exc))
+
+    key = payment_key(payment_row)
+    entry = journal.claim_create(key, payment_row)
+    if entry is not None:
+        if entry["status"] == "posted":
+            return ledger_record(payment_row, "already_posted", payment_id=entry["payment_id"], payment_reference=entry["payment_reference"] or "")
+        if entry["status"] in ("created", "posting", "post_failed") and entry["payment_id"]:
+            return post_payment(payment_row, key, entry, token, journal)
+        return ledger_record(payment_row, "in_progress", error="Being created by another worker or run.")
+
+    try:
+        result = create_payment(
+            token,
+            from_customer,
+            payment_row["to_customer"],
+            payment_row["amount"],
+            payment_row["currency"],
+            reason=payment_row["reason"],
+            external_reference=payment_row["reference"],
+            memo=payment_row["memo"],
+        )
+    except requests.RequestException as exc:
+        journal.record(key, payment_row, "create_failed", error=str(exc))
+        return ledger_record(payment_row, "create_failed", error=str(exc))
+
+    payment = result.get("payment") or {}
+    created = {
+        "payment_id": payment.get("paymentId"),
+        "payment_reference": payment.get("paymentReference"),
+        "timestamp": payment.get("timestamp"),
+    }
+    if result.get("problems") or not created["payment_id"] or not created["timestamp"]:
+        error = str(result.get("problems") or "Missing paymentId or timestamp in response.")
+        journal.record(key, payment_row, "create_failed", error=error)
+        return ledger_record(payment_row, "create_failed", payment_id=created["payment_id"] or "", error=error)
+
+    journal.record(key, payment_row, "created", **created)
+    return post_payment(payment_row, key, created, token, journal)
+
+
+def _post_journaled(entry: dict, token: str, journal: PaymentJournal) -> dict:
+    return post_payment(entry, entry["key"], entry, token, journal)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Send instant payments in bulk from a CSV or JSONL file.")
+    parser.add_argument("input", type=Path, help="CSV or JSONL file of payouts")
+    parser.add_argument("--workers", type=int, default=8, help="Payments in flight at once (default 8)")
+    parser.add_argument("--ledger", type=Path, help="Results ledger CSV, appended to (default <input>.ledger.csv)")
+    parser.add_argument("--journal", type=Path, help="Resume journal (default <input>.journal.db)")
+    parser.add_argument("--post-pending", action="store_true", help="Only post payments the journal shows as created")
+    parser.add_argument("--dry-run", action="store_true", help="Validate the input file (logging in for currency scales) without sending payments")
+    return parser.parse_args()
+
+
+def dry_run(input_path: Path) -> None:
+    """Validate every row, including amount scales, and report problems without sending anything."""
+    token, _customer_id = authenticate()
+    scales = currency_scales(token)
+    total = 0
+    invalid = 0
+    for row in read_rows(input_path):
+        total += 1
+        try:
+            validate_row(row, scales)
+        except ValueError as exc:
+            invalid += 1
+            print(f"  Line {row['line']}: {exc}")
+    print(f"\n{total} row(s) checked, {invalid} invalid.")
+    sys.exit(1 if invalid else 0)
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.input.is_file():
+        print(f"Error: Input file not found: {args.input}", file=sys.stderr)
+        sys.exit(1)
+    if args.workers < 1:
+        print("Error: --workers must be at least 1.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.dry_run:
+        dry_run(args.input)
+
+    ledger_path = args.ledger or args.input.with_suffix(".ledger.csv")
+    journal_path = args.journal or args.input.with_suffix(".journal.db")
+    try:
+        ledger_file, ledger = open_ledger(ledger_path)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    configure_session(pool_size=args.workers)
+    token, _customer_id = authenticate()
+    from_customer, _ = get_credentials()
+    scales = currency_scales(token)
+
+    print(f"\n=== BATCH PAYMENT ({args.workers} workers) ===")
+    print(f"  Input:   {args.input}")
+    print(f"  Ledger:  {ledger_path}")
+    print(f"  Journal: {journal_path}\n")
+
+    counts: Counter[str] = Counter()
+    started = time.monotonic()
+
+    with PaymentJournal(journal_path) as journal, ledger_file:
+        if args.post_pending:
+            worker = partial(_post_journaled, token=token, journal=journal)
+            items = journal.pending_posts()
+        else:
+            worker = partial(process_payment, token=token, from_customer=from_customer, journal=journal, scales=scales)
+            items = number_occurrences(read_rows(args.input))
+
+        for record in bounded_map(worker, items, args.workers):
+            ledger.writerow(record)
+            ledger_file.flush()
+            counts[record["status"]] += 1
+            processed = sum(counts.values())
+            if processed % 100 == 0:
+                print(f"  {processed} processed ({counts['posted']} posted)...")
+
+    elapsed = time.monotonic() - started
+    processed = sum(counts.values())
+    print("\nSummary:")
+    for status in LEDGER_STATUSES:
+        print(f"  {status:<14}{counts[status]:>8}")
+    print(f"  {'total':<14}{processed:>8}")
+    print(f"\nCompleted in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} payments/s).")
+
+    if processed != counts["posted"] + counts["already_posted"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""Sign up customers in bulk from a CSV or JSONL file, non-interactively.
+
+Runs the signup workflow of ``docs/Signup.md`` (the steps
+``signup_curls.sh`` performs for one user) for every row of the input:
+
+    1. GET   /User/DoesUsernameExist/{username}
+    2. POST  /Customer/FromTemplate            -> CustomerId
+    3. POST  /CustomerUser                     -> UserId (needs the CustomerId)
+    4. PATCH /User/LinkAccessRightTemplate     (needs the UserId)
+
+Each user's steps run in order, one after the other; a pool of workers keeps
+many users in flight at once over the shared pooled session, all calls made
+with the bank user (service account) token. Progress is written to a SQLite
+journal (see ``signup_journal.py``) around every step, so re-running the
+same file after a crash or partial failure skips completed users and
+resumes the others at the step that failed. Every outcome is appended to a
+CSV results ledger as soon as it is known.
+
+Input columns (CSV header or JSONL keys):
+    username      Login name (required, unique)
+    password      Password (required, must match the API's password rule)
+    first_name    First name (required)
+    last_name     Last name (required)
+    email         Email (default WIN_BETA_DEFAULT_REGISTERING_EMAIL)
+    cellphone     Cell phone (optional)
+    referred_by   Referrer's WPAYID (optional)
+    branch_id     Notary node BranchId (default WIN_BETA_NOTARY_NODE_1_BRANCH_ID)
+    country_code  Country code (default the notary node's, then WIN_BETA_DEFAULT_COUNTRY_CODE)
+
+Bank user and template settings come from the environment (or scripts/.env),
+with the names used in docs/Signup.md: WIN_BETA_BANK_USERNAME,
+WIN_BETA_BANK_USER_PASSWORD, WIN_BETA_CUSTOMER_TEMPLATE_ID,
+WIN_BETA_ACCOUNT_REPRESENTATIVE_ID, WIN_BETA_ACCESS_RIGHT_TEMPLATE_ID, ...
+
+Usage:
+    python scripts/batch_signup.py users.csv --workers 16
+    python scripts/batch_signup.py users.jsonl --dry-run
+    python scripts/batch_signup.py users.csv --journal migration.db --ledger migration.results.csv
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from collections import Counter
+from collections.abc import Iterator
+from functools import partial
+from pathlib import Path
+from urllib.parse import quote
+
+import requests
+
+from api_client import TokenManager, api_request, check_response, configure_session
+from batch_input import read_rows
+from concurrency import bounded_map
+from models import response_json
+from signup_journal import SignupJournal, signup_key
+
+ACCOUNT_REPRESENTATIVE_ID = os.environ.get("WIN_BETA_ACCOUNT_REPRESENTATIVE_ID", "9469c6b2-ebed-ec11-915b-3ee1a118192f")
+CUSTOMER_TEMPLATE_ID = os.environ.get("WIN_BETA_CUSTOMER_TEMPLATE_ID", "b3cccc87-4317-ef11-8541-002248afce03")
+ACCESS_RIGHT_TEMPLATE_ID = os.environ.get("WIN_BETA_ACCESS_RIGHT_TEMPLATE_ID", "dba74278-a2e8-4503-b59c-8ab8cd458841")
+DEFAULT_COUNTRY_CODE = os.environ.get("WIN_BETA_DEFAULT_COUNTRY_CODE", "HK")
+DEFAULT_REGISTERING_EMAIL = os.environ.get("WIN_BETA_DEFAULT_REGISTERING_EMAIL", "register@worldkyc.com")
+REFERRED_BY_PLATFORM = os.environ.get("WIN_BETA_REFERRED_BY_PLATFORM", "WorldKYC Signup")
+NOTARY_BRANCH_ID = os.environ.get("WIN_BETA_NOTARY_NODE_1_BRANCH_ID", "82b42669-ac24-e911-9109-3ee1a118192f")
+NOTARY_COUNTRY_CODE = os.environ.get("WIN_BETA_NOTARY_NODE_1_COUNTRY_CODE", "")
+
+# AuthenticateResponse.UserSettings.PasswordRegEx as documented in docs/Signup.md
+PASSWORD_PATTERN = re.compile(r"^(?=.*\d)(?=.*[a-z])(?=.*[A-Z]).{8,20}$")
+
+LEDGER_FIELDS = ["line", "username", "status", "customer_id", "user_id", "error"]
+
+FAILED_STATUSES = ("invalid", "username_taken", "check_failed", "customer_failed", "user_failed", "link_failed")
+
+
+def get_bank_credentials() -> tuple[str, str]:
+    """Read the bank user (service account) credentials from environment variables."""
+    username = os.environ.get("WIN_BETA_BANK_USERNAME")
+    password = os.environ.get("WIN_BETA_BANK_USER_PASSWORD")
+    if not username or not password:
+        print("Error: Set WIN_BETA_BANK_USERNAME and WIN_BETA_BANK_USER_PASSWORD environment variables.", file=sys.stderr)
+        sys.exit(1)
+    return username, password
+
+
+def validate_row(row: dict) -> dict:
+    """Normalise a raw input row. Raises ValueError describing the first problem found."""
+    values = {
+        name: str(row.get(name) or "").strip()
+        for name in ("username", "first_name", "last_name", "email", "cellphone", "referred_by", "branch_id", "country_code")
+    }
+    password = str(row.get("password") or "")
+    for name in ("username", "first_name", "last_name"):
+        if not values[name]:
+            raise ValueError(f"{name} is required")
+    if not PASSWORD_PATTERN.match(password):
+        raise ValueError("password must be 8-20 characters with at least one digit, one lowercase and one uppercase letter")
+    if values["email"] and "@" not in values["email"]:
+        raise ValueError(f"invalid email {values['email']!r}")
+    branch_id = values["branch_id"] or NOTARY_BRANCH_ID
+    return {
+        **values,
+        "line": row.get("line"),
+        "password": password,
+        "email": values["email"] or DEFAULT_REGISTERING_EMAIL,
+        "branch_id": branch_id,
+        "country_code": (values["country_code"] or (NOTARY_COUNTRY_CODE if branch_id == NOTARY_BRANCH_ID else "") or DEFAULT_COUNTRY_CODE).upper(),
+    }
+
+
+def username_exists(token: str, username: str) -> bool:
+    data = response_json(api_request("GET", f"/User/DoesUsernameExist/{quote(username, safe='')}", token))
+    check_response(data, "Username check")
+    return bool(data.get("Exists", data.get("exists")))
+
+
+def create_customer(token: str, user: dict) -> str:
+    """Create the customer from the template and return its CustomerId."""
+    payload = {
+        "BranchId": user["branch_id"] or None,
+        "AccountRepresentativeId": ACCOUNT_REPRESENTATIVE_ID,
+        "CustomerTemplateId": CUSTOMER_TEMPLATE_ID,
+        "CustomerTypeId": 1,
+        "FirstName": user["first_name"],
+        "LastName": user["last_name"],
+        "Email": user["email"],
+        "CellPhone": user["cellphone"],
+        "CountryCode": user["country_code"],
+        "ReferredByPlatform": REFERRED_BY_PLATFORM,
+        "ReferredByName": user["referred_by"],
+        "CustomerName": "",
+        "MiddleName": "",
+        "MailingAddressLine1": "",
+        "MailingAddressLine2": "",
+        "MailingAddressLine3": "",
+        "MailingAddressCity": "",
+        "MailingAddressStateProvince": "",
+        "MailingAddressCountryCode": "",
+        "MailingAddressZipCode": "",
+    }
+    data = response_json(api_request("POST", "/Customer/FromTemplate", token, json=payload))
+    check_response(data, "Create customer")
+    customer = data.get("Customer") or data.get("customer") or {}
+    customer_id = customer.get("CustomerId") or customer.get("customerId")
+    if not customer_id:
+        raise ValueError("Customer created but CustomerId missing from response")
+    return customer_id
+
+
+def create_user(token: str, user: dict, customer_id: str) -> str:
+    """Create the customer's login user and return its UserId."""
+    payload = {
+        "CustomerId": customer_id,
+        "UserName": user["username"],
+        "Password": user["password"],
+        "EmailAddress": user["email"],
+        "FirstName": user["first_name"],
+        "LastName": user["last_name"],
+        "IsApproved": True,
+        "UserMustChangePassword": False,
+        "EmailPasswordToUser": False,
+        "WKYCId": "",
+    }
+    data = response_json(api_request("POST", "/CustomerUser", token, json=payload))
+    check_response(data, "Create user")
+    created = data.get("User") or data.get("user") or {}
+    user_id = created.get("UserId") or created.get("userId")
+    if not user_id:
+        raise ValueError("User created but UserId missing from response")
+    return user_id
+
+
+def find_user(token: str, username: str, customer_id: str) -> str | None:
+    """UserId of ``username`` if it already exists for ``customer_id`` (GET /CustomerUser/Search)."""
+    params = {"UserName": username, "PageIndex": 0, "PageSize": 25}
+    data = response_json(api_request("GET", "/CustomerUser/Search", token, params=params))
+    check_response(data, "User search")
+    records = data.get("Records") or data.get("records") or {}
+    for record in records.get("Users") or records.get("users") or []:
+        name = record.get("UserName") or record.get("userName") or ""
+        owner = record.get("CustomerId") or record.get("customerId") or ""
+        if name.lower() == username.lower() and str(owner).lower() == customer_id.lower():
+            return record.get("UserId") or record.get("userId")
+    return None
+
+
+def link_access_rights(token: str, user_id: str) -> None:
+    payload = {"UserId": user_id, "AccessRightTemplateId": ACCESS_RIGHT_TEMPLATE_ID}
+    data = response_json(api_request("PATCH", "/User/LinkAccessRightTemplate", token, json=payload))
+    check_response(data, "Link access rights")
+
+
+def ledger_record(row: dict, status: str, **fields) -> dict:
+    """Build a ledger row for ``row`` with the given outcome."""
+    record = {"line": row.get("line", ""), "username": row.get("username", ""), "status": status, "customer_id": "", "user_id": "", "error": ""}
+    record.update({name: value or "" for name, value in fields.items()})
+    return record
+
+
+def process_signup(row: dict, token: str, journal: SignupJournal) -> dict:
+    """Run (or resume) one user's signup steps in order. Never raises; failures go to the ledger."""
+    if row.get("duplicate_of"):
+        return ledger_record(row, "invalid", error=f"username also on line {row['duplicate_of']}")
+    try:
+        user = validate_row(row)
+    except ValueError as exc:
+        return ledger_record(row, "invalid", error=str(exc))
+
+    key = signup_key(user["username"])
+    entry = journal.get(key) or {}
+    if entry.get("status") == "completed":
+        return ledger_record(user, "already_completed", customer_id=entry["customer_id"], user_id=entry["user_id"])
+    customer_id = entry.get("customer_id")
+    user_id = entry.get("user_id")
+    step = "check_failed"
+
+    try:
+        if not customer_id:
+            if username_exists(token, user["username"]):
+                journal.record(key, user, "username_taken", error="username already exists")
+                return ledger_record(user, "username_taken", error="username already exists")
+            step = "customer_failed"
+            journal.record(key, user, "customer_creating")
+            customer_id = create_customer(token, user)
+            journal.record(key, user, "customer_created", customer_id=customer_id, error=None)
+
+        if not user_id:
+            step = "user_failed"
+            # An earlier attempt may have created the user before failing or being interrupted.
+            if entry.get("status") in ("user_creating", "user_failed"):
+                user_id = find_user(token, user["username"], customer_id)
+            if not user_id:
+                journal.record(key, user, "user_creating")
+                user_id = create_user(token, user, customer_id)
+            journal.record(key, user, "user_created", user_id=user_id, error=None)
+
+        step = "link_failed"
+        link_access_rights(token, user_id)
+    except (requests.RequestException, ValueError) as exc:
+        journal.record(key, user, step, error=str(exc))
+        return ledger_record(user, step, customer_id=customer_id, user_id=user_id, error=str(exc))
+
+    journal.record(key, user, "completed", error=None)
+    return ledger_record(user, "completed", customer_id=customer_id, user_id=user_id)
+
+
+def mark_duplicates(rows: Iterator[dict]) -> Iterator[dict]:
+    """Flag rows repeating an earlier row's username, so two workers never sign up the same user."""
+    first_line: dict[str, int] = {}
+    for row in rows:
+        key = signup_key(str(row.get("username") or ""))
+        if key and key in first_line:
+            row = {**row, "duplicate_of": first_line[key]}
+        elif key:
+            first_line[key] = row["line"]
+        yield row
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sign up customers in bulk from a CSV or JSONL file.")
+    parser.add_argument("input", type=Path, help="CSV or JSONL file of prospective users")
+    parser.add_argument("--workers", type=int, default=8, help="Users in flight at once (default 8)")
+    parser.add_argument("--ledger", type=Path, help="Results ledger CSV (default <input>.ledger.csv)")
+    parser.add_argument("--journal", type=Path, help="Resume journal (default <input>.journal.db)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate the input file without sending anything")
+    return parser.parse_args()
+
+
+def dry_run(input_path: Path) -> None:
+    """Validate every row and report problems without calling the API."""
+    total = 0
+    invalid = 0
+    for row in mark_duplicates(read_rows(input_path)):
+        total += 1
+        try:
+            if row.get("duplicate_of"):
+                raise ValueError(f"username also on line {row['duplicate_of']}")
+            validate_row(row)
+        except ValueError as exc:
+            invalid += 1
+            print(f"  Line {row['line']}: {exc}")
+    print(f"\n{total} row(s) checked, {invalid} invalid.")
+    sys.exit(1 if invalid else 0)
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.input.is_file():
+        print(f"Error: Input file not found: {args.input}", file=sys.stderr)
+        sys.exit(1)
+    if args.workers < 1:
+        print("Error: --workers must be at least 1.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.dry_run:
+        dry_run(args.input)
+
+    ledger_path = args.ledger or args.input.with_suffix(".ledger.csv")
+    journal_path = args.journal or args.input.with_suffix(".journal.db")
+    configure_session(pool_size=args.workers)
+    # The bank user's token is renewed by its manager, like the wallet user's.
+    try:
+        token = TokenManager(*get_bank_credentials()).get_token()
+    except requests.RequestException as exc:
+        print(f"Error: Bank user login failed: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"\n=== BATCH SIGNUP ({args.workers} workers) ===")
+    print(f"  Input:   {args.input}")
+    print(f"  Ledger:  {ledger_path}")
+    print(f"  Journal: {journal_path}\n")
+
+    counts: Counter[str] = Counter()
+    started = time.monotonic()
+
+    with SignupJournal(journal_path) as journal, open(ledger_path, "w", encoding="utf-8", newline="") as ledger_file:
+        ledger = csv.DictWriter(ledger_file, fieldnames=LEDGER_FIELDS)
+        ledger.writeheader()
+        worker = partial(process_signup, token=token, journal=journal)
+        for record in bounded_map(worker, mark_duplicates(read_rows(args.input)), args.workers):
+            ledger.writerow(record)
+            ledger_file.flush()
+            counts[record["status"]] += 1
+            processed = sum(counts.values())
+            if processed % 100 == 0:
+                print(f"  {processed} processed ({counts['completed']} completed)...")
+
+    elapsed = time.monotonic() - started
+    processed = sum(counts.values())
+    print("\nSummary:")
+    for status in ("completed", "already_completed", *FAILED_STATUSES):
+        if counts[status] or status in ("completed", "already_completed"):
+            print(f"  {status:<18}{counts[status]:>8}")
+    print(f"  {'total':<18}{processed:>8}")
+    print(f"\nCompleted in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} users/s).")
+    if processed != counts["completed"] + counts["already_completed"]:
+        print("Re-run the same file to resume failed users at the step that failed.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Benchmark the client hot paths against the local mock API.
+
+Each scenario runs a fixed number of operations at several concurrency
+levels over the shared pooled session, and reports throughput plus
+p50/p95/p99 latency per operation:
+
+    authenticate   full login (POST /authenticate)
+    balances       GET /CustomerAccountBalance
+    statement      30-day GET /CustomerAccountStatement + display_statement rendering
+    fx             POST /FXDealQuote + PATCH .../BookAndInstantDeposit
+    payment        POST /InstantPayment + PATCH /InstantPayment/Post
+
+By default an in-process ``mock_server`` is started (its latency, failure
+rate and statement volume are set with the flags below), so runs are
+repeatable and never touch the real API. The in-process mock shares the
+interpreter (and GIL) with the client, so at high concurrency prefer a mock
+started separately and passed with ``--url``. Results are written as JSON;
+``--compare`` prints the change against an earlier results file. The
+client-side rate limiter is off unless ``--rate-limit`` is given (which
+applies ``WALLET_RATE_LIMITS``, or the defaults when it is unset), so the
+numbers show the client itself rather than the configured request rates.
+
+Usage:
+    python scripts/benchmark.py
+    python scripts/benchmark.py --scenarios balances statement --concurrency 1 8 32 --requests 500
+    python scripts/benchmark.py --latency 20 --output after.json --compare before.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import requests
+
+import api_client
+from account_statement import display_statement, fetch_statement
+from api_client import TokenManager, configure_session, fetch_balances
+from concurrency import bounded_map
+from fx_deal import book_deal, get_quote
+from instant_payment import confirm_payment, create_payment
+from mock_server import MockConfig, start_server
+from rate_limit import RATE_LIMITS, configure_limits, limiter_stats, parse_rate_limits
+from token_cache import TokenCache
+
+SCENARIOS = ("authenticate", "balances", "statement", "fx", "payment")
+BENCH_LOGIN = "benchmark"
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not ordered:
+        return math.nan
+    position = (len(ordered) - 1) * fraction
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class BenchContext:
+    """Logged-in state shared by every scenario."""
+
+    def __init__(self) -> None:
+        self.manager = TokenManager(BENCH_LOGIN, "benchmark", cache=TokenCache(enabled=False))
+        self.token = self.manager.get_token()
+        self.customer_id = self.manager.customer_id
+        self.accounts = fetch_balances(self.token, self.customer_id)
+        self.end_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start_date = self.end_date - timedelta(days=30)
+
+
+def _check(result: dict) -> dict:
+    if result.get("problems"):
+        raise ValueError(str(result["problems"]))
+    return result
+
+
+def op_authenticate(ctx: BenchContext, _index: int) -> None:
+    TokenManager(BENCH_LOGIN, "benchmark", cache=TokenCache(enabled=False)).login()
+
+
+def op_balances(ctx: BenchContext, _index: int) -> None:
+    fetch_balances(ctx.token, ctx.customer_id)
+
+
+def op_statement(ctx: BenchContext, index: int) -> None:
+    account = ctx.accounts[index % len(ctx.accounts)]
+    data = fetch_statement(ctx.token, account["accountId"], ctx.start_date, ctx.end_date)
+    display_statement(data, ctx.start_date, ctx.end_date)
+
+
+def op_fx(ctx: BenchContext, _index: int) -> None:
+    quote = _check(get_quote(ctx.token, "EUR", "USD", Decimal("100"), "EUR"))["quote"]
+    _check(book_deal(ctx.token, quote["quoteId"]))
+
+
+def op_payment(ctx: BenchContext, index: int) -> None:
+    payment = _check(create_payment(ctx.token, ctx.customer_id, "BENCH-PAYEE", Decimal("1.00"), "USD", external_reference=f"bench-{index}"))["payment"]
+    _check(confirm_payment(ctx.token, payment["paymentId"], payment["timestamp"]))
+
+
+OPERATIONS: dict[str, Callable[[BenchContext, int], None]] = {
+    "authenticate": op_authenticate,
+    "balances": op_balances,
+    "statement": op_statement,
+    "fx": op_fx,
+    "payment": op_payment,
+}
+
+
+def run_scenario(ctx: BenchContext, name: str, concurrency: int, count: int, warmup: int) -> dict:
+    """Run ``count`` operations of one scenario on ``concurrency`` workers and summarise them."""
+    operation = OPERATIONS[name]
+
+    def timed(index: int) -> tuple[float, str | None]:
+        started = time.perf_counter()
+        try:
+            operation(ctx, index)
+        except (requests.RequestException, ValueError, KeyError, TypeError) as exc:
+            return time.perf_counter() - started, f"{type(exc).__name__}: {exc}"
+        return time.perf_counter() - started, None
+
+    configure_session(pool_size=concurrency)
+    list(bounded_map(timed, range(warmup), concurrency))
+
+    started = time.perf_counter()
+    outcomes = list(bounded_map(timed, range(count), concurrency))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(seconds * 1000 for seconds, error in outcomes if error is None)
+    errors = [error for _seconds, error in outcomes if error is not None]
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "operations": count,
+        "errors": len(errors),
+        "firstError": errors[0] if errors else None,
+        "seconds": round(elapsed, 4),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "meanMs": round(sum(latencies) / len(latencies), 3) if latencies else None,
+        "p50Ms": round(percentile(latencies, 0.50), 3) if latencies else None,
+        "p95Ms": round(percentile(latencies, 0.95), 3) if latencies else None,
+        "p99Ms": round(percentile(latencies, 0.99), 3) if latencies else None,
+        "maxMs": round(latencies[-1], 3) if latencies else None,
+    }
+
+
+def git_revision() -> str | None:
+    """Current commit of the working tree, for labelling results."""
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def print_results(results: list[dict]) -> None:
+    print(f"\n{'Scenario':<14}{'Conc':>6}{'Ops':>7}{'Err':>6}{'Ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    print("-" * 83)
+    for result in results:
+        cells = [f"{result[key]:>10.2f}" if result[key] is not None else f"{'-':>10}" for key in ("throughput", "p50Ms", "p95Ms", "p99Ms", "maxMs")]
+        print(f"{result['scenario']:<14}{result['concurrency']:>6}{result['operations']:>7}{result['errors']:>6}{''.join(cells)}")
+
+
+def print_comparison(results: list[dict], baseline_path: Path) -> None:
+    """Print throughput and p95 change against a previous results file."""
+    try:
+        with open(baseline_path, encoding="utf-8") as handle:
+            baseline = {(r["scenario"], r["concurrency"]): r for r in json.load(handle).get("results", [])}
+    except (OSError, ValueError) as exc:
+        print(f"Warning: Cannot read baseline {baseline_path}: {exc}", file=sys.stderr)
+        return
+
+    def change(new: float | None, old: float | None) -> str:
+        if not new or not old:
+            return f"{'-':>10}"
+        return f"{(new - old) / old * 100:>+9.1f}%"
+
+    print(f"\n=== COMPARED WITH {baseline_path} ===")
+    print(f"\n{'Scenario':<14}{'Conc':>6}{'Ops/s':>10}{'p95 ms':>10}")
+    print("-" * 40)
+    for result in results:
+        old = baseline.get((result["scenario"], result["concurrency"]))
+        if old is None:
+            continue
+        print(f"{result['scenario']:<14}{result['concurrency']:>6}{change(result['throughput'], old['throughput'])}{change(result['p95Ms'], old['p95Ms'])}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the API client against the local mock server.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS), help="Scenarios to run (default all)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32], help="Concurrency levels (default 1 8 32)")
+    parser.add_argument("--requests", type=int, default=200, help="Operations per scenario and level (default 200)")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed operations before each run (default 10)")
+    parser.add_argument("--url", help="Use an already running mock at this base URL instead of starting one")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock latency per request in ms (default 0)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Mock latency standard deviation in ms (default 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock failure rate (default 0)")
+    parser.add_argument("--entries-per-day", type=int, default=5, help="Mock statement entries per day (default 5)")
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"), help="Results file (default benchmark.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier results file to compare against")
+    parser.add_argument("--rate-limit", action="store_true", help="Turn the client-side rate limiter on (WALLET_RATE_LIMITS, else the defaults)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if min(args.concurrency) < 1 or args.requests < 1:
+        print("Error: --concurrency and --requests must be at least 1.", file=sys.stderr)
+        sys.exit(1)
+
+    configure_limits((parse_rate_limits(os.environ.get("WALLET_RATE_LIMITS", "")) or RATE_LIMITS) if args.rate_limit else None)
+
+    config = MockConfig(latency_ms=args.latency, jitter_ms=args.jitter, error_rate=args.error_rate, entries_per_day=args.entries_per_day, seed=1)
+    server = None
+    if args.url:
+        api_client.BASE_URL = args.url.rstrip("/")
+    else:
+        server = start_server(config)
+        api_client.BASE_URL = server.base_url
+
+    print("\n=== BENCHMARK ===")
+    print(f"  Target:      {api_client.BASE_URL}{'' if args.url else ' (in-process mock)'}")
+    print(f"  Scenarios:   {', '.join(args.scenarios)}")
+    print(f"  Concurrency: {', '.join(map(str, args.concurrency))}  ({args.requests} ops each)")
+
+    results = []
+    try:
+        # The client and display_statement print progress; keep it out of the report.
+        with contextlib.redirect_stdout(io.StringIO()):
+            ctx = BenchContext()
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = run_scenario(ctx, name, concurrency, args.requests, args.warmup)
+                results.append(result)
+                print(f"  {name:<14} x{concurrency:<4} {result['throughput'] or 0:>9.1f} ops/s  p95 {result['p95Ms'] or 0:>8.2f} ms  errors {result['errors']}")
+    except requests.RequestException as exc:
+        print(f"Error: Benchmark setup failed: {exc}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print_results(results)
+    report = {
+        "timestamp": datetime.now(tz=timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "target": "external" if args.url else "in-process mock",
+        "mock": None if args.url else vars(config),
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "rateLimits": limiter_stats() if args.rate_limit else None,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
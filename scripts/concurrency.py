@@ -0,0 +1,52 @@
+"""Bounded thread-pool helpers shared by the batch scripts.
+
+``bounded_map`` keeps at most ``max_pending`` tasks queued at once, so
+arbitrarily large (streamed) inputs run in constant memory.
+"""
+
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def bounded_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    workers: int,
+    ordered: bool = False,
+    max_pending: int | None = None,
+) -> Iterator[R]:
+    """Apply ``fn`` to ``items`` on ``workers`` threads and yield the results.
+
+    Results are yielded as they complete, or in input order when ``ordered``
+    is true. Exceptions raised by ``fn`` propagate to the caller; have ``fn``
+    catch and return errors when one failure must not stop the batch.
+    """
+    max_pending = max_pending or workers * 2
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if ordered:
+            queue: deque[Future] = deque()
+            for item in items:
+                if len(queue) >= max_pending:
+                    yield queue.popleft().result()
+                queue.append(executor.submit(fn, item))
+            while queue:
+                yield queue.popleft().result()
+            return
+
+        pending: set[Future] = set()
+        for item in items:
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(fn, item))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -1,4 +1,4 @@
-"""Fetch and display available payment currencies.
+"""Fetch and display available payment currencies (cached, see ``reference_data.py``).
 
 Usage:
     python scripts/currency_list.py
@@ -8,7 +8,8 @@ import sys
 
 import requests
 
-from api_client import BASE_URL, auth_headers, authenticate
+from api_client import authenticate
+from reference_data import payment_currencies
 
 
 def main() -> None:
@@ -16,15 +17,11 @@ def main() -> None:
 
     print("\nFetching payment currencies...")
     try:
-        response = requests.get(f"{BASE_URL}/PaymentCurrencyList", headers=auth_headers(token), timeout=30)
-        response.raise_for_status()
+        currencies = payment_currencies(token)
     except requests.HTTPError as exc:
         print(f"Failed to retrieve currency list: {exc}", file=sys.stderr)
         sys.exit(1)
 
-    data = response.json()
-    currencies = data.get("currencies", [])
-
     if not currencies:
         print("No currencies available.")
         return
@@ -0,0 +1,453 @@
+"""Upload and download KYC documents (selfies, ID scans) as file attachments.
+
+Python counterpart to ``upload_selfie_curl.sh``, ``upload_passport_curl.sh``
+and ``download_selfie_curl.sh``, over the shared pooled session.
+
+The API carries file contents as a base64 string inside the JSON body
+(``FileData``, see ``refs/DTO/FileAttachmentAddFileDTO.cs``). Neither
+direction ever holds the whole encoded file in memory:
+
+* Uploads memory-map the source file and base64-encode it chunk by chunk
+  while the request body is being sent. The body length is known up front,
+  so it goes out with a normal ``Content-Length``.
+* Downloads stream the response and decode ``FileData`` chunk by chunk
+  straight into the output file. Only the rest of the JSON (the metadata) is
+  kept and parsed.
+
+Many documents can be uploaded at once from a CSV/JSONL manifest, with
+outcomes written to a results ledger, as ``batch_payment.py`` does for payments.
+
+Manifest columns (CSV header or JSONL keys):
+    file            Path to the image (required)
+    type            selfie, id-front or id-back (required)
+    customer_id     Customer to attach it to (default: the logged-in customer)
+    sum_subtype_id  CountryIdentificationTypeId for ID documents (default 0)
+
+Usage:
+    python scripts/file_attachment.py --upload selfie.jpg --type selfie
+    python scripts/file_attachment.py --upload Passport-Datapage.jpg --type id-front --sum-subtype-id 123
+    python scripts/file_attachment.py --upload-batch scans.csv --workers 8 --ledger scans.results.csv
+    python scripts/file_attachment.py --download <fileAttachmentId> -o selfie_downloaded.png
+    python scripts/file_attachment.py --download <id1> --download <id2> --out-dir downloads/ --workers 8
+    python scripts/file_attachment.py --list
+"""
+
+import argparse
+import binascii
+import csv
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from functools import partial
+from pathlib import Path
+
+import requests
+
+from api_client import api_request, authenticate, check_response, configure_session
+from batch_input import read_rows
+from concurrency import bounded_map
+from models import loads, response_json
+
+# Customer (ParentObjectTypeId 21); FileAttachmentTypeId from src/types/verification.types.ts.
+PARENT_OBJECT_TYPE_CUSTOMER = 21
+
+DOCUMENT_TYPES = {
+    "selfie": {"FileAttachmentTypeId": 3, "ContainsFront": False, "ContainsBack": False, "Description": "documentType: Selfie", "BypassFileAnalysis": True},
+    "id-front": {
+        "FileAttachmentTypeId": 1,
+        "ContainsFront": True,
+        "ContainsBack": False,
+        "Description": "documentType: Proof of Identity",
+        "BypassFileAnalysis": False,
+    },
+    "id-back": {
+        "FileAttachmentTypeId": 2,
+        "ContainsFront": False,
+        "ContainsBack": True,
+        "Description": "documentType: Proof of Identity",
+        "BypassFileAnalysis": False,
+    },
+}
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+# Raw bytes per encoded chunk: a multiple of 3, so chunks encode without padding.
+ENCODE_CHUNK = 3 * 256 * 1024
+DECODE_CHUNK = 256 * 1024
+
+LEDGER_FIELDS = ["line", "file", "type", "customer_id", "status", "file_attachment_id", "bytes", "upload_ms", "error"]
+
+_FILE_DATA_KEY = re.compile(rb'"(?:FileData|fileData)"\s*:\s*"')
+_JSON_ESCAPE = re.compile(rb"\\u([0-9a-fA-F]{4})|\\(.)", re.DOTALL)
+
+
+class Base64JsonBody:
+    """JSON request body whose last field is a file, base64-encoded while it is read.
+
+    Sized (``len()``) and rewindable (``seek(0)``), so requests sends it with a
+    ``Content-Length`` and ``api_request`` can resend it after a token refresh.
+    """
+
+    def __init__(self, fields: dict, path: Path, key: str = "FileData", chunk_size: int = ENCODE_CHUNK) -> None:
+        self._prefix = (json.dumps(fields)[:-1] + f', "{key}": "').encode() if fields else f'{{"{key}": "'.encode()
+        self._suffix = b'"}'
+        self._chunk_size = chunk_size
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Zero-length files cannot be mapped.
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self._length = len(self._prefix) + 4 * math.ceil(self.size / 3) + len(self._suffix)
+        self.seek(0)
+
+    def _pieces(self) -> Iterator[bytes]:
+        yield self._prefix
+        for start in range(0, self.size, self._chunk_size):
+            yield binascii.b2a_base64(self._map[start : start + self._chunk_size], newline=False)
+        yield self._suffix
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if offset != 0 or whence != 0:
+            raise OSError("Base64JsonBody can only be rewound to the start")
+        self._iter = self._pieces()
+        self._piece = b""
+        self._offset = 0
+        return 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            rest = [self._piece[self._offset :], *self._iter]
+            self._piece, self._offset = b"", 0
+            return b"".join(rest)
+        while self._offset >= len(self._piece):
+            self._piece = next(self._iter, None)
+            self._offset = 0
+            if self._piece is None:
+                self._piece = b""
+                return b""
+        chunk = self._piece[self._offset : self._offset + size]
+        self._offset += len(chunk)
+        return chunk
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(partial(self.read, self._chunk_size), b"")
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "Base64JsonBody":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _Base64Writer:
+    """Decode the contents of a JSON base64 string, fed in arbitrary pieces, into a binary file."""
+
+    def __init__(self, handle) -> None:
+        self._handle = handle
+        self._pending = b""
+        self.written = 0
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        data = self._pending + data
+        self._pending = b""
+        if b"\\" in data:
+            # Base64 needs no escaping, but ``/`` may come as ``\\/`` and ``+`` as ``\\u002B``.
+            cut = -1 if final else data.rfind(b"\\", max(0, len(data) - 5))
+            if cut != -1:
+                data, self._pending = data[:cut], data[cut:]
+            data = _JSON_ESCAPE.sub(lambda match: bytes([int(match[1], 16)]) if match[1] else match[2], data)
+        usable = len(data) if final else len(data) - len(data) % 4
+        if usable < len(data):
+            self._pending = data[usable:] + self._pending
+        if usable:
+            decoded = binascii.a2b_base64(data[:usable])
+            self._handle.write(decoded)
+            self.written += len(decoded)
+
+
+def upload_fields(customer_id: str, document_type: str, file_name: str, sum_subtype_id: int = 0) -> dict:
+    """``FileAttachmentAddFileRequest`` fields (without ``FileData``), as the web client sends them."""
+    return {
+        "ParentObjectId": customer_id,
+        "ParentObjectTypeId": PARENT_OBJECT_TYPE_CUSTOMER,
+        "SourceIP": "",
+        "FileAttachmentTypeId": DOCUMENT_TYPES[document_type]["FileAttachmentTypeId"],
+        "FileAttachmentSubTypeId": 0,
+        "SumSubTypeId": sum_subtype_id if document_type != "selfie" else 0,
+        "FileName": file_name,
+        "GroupName": "",
+        "Properties": None,
+        "IsPrimary": True,
+        "ContainsFront": DOCUMENT_TYPES[document_type]["ContainsFront"],
+        "ContainsBack": DOCUMENT_TYPES[document_type]["ContainsBack"],
+        "ViewableByBanker": True,
+        "ViewableByCustomer": True,
+        "DeletableByCustomer": False,
+        "Description": DOCUMENT_TYPES[document_type]["Description"],
+        "BypassFileAnalysis": DOCUMENT_TYPES[document_type]["BypassFileAnalysis"],
+    }
+
+
+def upload_file(token: str, customer_id: str, path: Path, document_type: str, sum_subtype_id: int = 0) -> dict:
+    """Upload one document (POST /FileAttachment), streaming its base64 encoding.
+
+    Returns ``{"fileAttachmentId", "properties", "bytes"}``; ``properties``
+    holds the OCR fields the API extracted from ID documents. Raises
+    ValueError when the API rejects the upload.
+    """
+    if document_type not in DOCUMENT_TYPES:
+        raise ValueError(f"unknown document type {document_type!r} (expected one of {', '.join(DOCUMENT_TYPES)})")
+    if path.suffix.lower() not in IMAGE_SUFFIXES:
+        raise ValueError(f"{path.name}: document must be .jpg/.jpeg/.png")
+
+    with Base64JsonBody(upload_fields(customer_id, document_type, path.name, sum_subtype_id), path) as body:
+        data = response_json(api_request("POST", "/FileAttachment", token, data=body))
+    check_response(data, "Upload")
+
+    attachment = data.get("FileAttachment") or data.get("fileAttachment") or {}
+    attachment_id = attachment.get("FileAttachmentId") or attachment.get("fileAttachmentId")
+    if not attachment_id:
+        raise ValueError("Upload accepted but FileAttachmentId missing from response")
+    return {"fileAttachmentId": attachment_id, "properties": attachment.get("Properties") or attachment.get("properties"), "bytes": body.size}
+
+
+def split_file_data(chunks: Iterable[bytes], handle) -> tuple[bytes, int]:
+    """Decode the ``FileData`` string of a streamed JSON body into ``handle``.
+
+    Returns (the JSON with ``FileData`` replaced by null, bytes written);
+    bytes written is -1 when the body had no ``FileData`` string.
+    """
+    meta = bytearray()
+    writer = None
+    state = "scan"
+    carry = b""
+    for chunk in chunks:
+        if state == "rest":
+            meta += chunk
+            continue
+        if state == "scan":
+            data = carry + chunk
+            match = _FILE_DATA_KEY.search(data)
+            if match is None:
+                # Keep enough of the end to find a key split across chunks.
+                keep = max(0, len(data) - 32)
+                meta += data[:keep]
+                carry = data[keep:]
+                continue
+            meta += data[: match.start()] + b'"FileData": null'
+            chunk, carry = data[match.end() :], b""
+            writer = _Base64Writer(handle)
+            state = "value"
+        end = chunk.find(b'"')
+        if end == -1:
+            writer.feed(chunk)
+            continue
+        writer.feed(chunk[:end], final=True)
+        meta += chunk[end + 1 :]
+        state = "rest"
+    if state == "value":
+        raise ValueError("response ended inside FileData")
+    meta += carry
+    return bytes(meta), writer.written if writer else -1
+
+
+def download_file(token: str, attachment_id: str, output: Path | None = None, out_dir: Path = Path()) -> dict:
+    """Download one attachment (GET /FileAttachment/{id}), decoding ``FileData`` into a file as it arrives.
+
+    The file goes to ``output``, or to ``<id>_<FileName>`` in ``out_dir``. It
+    is written under a ``.part`` name and renamed once complete. Returns the
+    attachment metadata plus ``path`` and ``bytes``. Raises ValueError when
+    the API reports problems or returns no file data.
+    """
+    partial_path = output.with_name(f"{output.name}.part") if output else out_dir / f"{attachment_id}.part"
+    response = api_request("GET", f"/FileAttachment/{attachment_id}", token, stream=True)
+    try:
+        with open(partial_path, "wb") as handle:
+            meta, written = split_file_data(response.iter_content(DECODE_CHUNK), handle)
+        data = loads(meta)
+        check_response(data, "Download")
+        if written < 0:
+            raise ValueError(f"No FileData in the response for {attachment_id}")
+        attachment = data.get("FileAttachment") or data.get("fileAttachment") or {}
+        file_name = Path(attachment.get("FileName") or attachment.get("fileName") or "file.bin").name
+        target = output or out_dir / f"{attachment_id}_{file_name}"
+        os.replace(partial_path, target)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        raise
+    finally:
+        response.close()
+    return {**attachment, "path": target, "bytes": written}
+
+
+def list_attachments(token: str, customer_id: str) -> list[dict]:
+    """File attachments of a customer (GET /FileAttachmentInfoList/{customerId}), without file data."""
+    data = response_json(api_request("GET", f"/FileAttachmentInfoList/{customer_id}", token))
+    check_response(data, "List attachments")
+    return data.get("FileAttachments") or data.get("fileAttachments") or []
+
+
+def upload_row(row: dict, token: str, default_customer_id: str) -> dict:
+    """Upload one manifest row and return its ledger record. Never raises for per-row problems."""
+    record = {name: row.get(name, "") for name in LEDGER_FIELDS}
+    record.update(customer_id=row.get("customer_id") or default_customer_id, status="failed", error="")
+    started = time.monotonic()
+    try:
+        path = Path(str(row.get("file") or "").strip())
+        if not path.name:
+            raise ValueError("file is required")
+        if not path.is_file():
+            raise ValueError(f"file not found: {path}")
+        document_type = str(row.get("type") or "").strip().lower()
+        result = upload_file(token, record["customer_id"], path, document_type, int(row.get("sum_subtype_id") or 0))
+        record.update(status="uploaded", file_attachment_id=result["fileAttachmentId"], bytes=result["bytes"])
+    except (requests.RequestException, ValueError, OSError) as exc:
+        record["error"] = str(exc)
+    record["upload_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return record
+
+
+def upload_batch(token: str, customer_id: str, rows: Iterable[dict], workers: int) -> Iterator[dict]:
+    """Upload manifest rows concurrently, yielding ledger records as uploads finish."""
+    return bounded_map(partial(upload_row, token=token, default_customer_id=customer_id), rows, workers)
+
+
+def download_batch(token: str, attachment_ids: list[str], out_dir: Path, workers: int) -> Iterator[tuple[str, dict | Exception]]:
+    """Download attachments concurrently into ``out_dir``, yielding (id, metadata or the error) as they finish."""
+
+    def worker(attachment_id: str) -> tuple[str, dict | Exception]:
+        try:
+            return attachment_id, download_file(token, attachment_id, out_dir=out_dir)
+        except (requests.RequestException, ValueError, OSError) as exc:
+            return attachment_id, exc
+
+    return bounded_map(worker, attachment_ids, workers)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Upload and download KYC document file attachments.")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--upload", type=Path, metavar="FILE", help="Upload one image")
+    action.add_argument("--upload-batch", type=Path, metavar="MANIFEST", help="Upload every document listed in a CSV/JSONL manifest")
+    action.add_argument("--download", action="append", metavar="ID", help="Download an attachment by FileAttachmentId (repeatable)")
+    action.add_argument("--list", action="store_true", help="List the customer's attachments")
+    parser.add_argument("--type", choices=DOCUMENT_TYPES, help="Document type for --upload")
+    parser.add_argument("--sum-subtype-id", type=int, default=0, help="CountryIdentificationTypeId for ID documents (default 0)")
+    parser.add_argument("--customer", help="Customer ID (default: the logged-in customer)")
+    parser.add_argument("-o", "--output", type=Path, help="Output file for a single --download (default <id>_<file name>)")
+    parser.add_argument("--out-dir", type=Path, help="Directory for downloads (default: current directory)")
+    parser.add_argument("--ledger", type=Path, help="Results ledger CSV for --upload-batch (default <manifest>.ledger.csv)")
+    parser.add_argument("--workers", type=int, default=8, help="Transfers in flight at once (default 8)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.workers < 1:
+        print("Error: --workers must be at least 1.", file=sys.stderr)
+        sys.exit(1)
+    if args.upload is not None and (args.type is None or not args.upload.is_file()):
+        print("Error: --upload needs an existing file and --type." if args.type is None else f"Error: File not found: {args.upload}", file=sys.stderr)
+        sys.exit(1)
+    if args.upload_batch is not None and not args.upload_batch.is_file():
+        print(f"Error: Manifest not found: {args.upload_batch}", file=sys.stderr)
+        sys.exit(1)
+    if args.download and args.output and len(args.download) > 1:
+        print("Error: -o/--output takes a single --download; use --out-dir for several.", file=sys.stderr)
+        sys.exit(1)
+
+    configure_session(pool_size=args.workers)
+    token, customer_id = authenticate()
+    customer_id = args.customer or customer_id
+
+    if args.upload is not None:
+        print(f"\n=== UPLOAD {args.type.upper()} ===")
+        try:
+            result = upload_file(token, customer_id, args.upload, args.type, args.sum_subtype_id)
+        except (requests.RequestException, ValueError) as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        print(f"  File:             {args.upload} ({result['bytes']:,} bytes)")
+        print(f"  FileAttachmentId: {result['fileAttachmentId']}")
+        for name, value in (result["properties"] or {}).items():
+            print(f"  {name + ':':<18}{value}")
+
+    elif args.upload_batch is not None:
+        ledger_path = args.ledger or args.upload_batch.with_suffix(".ledger.csv")
+        print(f"\n=== DOCUMENT UPLOAD ({args.workers} workers) ===")
+        print(f"  Ledger: {ledger_path}\n")
+        counts: Counter[str] = Counter()
+        total_bytes = 0
+        started = time.monotonic()
+        with open(ledger_path, "w", encoding="utf-8", newline="") as ledger_file:
+            ledger = csv.DictWriter(ledger_file, fieldnames=LEDGER_FIELDS)
+            ledger.writeheader()
+            for record in upload_batch(token, customer_id, read_rows(args.upload_batch), args.workers):
+                counts[record["status"]] += 1
+                total_bytes += record["bytes"] or 0
+                ledger.writerow(record)
+                ledger_file.flush()
+        elapsed = time.monotonic() - started
+        print("Summary:")
+        for status in ("uploaded", "failed"):
+            print(f"  {status:<14}{counts[status]:>8}")
+        print(f"\nUploaded {total_bytes / 1e6:,.1f} MB in {elapsed:.2f}s ({total_bytes / 1e6 / max(elapsed, 1e-9):,.1f} MB/s).")
+        if counts["failed"]:
+            sys.exit(1)
+
+    elif args.download:
+        print(f"\n=== DOWNLOAD ({len(args.download)} attachment(s)) ===")
+        out_dir = args.out_dir or Path()
+        out_dir.mkdir(parents=True, exist_ok=True)
+        failed = 0
+        results = (
+            download_batch(token, args.download, out_dir, args.workers)
+            if args.output is None
+            else [(args.download[0], _download_to(token, args.download[0], args.output))]
+        )
+        for attachment_id, result in results:
+            if isinstance(result, Exception):
+                failed += 1
+                print(f"  {attachment_id}: failed: {result}", file=sys.stderr)
+            else:
+                print(f"  {attachment_id}: {result['path']} ({result['bytes']:,} bytes)")
+        if failed:
+            sys.exit(1)
+
+    else:
+        try:
+            attachments = list_attachments(token, customer_id)
+        except (requests.RequestException, ValueError) as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\n=== FILE ATTACHMENTS ({len(attachments)}) ===")
+        for item in attachments:
+            attachment_id = item.get("FileAttachmentId") or item.get("fileAttachmentId")
+            type_name = item.get("FileAttachmentTypeName") or item.get("fileAttachmentTypeName") or item.get("FileAttachmentTypeId")
+            print(f"  {attachment_id}  {str(type_name):<24}{item.get('FileName') or item.get('fileName') or ''}")
+
+    print("\n=== COMPLETE ===")
+
+
+def _download_to(token: str, attachment_id: str, output: Path) -> dict | Exception:
+    try:
+        return download_file(token, attachment_id, output)
+    except (requests.RequestException, ValueError, OSError) as exc:
+        return exc
+
+
+if __name__ == "__main__":
+    main()
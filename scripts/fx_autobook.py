@@ -0,0 +1,341 @@
+"""Quote and book FX deals automatically when rate rules are met.
+
+For each deal a quote is requested (POST /FXDealQuote), checked against the
+deal's rate limits and booked straight away (PATCH
+/FXDealQuote/{quoteId}/BookAndInstantDeposit), with no prompt in between.
+If less than ``--min-remaining`` seconds of the quote's validity are left
+by the time it would be booked, it is re-quoted (up to ``--max-requotes``
+times) rather than booked late.
+
+Quote validity is taken from the server's ``quoteTime``/``expirationTime``
+and counted down from when the quote was requested, so local clock skew
+does not matter. Quote, book and quote-to-book latencies are recorded for
+every deal.
+
+Deals come from the command line (one deal) or a CSV/JSONL file (many deals,
+booked concurrently, outcomes written to a results ledger).
+
+Input columns (CSV header or JSONL keys):
+    buy_currency      Currency to buy (required)
+    sell_currency     Currency to sell (required)
+    amount            Positive amount, within the currency's FX amount scale (required)
+    amount_currency   Currency of ``amount`` (default: buy_currency)
+    min_rate          Book only if the quoted rate is at least this (optional)
+    max_rate          Book only if the quoted rate is at most this (optional)
+    reference         Your reference, copied to the ledger (optional)
+
+Re-running a file books its deals again; remove booked rows first.
+
+Usage:
+    python scripts/fx_autobook.py --buy EUR --sell USD --amount 1000 --max-rate 1.09
+    python scripts/fx_autobook.py deals.csv --workers 8 --ledger deals.results.csv
+    python scripts/fx_autobook.py deals.jsonl --dry-run
+"""
+
+import argparse
+import csv
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from functools import partial
+from pathlib import Path
+
+import requests
+
+from api_client import authenticate, configure_session
+from batch_input import read_rows
+from concurrency import bounded_map
+from fx_deal import book_deal, get_quote, parse_deal
+from money import to_decimal
+from reference_data import amount_scales, fx_currency_sides
+
+LEDGER_FIELDS = [
+    "line",
+    "reference",
+    "buy_currency",
+    "sell_currency",
+    "amount",
+    "amount_currency",
+    "status",
+    "rate",
+    "quote_reference",
+    "fx_deal_reference",
+    "deposit_reference",
+    "quotes",
+    "quote_ms",
+    "book_ms",
+    "quote_to_book_ms",
+    "error",
+]
+
+STATUSES = ("booked", "would_book", "rejected", "expired", "quote_failed", "book_failed", "invalid")
+
+
+def _parse_time(value: str | None) -> datetime | None:
+    """Parse an API timestamp; the 7-digit fraction is cut to the 6 ``datetime`` accepts."""
+    if not value:
+        return None
+    head, dot, fraction = value.partition(".")
+    if dot:
+        digits = "".join(ch for ch in fraction if ch.isdigit())
+        value = f"{head}.{digits[:6]}{fraction[len(digits) :]}"
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def quote_validity(quote: dict) -> float | None:
+    """Seconds between ``quoteTime`` and ``expirationTime``, or None if unknown."""
+    quoted = _parse_time(quote.get("quoteTime"))
+    expires = _parse_time(quote.get("expirationTime"))
+    if quoted is None or expires is None or (quoted.tzinfo is None) != (expires.tzinfo is None):
+        return None
+    return (expires - quoted).total_seconds()
+
+
+def validate_deal(row: dict, buy_scales: dict[str, int], sell_scales: dict[str, int]) -> dict:
+    """Normalise a raw deal row against the FX currency lists. Raises ValueError describing the first problem found."""
+    buy = str(row.get("buy_currency") or "").strip().upper()
+    sell = str(row.get("sell_currency") or "").strip().upper()
+    if not buy or not sell:
+        raise ValueError("buy_currency and sell_currency are required")
+    if buy == sell:
+        raise ValueError("buy_currency and sell_currency must differ")
+
+    amount_ccy = str(row.get("amount_currency") or buy).strip().upper()
+    amount = parse_deal(buy_scales, sell_scales, buy, sell, row.get("amount"), amount_ccy)
+
+    min_rate = to_decimal(row["min_rate"]) if row.get("min_rate") not in (None, "") else None
+    max_rate = to_decimal(row["max_rate"]) if row.get("max_rate") not in (None, "") else None
+    return {
+        "line": row.get("line", ""),
+        "reference": str(row.get("reference") or ""),
+        "buy_currency": buy,
+        "sell_currency": sell,
+        "amount": amount,
+        "amount_currency": amount_ccy,
+        "min_rate": min_rate,
+        "max_rate": max_rate,
+    }
+
+
+def check_rate(deal: dict, rate: Decimal) -> str | None:
+    """Return why ``rate`` breaks the deal's limits, or None if it may be booked."""
+    if deal["min_rate"] is not None and rate < deal["min_rate"]:
+        return f"rate {rate} below min_rate {deal['min_rate']}"
+    if deal["max_rate"] is not None and rate > deal["max_rate"]:
+        return f"rate {rate} above max_rate {deal['max_rate']}"
+    return None
+
+
+def ledger_record(deal: dict, status: str, **fields) -> dict:
+    """Build a ledger row for ``deal`` with the given outcome."""
+    record = {name: deal.get(name, "") for name in LEDGER_FIELDS}
+    record.update(status=status, error="")
+    record.update(fields)
+    return record
+
+
+def request_quote(token: str, deal: dict) -> tuple[dict, float, float]:
+    """Request a quote. Returns (quote, requested_at, received_at) on the monotonic clock.
+
+    Raises ValueError when the API reports problems or returns no quote.
+    """
+    requested_at = time.monotonic()
+    result = get_quote(token, deal["buy_currency"], deal["sell_currency"], deal["amount"], deal["amount_currency"])
+    received_at = time.monotonic()
+    if result.get("problems"):
+        raise ValueError(str(result["problems"]))
+    quote = result.get("quote") or {}
+    if not quote.get("quoteId"):
+        raise ValueError("No quote returned.")
+    return quote, requested_at, received_at
+
+
+def quote_and_book(deal: dict, token: str, min_remaining: float, max_requotes: int, dry_run: bool = False) -> dict:
+    """Quote, check rules and book one deal. Never raises; the outcome is returned as a ledger row."""
+    quotes = 0
+    while True:
+        quotes += 1
+        try:
+            quote, requested_at, received_at = request_quote(token, deal)
+            rate = to_decimal(quote.get("rate"))
+        except (requests.RequestException, ValueError) as exc:
+            return ledger_record(deal, "quote_failed", quotes=quotes, error=str(exc))
+
+        timings = {
+            "rate": rate,
+            "quote_reference": quote.get("quoteReference") or "",
+            "quotes": quotes,
+            "quote_ms": round((received_at - requested_at) * 1000, 1),
+        }
+        problem = check_rate(deal, rate)
+        if problem:
+            return ledger_record(deal, "rejected", error=problem, **timings)
+
+        validity = quote_validity(quote)
+        # Count down from the request: the quote cannot have been issued before it was sent.
+        remaining = None if validity is None else requested_at + validity - time.monotonic()
+        if remaining is None or remaining >= min_remaining:
+            break
+        if quotes > max_requotes:
+            return ledger_record(deal, "expired", error=f"only {remaining:.1f}s of quote validity left", **timings)
+
+    if dry_run:
+        return ledger_record(deal, "would_book", **timings)
+
+    book_started = time.monotonic()
+    try:
+        result = book_deal(token, quote["quoteId"])
+        error = result.get("problems")
+    except requests.RequestException as exc:
+        result, error = {}, exc
+    booked_at = time.monotonic()
+    timings.update(book_ms=round((booked_at - book_started) * 1000, 1), quote_to_book_ms=round((booked_at - received_at) * 1000, 1))
+    if error:
+        return ledger_record(deal, "book_failed", error=str(error), **timings)
+
+    fx_data = result.get("fxDepositData") or {}
+    return ledger_record(
+        deal,
+        "booked",
+        fx_deal_reference=fx_data.get("fxDealReference") or "",
+        deposit_reference=fx_data.get("depositReference") or "",
+        **timings,
+    )
+
+
+def process_deal(
+    row: dict, token: str, buy_scales: dict[str, int], sell_scales: dict[str, int], min_remaining: float, max_requotes: int, dry_run: bool
+) -> dict:
+    try:
+        deal = validate_deal(row, buy_scales, sell_scales)
+    except ValueError as exc:
+        return ledger_record(row, "invalid", error=str(exc))
+    return quote_and_book(deal, token, min_remaining, max_requotes, dry_run)
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def print_latency(records: list[dict]) -> None:
+    """Print min/p50/p95/max of the recorded latencies."""
+    print(f"\n{'Latency (ms)':<18}{'min':>10}{'p50':>10}{'p95':>10}{'max':>10}")
+    print("-" * 58)
+    for field in ("quote_ms", "book_ms", "quote_to_book_ms"):
+        values = [record[field] for record in records if record.get(field) not in (None, "")]
+        if values:
+            print(f"{field:<18}{min(values):>10.1f}{_percentile(values, 0.5):>10.1f}{_percentile(values, 0.95):>10.1f}{max(values):>10.1f}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Quote and book FX deals automatically when rate rules are met.")
+    parser.add_argument("input", type=Path, nargs="?", help="CSV or JSONL file of deals (omit to book one deal from the flags)")
+    parser.add_argument("--buy", help="Currency to buy (single deal)")
+    parser.add_argument("--sell", help="Currency to sell (single deal)")
+    parser.add_argument("--amount", help="Amount (single deal)")
+    parser.add_argument("--amount-currency", help="Currency of --amount (default: --buy)")
+    parser.add_argument("--min-rate", help="Book only if the quoted rate is at least this")
+    parser.add_argument("--max-rate", help="Book only if the quoted rate is at most this")
+    parser.add_argument("--min-remaining", type=float, default=5.0, help="Re-quote if fewer seconds of validity are left (default 5)")
+    parser.add_argument("--max-requotes", type=int, default=2, help="Re-quotes allowed per deal (default 2)")
+    parser.add_argument("--workers", type=int, default=8, help="Deals in flight at once (default 8)")
+    parser.add_argument("--ledger", type=Path, help="Results ledger CSV (default <input>.ledger.csv)")
+    parser.add_argument("--dry-run", action="store_true", help="Quote and check rules, but do not book")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.input is None:
+        if not (args.buy and args.sell and args.amount):
+            print("Error: Give an input file, or --buy, --sell and --amount.", file=sys.stderr)
+            sys.exit(1)
+        rows = [
+            {
+                "buy_currency": args.buy,
+                "sell_currency": args.sell,
+                "amount": args.amount,
+                "amount_currency": args.amount_currency,
+                "min_rate": args.min_rate,
+                "max_rate": args.max_rate,
+            }
+        ]
+    elif not args.input.is_file():
+        print(f"Error: Input file not found: {args.input}", file=sys.stderr)
+        sys.exit(1)
+    else:
+        # Command-line limits apply to every row that does not set its own.
+        rows = (
+            {"min_rate": args.min_rate, "max_rate": args.max_rate, **{k: v for k, v in row.items() if v not in (None, "")}} for row in read_rows(args.input)
+        )
+    if args.workers < 1:
+        print("Error: --workers must be at least 1.", file=sys.stderr)
+        sys.exit(1)
+
+    configure_session(pool_size=args.workers)
+    token, _customer_id = authenticate()
+    try:
+        buy_currencies, sell_currencies = fx_currency_sides(token)
+    except requests.RequestException as exc:
+        print(f"Failed to fetch the FX currency lists: {exc}", file=sys.stderr)
+        sys.exit(1)
+    worker = partial(
+        process_deal,
+        token=token,
+        buy_scales=amount_scales(buy_currencies),
+        sell_scales=amount_scales(sell_currencies),
+        min_remaining=args.min_remaining,
+        max_requotes=args.max_requotes,
+        dry_run=args.dry_run,
+    )
+
+    mode = "DRY RUN" if args.dry_run else f"{args.workers} workers"
+    print(f"\n=== FX AUTO-BOOK ({mode}) ===")
+    counts: Counter[str] = Counter()
+    records = []
+    started = time.monotonic()
+
+    ledger_file = None
+    if args.input is not None:
+        ledger_path = args.ledger or args.input.with_suffix(".ledger.csv")
+        print(f"  Ledger: {ledger_path}\n")
+        ledger_file = open(ledger_path, "w", encoding="utf-8", newline="")
+    try:
+        ledger = csv.DictWriter(ledger_file, fieldnames=LEDGER_FIELDS) if ledger_file else None
+        if ledger:
+            ledger.writeheader()
+        for record in bounded_map(worker, rows, args.workers):
+            records.append({field: record.get(field) for field in ("quote_ms", "book_ms", "quote_to_book_ms")})
+            counts[record["status"]] += 1
+            if ledger:
+                ledger.writerow(record)
+                ledger_file.flush()
+            else:
+                print(f"\n  {'status:':<20}{record['status']}")
+                for field in ("rate", "quote_reference", "fx_deal_reference", "deposit_reference", "quotes", "error"):
+                    if record.get(field) not in (None, ""):
+                        print(f"  {field + ':':<20}{record[field]}")
+    finally:
+        if ledger_file:
+            ledger_file.close()
+
+    elapsed = time.monotonic() - started
+    print("\nSummary:")
+    for status in STATUSES:
+        if counts[status]:
+            print(f"  {status:<14}{counts[status]:>8}")
+    print_latency(records)
+    print(f"\nCompleted in {elapsed:.2f}s.")
+
+    if counts["booked"] + counts["would_book"] != sum(counts.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
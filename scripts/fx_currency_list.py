@@ -1,5 +1,7 @@
 """Fetch and display available FX currencies for buying and selling.
 
+Both lists are fetched in parallel and cached (see ``reference_data.py``).
+
 Usage:
     python scripts/fx_currency_list.py
 """
@@ -8,14 +10,17 @@ import sys
 
 import requests
 
-from api_client import BASE_URL, auth_headers, authenticate
+from api_client import authenticate
+from concurrency import bounded_map
+from reference_data import FX_SIDES, fx_currencies
 
 
-def fetch_fx_currencies(token: str, side: str) -> list[dict]:
-    """Fetch FX currency list for a given side (Buy or Sell)."""
-    response = requests.get(f"{BASE_URL}/FXCurrencyList/{side}", headers=auth_headers(token), timeout=30)
-    response.raise_for_status()
-    return response.json().get("currencies", [])
+def fetch_side(token: str, side: str) -> tuple[str, list[dict] | None, Exception | None]:
+    """Fetch one side's list, returning the error instead of raising."""
+    try:
+        return side, fx_currencies(token, side), None
+    except requests.HTTPError as exc:
+        return side, None, exc
 
 
 def print_currency_table(currencies: list[dict]) -> None:
@@ -42,12 +47,10 @@ def print_currency_table(currencies: list[dict]) -> None:
 def main() -> None:
     token, _customer_id = authenticate()
 
-    for side in ("Buy", "Sell"):
+    for side, currencies, error in bounded_map(lambda side: fetch_side(token, side), FX_SIDES, len(FX_SIDES), ordered=True):
         print(f"\n=== FX CURRENCIES — {side.upper()} ===")
-        try:
-            currencies = fetch_fx_currencies(token, side)
-        except requests.HTTPError as exc:
-            print(f"  Failed to retrieve {side} list: {exc}", file=sys.stderr)
+        if error is not None:
+            print(f"  Failed to retrieve {side} list: {error}", file=sys.stderr)
             continue
 
         print_currency_table(currencies)
@@ -11,49 +11,48 @@ Usage:
 """
 
 import sys
+from decimal import Decimal
 
 import requests
 
-from api_client import BASE_URL, auth_headers, authenticate
+from api_client import api_request, authenticate
+from models import response_json
+from money import parse_amount, to_wire
+from reference_data import amount_scales, fx_currency_sides
 
 
-def get_quote(token: str, buy_ccy: str, sell_ccy: str, amount: float, amount_ccy: str) -> dict:
-    """Request an FX deal quote from the API."""
+def get_quote(token: str, buy_ccy: str, sell_ccy: str, amount: Decimal, amount_ccy: str, for_calculator: bool = False) -> dict:
+    """Request an FX deal quote from the API.
+
+    ``for_calculator`` requests an indicative (rate-only) quote that is not meant to be booked.
+    """
     payload = {
         "buyCurrencyCode": buy_ccy,
         "sellCurrencyCode": sell_ccy,
-        "amount": amount,
+        "amount": to_wire(amount),
         "amountCurrencyCode": amount_ccy,
         "dealType": "SPOT",
         "windowOpenDate": "",
         "finalValueDate": "",
-        "isForCurrencyCalculator": False,
+        "isForCurrencyCalculator": for_calculator,
     }
 
-    response = requests.post(f"{BASE_URL}/FXDealQuote", json=payload, headers=auth_headers(token), timeout=30)
-    response.raise_for_status()
-    return response.json()
+    response = api_request("POST", "/FXDealQuote", token, json=payload)
+    return response_json(response)
 
 
 def book_deal(token: str, quote_id: str) -> dict:
     """Book an FX deal and instant deposit using the quote ID."""
-    url = f"{BASE_URL}/FXDealQuote/{quote_id}/BookAndInstantDeposit"
-    response = requests.patch(url, headers=auth_headers(token), timeout=30)
-    response.raise_for_status()
-    return response.json()
-
+    response = api_request("PATCH", f"/FXDealQuote/{quote_id}/BookAndInstantDeposit", token)
+    return response_json(response)
 
-def fetch_fx_currencies(token: str, side: str) -> list[dict]:
-    """Fetch FX currency list for a given side (Buy or Sell)."""
-    response = requests.get(f"{BASE_URL}/FXCurrencyList/{side}", headers=auth_headers(token), timeout=30)
-    response.raise_for_status()
-    return response.json().get("currencies", [])
 
+def display_fx_currencies(token: str) -> tuple[dict[str, int], dict[str, int]]:
+    """Fetch (cached, both sides in parallel) and display available Buy and Sell FX currencies.
 
-def display_fx_currencies(token: str) -> tuple[list[str], list[str]]:
-    """Fetch and display available Buy and Sell FX currencies. Returns (buy_codes, sell_codes)."""
-    buy_currencies = fetch_fx_currencies(token, "Buy")
-    sell_currencies = fetch_fx_currencies(token, "Sell")
+    Returns (buy_scales, sell_scales), each mapping currency code to its amount scale.
+    """
+    buy_currencies, sell_currencies = fx_currency_sides(token)
 
     print("\n=== AVAILABLE FX CURRENCIES ===")
 
@@ -65,42 +64,31 @@ def display_fx_currencies(token: str) -> tuple[list[str], list[str]]:
     for cur in sell_currencies:
         print(f"    {cur.get('currencyCode', ''):<8} {cur.get('currencyName', '')}")
 
-    buy_codes = [c.get("currencyCode", "") for c in buy_currencies]
-    sell_codes = [c.get("currencyCode", "") for c in sell_currencies]
-    return buy_codes, sell_codes
+    return amount_scales(buy_currencies), amount_scales(sell_currencies)
 
 
-def main() -> None:
-    token, _customer_id = authenticate()
+def check_currency(scales: dict[str, int], code: str, side: str) -> None:
+    """Raise ValueError unless ``code`` is on the FX list for ``side`` ("buying" or "selling")."""
+    if code not in scales:
+        raise ValueError(f"{code} is not available for {side}. Choose from: {', '.join(scales)}")
 
-    buy_codes, sell_codes = display_fx_currencies(token)
 
-    print("\n=== FX DEAL ===")
-    buy_ccy = input("Buy currency code: ").strip().upper()
-    if buy_ccy not in buy_codes:
-        print(f"Error: {buy_ccy} is not available for buying. Choose from: {', '.join(buy_codes)}", file=sys.stderr)
-        sys.exit(1)
+def parse_deal(buy_scales: dict[str, int], sell_scales: dict[str, int], buy_ccy: str, sell_ccy: str, amount_str: str, amount_ccy: str) -> Decimal:
+    """Check a deal's currencies against the FX lists and parse its amount. Raises ValueError."""
+    check_currency(buy_scales, buy_ccy, "buying")
+    check_currency(sell_scales, sell_ccy, "selling")
+    if amount_ccy not in (buy_ccy, sell_ccy):
+        raise ValueError(f"Amount currency must be either {buy_ccy} or {sell_ccy}.")
 
-    sell_ccy = input("Sell currency code: ").strip().upper()
-    if sell_ccy not in sell_codes:
-        print(f"Error: {sell_ccy} is not available for selling. Choose from: {', '.join(sell_codes)}", file=sys.stderr)
-        sys.exit(1)
+    scale = buy_scales[buy_ccy] if amount_ccy == buy_ccy else sell_scales[sell_ccy]
+    amount = parse_amount(amount_str, scale)
+    if amount <= 0:
+        raise ValueError("Amount must be a positive number.")
+    return amount
 
-    amount_str = input("Amount: ").strip()
-    try:
-        amount = float(amount_str)
-        if amount <= 0:
-            raise ValueError
-    except ValueError:
-        print("Error: Amount must be a positive number.", file=sys.stderr)
-        sys.exit(1)
-
-    amount_ccy = input(f"Amount currency ({buy_ccy}/{sell_ccy}): ").strip().upper()
-    if amount_ccy not in (buy_ccy, sell_ccy):
-        print(f"Error: Amount currency must be either {buy_ccy} or {sell_ccy}.", file=sys.stderr)
-        sys.exit(1)
 
-    # Step 1: Get quote
+def quote_deal(token: str, buy_ccy: str, sell_ccy: str, amount: Decimal, amount_ccy: str) -> dict:
+    """Step 1: request a quote and display it. Returns the quote."""
     print("\nRequesting quote...")
     try:
         result = get_quote(token, buy_ccy, sell_ccy, amount, amount_ccy)
@@ -118,8 +106,6 @@ def main() -> None:
         print("Error: No quote returned.", file=sys.stderr)
         sys.exit(1)
 
-    quote_id = quote.get("quoteId")
-
     print("\n--- FX QUOTE ---")
     print(f"  Quote Ref:    {quote.get('quoteReference')}")
     print(f"  Symbol:       {quote.get('symbol')}")
@@ -130,13 +116,11 @@ def main() -> None:
     print(f"  Deal Date:    {quote.get('dealDate')}")
     print(f"  Value Date:   {quote.get('valueDate')}")
     print(f"  Expires:      {quote.get('expirationTime')}")
+    return quote
 
-    # Step 2: Confirm booking
-    confirm = input("\nBook this deal? (y/N): ").strip().lower()
-    if confirm != "y":
-        print("Deal cancelled.")
-        sys.exit(0)
 
+def book_quote(token: str, quote_id: str) -> None:
+    """Step 2: book a quoted deal and display the deal and deposit references."""
     print("\nBooking deal...")
     try:
         book_result = book_deal(token, quote_id)
@@ -155,6 +139,35 @@ def main() -> None:
     print(f"  Deal Reference:   {fx_data.get('fxDealReference')}")
     print(f"  Deposit ID:       {fx_data.get('depositId')}")
     print(f"  Deposit Reference:{fx_data.get('depositReference')}")
+
+
+def main() -> None:
+    token, _customer_id = authenticate()
+
+    buy_scales, sell_scales = display_fx_currencies(token)
+
+    print("\n=== FX DEAL ===")
+    try:
+        # Each code is checked as soon as it is entered, before asking for the next.
+        buy_ccy = input("Buy currency code: ").strip().upper()
+        check_currency(buy_scales, buy_ccy, "buying")
+        sell_ccy = input("Sell currency code: ").strip().upper()
+        check_currency(sell_scales, sell_ccy, "selling")
+        amount_str = input("Amount: ").strip()
+        amount_ccy = input(f"Amount currency ({buy_ccy}/{sell_ccy}): ").strip().upper()
+        amount = parse_deal(buy_scales, sell_scales, buy_ccy, sell_ccy, amount_str, amount_ccy)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    quote = quote_deal(token, buy_ccy, sell_ccy, amount, amount_ccy)
+
+    confirm = input("\nBook this deal? (y/N): ").strip().lower()
+    if confirm != "y":
+        print("Deal cancelled.")
+        sys.exit(0)
+
+    book_quote(token, quote.get("quoteId"))
     print("\n=== COMPLETE ===")
 
 
@@ -0,0 +1,20 @@
+"""Export the full FX deal history to CSV or JSONL.
+
+Walks every page of ``GET /FXDeal/Search`` (the web client only shows the
+newest 50), fetching pages concurrently and writing them out in order. See
+``history_export.py`` for how paging and de-duplication work.
+
+Usage:
+    python scripts/fx_history.py
+    python scripts/fx_history.py --format jsonl -o fx_deals.jsonl --workers 8
+"""
+
+from history_export import FX_DEALS, run
+
+
+def main() -> None:
+    run(FX_DEALS, "fx_history")
+
+
+if __name__ == "__main__":
+    main()
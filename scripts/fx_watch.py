@@ -0,0 +1,222 @@
+"""Watch FX quotes for many currency pairs at a fixed cadence.
+
+Every ``--interval`` seconds an indicative quote is requested for each pair
+(``isForCurrencyCalculator``, so nothing is bookable or left pending), with
+all pairs fetched concurrently. By default each pair is quoted both ways
+(buy base / sell quote and the reverse), and the gap between the two rates
+is tracked as the spread.
+
+Each pair keeps a fixed-size ring buffer of (time, rate, spread) in flat
+``array('d')`` columns, so memory stays constant however long the watch
+runs. The table shows the latest rate and spread plus range, mean and
+standard deviation over the buffer.
+
+Usage:
+    python scripts/fx_watch.py EUR/USD GBP/USD USD/JPY
+    python scripts/fx_watch.py EUR/USD --interval 0.5 --duration 60 --one-way
+    python scripts/fx_watch.py EUR/USD GBP/USD --json > rates.jsonl
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from array import array
+from datetime import datetime
+from decimal import Decimal
+
+import requests
+
+from api_client import authenticate, configure_session
+from concurrency import bounded_map
+from fx_deal import get_quote
+from money import parse_amount
+
+
+class RateHistory:
+    """Fixed-capacity ring buffer of quote samples for one symbol.
+
+    ``times``, ``rates`` and ``spreads`` are parallel ``array('d')`` columns;
+    a spread is NaN when only one side was quoted.
+    """
+
+    __slots__ = ("symbol", "capacity", "times", "rates", "spreads", "_next", "_count")
+
+    def __init__(self, symbol: str, capacity: int = 600) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.symbol = symbol
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.rates = array("d", bytes(8 * capacity))
+        self.spreads = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, rate: float, spread: float = math.nan) -> None:
+        """Add a sample, overwriting the oldest one once the buffer is full."""
+        i = self._next
+        self.times[i] = timestamp
+        self.rates[i] = rate
+        self.spreads[i] = spread
+        self._next = (i + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def latest(self) -> tuple[float, float, float] | None:
+        """Most recent (time, rate, spread), or None when empty."""
+        if not self._count:
+            return None
+        i = self._next - 1
+        return self.times[i], self.rates[i], self.spreads[i]
+
+    def _window(self, column: array) -> array:
+        """Samples of ``column`` in chronological order."""
+        if self._count < self.capacity:
+            return column[: self._count]
+        return column[self._next :] + column[: self._next]
+
+    def stats(self) -> dict:
+        """Latest rate and spread plus min/max/mean/stdev over the buffer."""
+        latest = self.latest()
+        if latest is None:
+            return {"symbol": self.symbol, "samples": 0}
+
+        rates = self._window(self.rates)
+        spreads = [value for value in self._window(self.spreads) if not math.isnan(value)]
+        mean = math.fsum(rates) / len(rates)
+        return {
+            "symbol": self.symbol,
+            "samples": len(rates),
+            "time": latest[0],
+            "rate": latest[1],
+            "spread": None if math.isnan(latest[2]) else latest[2],
+            "min": min(rates),
+            "max": max(rates),
+            "mean": mean,
+            "stdev": math.sqrt(math.fsum((value - mean) ** 2 for value in rates) / len(rates)),
+            "meanSpread": math.fsum(spreads) / len(spreads) if spreads else None,
+            "maxSpread": max(spreads) if spreads else None,
+        }
+
+
+def parse_pair(value: str) -> tuple[str, str]:
+    """Parse ``"EUR/USD"`` (or ``EURUSD``) into (base, quote) currency codes."""
+    value = value.strip().upper()
+    base, _, quote = value.partition("/") if "/" in value else (value[:3], "", value[3:])
+    if len(base) != 3 or len(quote) != 3:
+        raise argparse.ArgumentTypeError(f"invalid currency pair {value!r} (expected e.g. EUR/USD)")
+    return base, quote
+
+
+def quote_rate(token: str, buy_ccy: str, sell_ccy: str, amount: Decimal, amount_ccy: str) -> tuple[str, float]:
+    """Request one indicative quote and return (symbol, rate)."""
+    result = get_quote(token, buy_ccy, sell_ccy, amount, amount_ccy, for_calculator=True)
+    if result.get("problems"):
+        raise ValueError(str(result["problems"]))
+    quote = result.get("quote") or {}
+    return quote.get("symbol") or f"{buy_ccy}{sell_ccy}", float(quote.get("rate"))
+
+
+def sample_pair(token: str, pair: tuple[str, str], amount: Decimal, two_way: bool) -> dict:
+    """Quote one pair (both ways when ``two_way``). Never raises; errors are reported in the result."""
+    base, quote = pair
+    sampled_at = time.time()
+    try:
+        symbol, rate = quote_rate(token, base, quote, amount, base)
+        spread = math.nan
+        if two_way:
+            reverse_symbol, reverse_rate = quote_rate(token, quote, base, amount, base)
+            # Same symbol: both rates are in the same terms. Otherwise the reverse quote is inverted.
+            other = reverse_rate if reverse_symbol == symbol else 1 / reverse_rate
+            spread = abs(rate - other)
+    except (requests.RequestException, ValueError, TypeError, ZeroDivisionError) as exc:
+        return {"pair": f"{base}/{quote}", "symbol": None, "time": sampled_at, "error": str(exc)}
+    return {"pair": f"{base}/{quote}", "symbol": symbol, "time": sampled_at, "rate": rate, "spread": spread, "error": None}
+
+
+def print_table(histories: dict[str, RateHistory], errors: dict[str, str], cycle: int, elapsed: float) -> None:
+    print(f"\n=== FX WATCH {datetime.now():%H:%M:%S} (cycle {cycle}, {elapsed * 1000:.0f} ms) ===")
+    print(f"{'Pair':<10}{'Rate':>14}{'Spread':>12}{'Min':>14}{'Max':>14}{'Mean':>14}{'Stdev':>12}{'Samples':>9}")
+    print("-" * 99)
+    for pair, history in histories.items():
+        if pair in errors:
+            print(f"{pair:<10}  error: {errors[pair]}")
+            continue
+        stats = history.stats()
+        if not stats["samples"]:
+            print(f"{pair:<10}{'-':>14}")
+            continue
+        spread = "-" if stats["spread"] is None else f"{stats['spread']:.6f}"
+        print(
+            f"{pair:<10}{stats['rate']:>14.6f}{spread:>12}{stats['min']:>14.6f}{stats['max']:>14.6f}"
+            f"{stats['mean']:>14.6f}{stats['stdev']:>12.6f}{stats['samples']:>9}"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Poll indicative FX quotes for many pairs and track rate history.")
+    parser.add_argument("pairs", nargs="+", type=parse_pair, help="Currency pairs, e.g. EUR/USD (buy EUR, sell USD)")
+    parser.add_argument("--amount", default="1000", help="Quote amount, in the base currency (default 1000)")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between refreshes (default 1)")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds (default: run until Ctrl+C)")
+    parser.add_argument("--history", type=int, default=600, help="Samples kept per pair (default 600)")
+    parser.add_argument("--workers", type=int, default=16, help="Quotes in flight at once (default 16)")
+    parser.add_argument("--one-way", action="store_true", help="Quote each pair in one direction only (no spread)")
+    parser.add_argument("--json", action="store_true", help="Print one JSON line per cycle instead of a table")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.history < 1 or args.workers < 1 or args.interval <= 0:
+        print("Error: --history and --workers must be at least 1, and --interval positive.", file=sys.stderr)
+        sys.exit(1)
+    try:
+        amount = parse_amount(args.amount, scale=None)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    token, _customer_id = authenticate()
+    configure_session(pool_size=args.workers)
+
+    pairs = list(dict.fromkeys(args.pairs))
+    histories = {f"{base}/{quote}": RateHistory(f"{base}{quote}", args.history) for base, quote in pairs}
+    errors: dict[str, str] = {}
+    started = time.monotonic()
+    cycle = 0
+
+    try:
+        while args.duration is None or time.monotonic() - started < args.duration:
+            cycle += 1
+            cycle_start = time.monotonic()
+            samples = list(bounded_map(lambda pair: sample_pair(token, pair, amount, not args.one_way), pairs, args.workers, ordered=True))
+            for sample in samples:
+                if sample["error"]:
+                    errors[sample["pair"]] = sample["error"]
+                    continue
+                errors.pop(sample["pair"], None)
+                history = histories[sample["pair"]]
+                history.symbol = sample["symbol"]
+                history.append(sample["time"], sample["rate"], sample["spread"])
+            elapsed = time.monotonic() - cycle_start
+
+            if args.json:
+                stats = [{"pair": pair, **history.stats()} for pair, history in histories.items()]
+                print(json.dumps({"cycle": cycle, "seconds": elapsed, "pairs": stats, "errors": errors}), flush=True)
+            else:
+                print_table(histories, errors, cycle, elapsed)
+
+            time.sleep(max(0.0, args.interval - (time.monotonic() - cycle_start)))
+    except KeyboardInterrupt:
+        pass
+
+    print(f"\nStopped after {cycle} cycle(s).", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Paged, parallel export of the InstantPayment and FX deal search endpoints.
+
+Shared by ``payment_history.py`` and ``fx_history.py``. Page 0 is fetched
+first to learn the total record count; the remaining pages are then fetched
+concurrently and written in page order as they arrive, so memory use depends
+on the worker count, not on the size of the history.
+
+Pages are requested oldest first, so records created while the export runs
+land after everything already read instead of shifting it. Every page
+reports the current total; if it grew, the pages past the original end are
+fetched too. A record that still moves across a page boundary (e.g. one
+inserted mid-history) can come back twice and is dropped by ID; the summary
+says when the history changed during the run, in which case a re-run is
+the way to be certain nothing moved past a page already read.
+"""
+
+import argparse
+import math
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import requests
+
+from api_client import api_request, authenticate, configure_session
+from concurrency import bounded_map
+from models import response_json
+from statement_export import CsvSink, JsonlSink
+
+FORMATS = ("csv", "jsonl")
+
+PAYMENT_FIELDS = [
+    "paymentId",
+    "paymentReference",
+    "status",
+    "fromCustomerAlias",
+    "toCustomerAlias",
+    "fromCustomerName",
+    "toCustomerName",
+    "paymentTypeName",
+    "amount",
+    "currencyCode",
+    "valueDate",
+    "createdTime",
+    "postedTime",
+    "externalReference",
+    "memo",
+]
+
+FX_DEAL_FIELDS = [
+    "fxDealId",
+    "fxDealReference",
+    "fxDealTypeName",
+    "bookedForCustomerName",
+    "bookedTime",
+    "dealDate",
+    "buyAmount",
+    "buyCurrencyCode",
+    "sellAmount",
+    "sellCurrencyCode",
+    "bookedRate",
+    "rateFormat",
+    "finalValueDate",
+]
+
+
+class HistorySource:
+    """One search endpoint: where its records and total live in the response, and their ID field."""
+
+    def __init__(self, name: str, path: str, id_field: str, sort_by: str, fields: list[str], records_key: str, container: str | None = None) -> None:
+        self.name = name
+        self.path = path
+        self.id_field = id_field
+        self.sort_by = sort_by
+        self.fields = fields
+        self.records_key = records_key
+        self.container = container
+
+    def parse(self, data: dict) -> tuple[list[dict], int]:
+        """Return (records, totalRecords) from one search response."""
+        body = (data.get(self.container) or {}) if self.container else data
+        return body.get(self.records_key) or [], body.get("totalRecords") or 0
+
+    def date_params(self, start: date, end: date) -> dict:
+        """Search parameters that keep only records whose ``sort_by`` time falls on a day in [start, end]."""
+        return {f"{self.sort_by}Min": f"{start:%Y-%m-%d}T00:00:00", f"{self.sort_by}Max": f"{end:%Y-%m-%d}T23:59:59"}
+
+
+# GET /InstantPayment/Search -> {"records": {"payments": [...], "recordCount": n, "totalRecords": n}}
+PAYMENTS = HistorySource("payments", "/InstantPayment/Search", "paymentId", "CreatedTime", PAYMENT_FIELDS, "payments", container="records")
+# GET /FXDeal/Search -> {"fxDeals": [...], "recordCount": n, "totalRecords": n}
+FX_DEALS = HistorySource("FX deals", "/FXDeal/Search", "fxDealId", "BookedTime", FX_DEAL_FIELDS, "fxDeals")
+
+
+def fetch_page(token: str, source: HistorySource, page_index: int, page_size: int, params: dict | None = None) -> tuple[list[dict], int]:
+    """Fetch one page, oldest first. Returns (records, totalRecords); raises ValueError on API problems."""
+    query = {"PageIndex": page_index, "PageSize": page_size, "SortBy": source.sort_by, "SortDirection": "Ascending", **(params or {})}
+    data = response_json(api_request("GET", source.path, token, params=query))
+    if data.get("problems"):
+        raise ValueError(f"{source.path} page {page_index}: {data['problems']}")
+    return source.parse(data)
+
+
+def export_history(token: str, source: HistorySource, sink, page_size: int = 100, workers: int = 4, params: dict | None = None) -> dict:
+    """Write every record of ``source`` to ``sink`` once. Returns counts for the summary."""
+    first, total = fetch_page(token, source, 0, page_size, params)
+    pages = max(1, math.ceil(total / page_size))
+    seen: set[str] = set()
+    stats = {"totalRecords": total, "finalTotal": total, "pages": pages, "written": 0, "duplicates": 0}
+
+    def write(records: list[dict]) -> None:
+        rows = []
+        for record in records:
+            key = record.get(source.id_field)
+            if key is not None:
+                if key in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(key)
+            rows.append(record)
+        sink.write(rows)
+        stats["written"] += len(rows)
+
+    write(first)
+
+    def fetch(page_index: int) -> tuple[list[dict], int]:
+        return fetch_page(token, source, page_index, page_size, params)
+
+    for records, page_total in bounded_map(fetch, range(1, pages), workers, ordered=True):
+        write(records)
+        stats["finalTotal"] = max(stats["finalTotal"], page_total)
+
+    # Records added during the run sit past the original last page.
+    while stats["pages"] * page_size < stats["finalTotal"]:
+        records, page_total = fetch(stats["pages"])
+        stats["pages"] += 1
+        write(records)
+        stats["finalTotal"] = max(stats["finalTotal"], page_total)
+        if not records:
+            break
+    return stats
+
+
+def parse_param(value: str) -> tuple[str, str]:
+    name, sep, param = value.partition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"invalid parameter {value!r} (expected NAME=VALUE)")
+    return name, param
+
+
+def parse_args(source: HistorySource) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=f"Export the full {source.name} history to CSV or JSONL.")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="Output format (default csv)")
+    parser.add_argument("-o", "--output", type=Path, help="Output file (default <name>_history_<date>.<format>)")
+    parser.add_argument("--page-size", type=int, default=100, help="Records per request (default 100)")
+    parser.add_argument("--workers", type=int, default=4, help="Pages fetched concurrently (default 4)")
+    parser.add_argument("--param", action="append", type=parse_param, default=[], metavar="NAME=VALUE", help="Extra search query parameter (repeatable)")
+    return parser.parse_args()
+
+
+def run(source: HistorySource, default_stem: str) -> None:
+    """Command-line entry point shared by the history scripts."""
+    args = parse_args(source)
+    if args.page_size < 1 or args.workers < 1:
+        print("Error: --page-size and --workers must be at least 1.", file=sys.stderr)
+        sys.exit(1)
+
+    configure_session(pool_size=args.workers)
+    token, _customer_id = authenticate()
+    output = args.output or Path(f"{default_stem}_{datetime.now():%Y%m%d}.{args.format}")
+
+    print(f"\n=== {source.name.upper()} HISTORY EXPORT ({args.format.upper()}) ===")
+    print(f"  Endpoint: GET {source.path}")
+    print(f"  Output:   {output}\n")
+
+    started = time.monotonic()
+    sink = CsvSink(output, source.fields) if args.format == "csv" else JsonlSink(output)
+    try:
+        stats = export_history(token, source, sink, args.page_size, args.workers, dict(args.param))
+    except (requests.RequestException, ValueError) as exc:
+        print(f"Failed to retrieve {source.name}: {exc}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        sink.close()
+
+    print(f"Exported {stats['written']:,} of {stats['totalRecords']:,} {source.name} ({stats['pages']} page(s)) in {time.monotonic() - started:.1f}s.")
+    if stats["finalTotal"] != stats["totalRecords"]:
+        print(f"  The history changed during the export ({stats['totalRecords']:,} -> {stats['finalTotal']:,} records); re-run for an exact snapshot.")
+    if stats["duplicates"]:
+        print(f"  Skipped {stats['duplicates']} duplicate(s) from records that moved between pages.")
+    print("\n=== COMPLETE ===")
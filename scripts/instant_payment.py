@@ -10,29 +10,41 @@ Usage:
 
 import sys
 from datetime import datetime, timezone
+from decimal import Decimal
 
 import requests
 
-from api_client import BASE_URL, auth_headers, authenticate
-
-
-def create_payment(token: str, from_customer: str, to_customer: str, amount: float, currency: str) -> dict:
+from api_client import api_request, authenticate, get_credentials
+from models import response_json
+from money import format_amount, parse_amount, scale_of, to_wire
+from reference_data import amount_scales, payment_currencies
+
+
+def create_payment(
+    token: str,
+    from_customer: str,
+    to_customer: str,
+    amount: Decimal,
+    currency: str,
+    reason: str = "Instant Payment",
+    external_reference: str = "",
+    memo: str = "",
+) -> dict:
     """Create an instant payment and return the API response."""
     payload = {
         "fromCustomer": from_customer,
         "toCustomer": to_customer,
         "paymentTypeId": 1,
-        "amount": amount,
+        "amount": to_wire(amount),
         "currencyCode": currency,
         "valueDate": datetime.now(tz=timezone.utc).strftime("%Y-%m-%d"),
-        "reasonForPayment": "Instant Payment",
-        "externalReference": "",
-        "memo": "",
+        "reasonForPayment": reason,
+        "externalReference": external_reference,
+        "memo": memo,
     }
 
-    response = requests.post(f"{BASE_URL}/InstantPayment", json=payload, headers=auth_headers(token), timeout=30)
-    response.raise_for_status()
-    return response.json()
+    response = api_request("POST", "/InstantPayment", token, json=payload)
+    return response_json(response)
 
 
 def confirm_payment(token: str, payment_id: str, timestamp: str) -> dict:
@@ -42,45 +54,29 @@ def confirm_payment(token: str, payment_id: str, timestamp: str) -> dict:
         "timestamp": timestamp,
     }
 
-    response = requests.patch(f"{BASE_URL}/InstantPayment/Post", json=payload, headers=auth_headers(token), timeout=30)
-    response.raise_for_status()
-    return response.json()
-
-
-def main() -> None:
-    token, _customer_id = authenticate()
+    response = api_request("PATCH", "/InstantPayment/Post", token, json=payload)
+    return response_json(response)
 
-    print("\n=== INSTANT PAYMENT ===")
-    to_customer = input("Receiver PayID: ").strip()
-    if not to_customer:
-        print("Error: Receiver PayID is required.", file=sys.stderr)
-        sys.exit(1)
 
-    amount_str = input("Amount: ").strip()
+def payment_scale(token: str, currency: str) -> int | None:
+    """Amount scale of a payment currency, or None when it cannot be looked up."""
     try:
-        amount = float(amount_str)
-        if amount <= 0:
-            raise ValueError
-    except ValueError:
-        print("Error: Amount must be a positive number.", file=sys.stderr)
-        sys.exit(1)
+        return amount_scales(payment_currencies(token)).get(currency)
+    except requests.RequestException:
+        return None  # Unknown scale: the server validates the amount instead.
 
-    currency = input("Currency [USD]: ").strip().upper() or "USD"
 
-    print(f"\n  To:       {to_customer}")
-    print(f"  Amount:   {amount:,.2f} {currency}")
-
-    confirm = input("\nProceed? (y/N): ").strip().lower()
-    if confirm != "y":
-        print("Payment cancelled.")
-        sys.exit(0)
+def send_payment(
+    token: str, to_customer: str, amount: Decimal, currency: str, reason: str = "Instant Payment", external_reference: str = "", memo: str = ""
+) -> None:
+    """Create and post a payment, displaying its progress and reference."""
+    amount_display = format_amount(amount, scale_of(amount))
 
     # Step 1: Create the payment
     print("\nCreating payment...")
     try:
-        from api_client import get_credentials
         from_customer, _ = get_credentials()
-        result = create_payment(token, from_customer, to_customer, amount, currency)
+        result = create_payment(token, from_customer, to_customer, amount, currency, reason, external_reference, memo)
     except requests.HTTPError as exc:
         print(f"Failed to create payment: {exc}", file=sys.stderr)
         sys.exit(1)
@@ -116,8 +112,40 @@ def main() -> None:
         print(f"Error: {post_problems}", file=sys.stderr)
         sys.exit(1)
 
-    print(f"\nPayment of {amount:,.2f} {currency} to {to_customer} completed successfully.")
+    print(f"\nPayment of {amount_display} {currency} to {to_customer} completed successfully.")
     print(f"  Reference: {payment_ref}")
+
+
+def main() -> None:
+    token, _customer_id = authenticate()
+
+    print("\n=== INSTANT PAYMENT ===")
+    to_customer = input("Receiver PayID: ").strip()
+    if not to_customer:
+        print("Error: Receiver PayID is required.", file=sys.stderr)
+        sys.exit(1)
+
+    currency = input("Currency [USD]: ").strip().upper() or "USD"
+    scale = payment_scale(token, currency)
+
+    amount_str = input("Amount: ").strip()
+    try:
+        amount = parse_amount(amount_str, scale)
+        if amount <= 0:
+            raise ValueError("Amount must be a positive number.")
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"\n  To:       {to_customer}")
+    print(f"  Amount:   {format_amount(amount, scale_of(amount))} {currency}")
+
+    confirm = input("\nProceed? (y/N): ").strip().lower()
+    if confirm != "y":
+        print("Payment cancelled.")
+        sys.exit(0)
+
+    send_payment(token, to_customer, amount, currency)
     print("\n=== COMPLETE ===")
 
 
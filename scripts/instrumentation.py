@@ -0,0 +1,440 @@
+"""Per-request instrumentation for the shared API client.
+
+When at least one hook is registered, every ``api_client.api_request`` call
+produces a record with the endpoint, status, request/response bytes, phase
+timings (rate-limiter queue, DNS, TCP connect, TLS, server wait, total),
+urllib3 retries, and whether an auth refresh happened during the call. Hooks
+are plain callables that receive the record dict:
+
+    from instrumentation import add_request_hook
+    add_request_hook(lambda record: print(record["endpoint"], record["totalMs"]))
+
+Phase timings come from instrumented urllib3 connection classes mounted by
+``api_client.build_session``. Connection phases are only non-zero for calls
+that opened a new connection; a reused keep-alive connection costs none.
+
+Two exporters are included and can be switched on from the environment:
+
+    WALLET_METRICS_FILE=metrics.prom   Prometheus text format, rewritten every
+                                       few seconds and at exit (node_exporter
+                                       textfile collector compatible)
+    WALLET_TRACE_FILE=spans.jsonl      one OpenTelemetry-style JSON span per
+                                       request; auth refreshes are child spans
+                                       of the call that triggered them
+"""
+
+import atexit
+import json
+import os
+import re
+import secrets
+import socket
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from pathlib import Path
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+RequestHook = Callable[[dict], None]
+
+_hooks: list[RequestHook] = []
+_local = threading.local()
+_metrics_exporter: "PrometheusExporter | None" = None
+
+# GUIDs, long hex IDs and numbers in paths become "{id}" to keep label cardinality low.
+_ID_SEGMENT = re.compile(r"^(?:[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}|[0-9a-fA-F]{16,}|\d+)$")
+
+
+def add_request_hook(hook: RequestHook) -> None:
+    """Call ``hook(record)`` after every API request."""
+    _hooks.append(hook)
+
+
+def remove_request_hook(hook: RequestHook) -> None:
+    """Stop calling a hook added with ``add_request_hook``."""
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def endpoint_template(path: str) -> str:
+    """``/CustomerAccountBalance/3f2b...`` -> ``/CustomerAccountBalance/{id}``."""
+    return "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("?", 1)[0].split("/"))
+
+
+def _stack() -> list[dict]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _current() -> dict | None:
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+def begin_request(method: str, path: str) -> dict | None:
+    """Start a record for one API call, or return None when no hooks are registered."""
+    if not _hooks:
+        return None
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    record = {
+        "method": method,
+        "endpoint": endpoint_template(path),
+        "status": None,
+        "error": None,
+        "requestBytes": 0,
+        "responseBytes": 0,
+        "dnsMs": 0.0,
+        "connectMs": 0.0,
+        "tlsMs": 0.0,
+        "serverMs": 0.0,
+        "queueMs": 0.0,
+        "totalMs": 0.0,
+        "attempts": 0,
+        "retries": 0,
+        "authRefresh": None,
+        "children": [],
+        "traceId": parent["traceId"] if parent else secrets.token_hex(16),
+        "spanId": secrets.token_hex(8),
+        "parentSpanId": parent["spanId"] if parent else None,
+        "cause": parent["endpoint"] if parent else None,
+        "startTime": time.time(),
+        "_started": time.perf_counter(),
+    }
+    stack.append(record)
+    return record
+
+
+def finish_request(record: dict, response=None, error: BaseException | None = None) -> None:
+    """Complete a record and pass it to every hook. Hook errors are swallowed."""
+    stack = _stack()
+    if stack and stack[-1] is record:
+        stack.pop()
+    record["totalMs"] = (time.perf_counter() - record.pop("_started")) * 1000
+    record["endTime"] = record["startTime"] + record["totalMs"] / 1000
+    if response is not None:
+        record["status"] = response.status_code
+        # Streamed responses (stream=True) are sized from the header rather than read here.
+        consumed = response._content is not False
+        record["responseBytes"] = len(response.content or b"") if consumed else int(response.headers.get("Content-Length") or 0)
+        body = response.request.body if response.request is not None else None
+        record["requestBytes"] = len(body) if body else 0
+    if error is not None:
+        record["error"] = type(error).__name__
+    if record["parentSpanId"] and stack:
+        stack[-1]["children"].append(record["endpoint"])
+
+    for hook in list(_hooks):
+        try:
+            hook(record)
+        except Exception:
+            pass  # Instrumentation must never break a request.
+
+
+def _add_ms(field: str, seconds: float) -> None:
+    record = _current()
+    if record is not None:
+        record[field] += seconds * 1000
+
+
+class _TimedConnectionMixin:
+    """Times DNS, TCP connect, TLS and server wait into the active record."""
+
+    def _new_conn(self) -> socket.socket:
+        if _current() is None:
+            return super()._new_conn()
+
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        except OSError:
+            return super()._new_conn()  # Let urllib3 raise its usual resolution error.
+        finally:
+            _add_ms("dnsMs", time.perf_counter() - started)
+
+        # Connect to the resolved addresses in order, as urllib3 would, without resolving again.
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            for index, (*_info, sockaddr) in enumerate(addresses):
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()
+                except NewConnectionError:
+                    if index == len(addresses) - 1:
+                        raise
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+            _add_ms("connectMs", time.perf_counter() - started)
+
+    def connect(self) -> None:
+        record = _current()
+        if record is None:
+            return super().connect()
+        before = record["dnsMs"] + record["connectMs"]
+        started = time.perf_counter()
+        super().connect()
+        if isinstance(self, HTTPSConnection):
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            record["tlsMs"] += max(0.0, elapsed_ms - (record["dnsMs"] + record["connectMs"] - before))
+
+    def request(self, *args, **kwargs):
+        record = _current()
+        if record is not None:
+            record["attempts"] += 1
+        result = super().request(*args, **kwargs)
+        self._sent_at = time.perf_counter()
+        return result
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        sent_at = getattr(self, "_sent_at", None)
+        if sent_at is not None:
+            _add_ms("serverMs", time.perf_counter() - sent_at)
+            self._sent_at = None
+        return response
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """``HTTPAdapter`` whose connection pools time each connection phase."""
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+
+# --- exporters ---------------------------------------------------------------
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PHASES = ("queue", "dns", "connect", "tls", "server")
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: object) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+class PrometheusExporter:
+    """Aggregates records into Prometheus metrics and writes them in text format.
+
+    The file is rewritten atomically at most every ``interval`` seconds and
+    once more at exit, so a textfile collector never sees a partial file.
+    Without a path the exporter only aggregates; ``snapshot``/``merge`` carry
+    the totals of worker processes into the one that writes the file.
+    """
+
+    def __init__(self, path: Path | None, interval: float = 5.0) -> None:
+        self.path = path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._requests: dict[tuple, int] = defaultdict(int)
+        self._duration: dict[tuple, list] = {}
+        self._phases: dict[tuple, float] = defaultdict(float)
+        self._bytes: dict[tuple, int] = defaultdict(int)
+        self._retries: dict[tuple, int] = defaultdict(int)
+        self._refreshes: dict[str, int] = defaultdict(int)
+        self._last_write = 0.0
+
+    def __call__(self, record: dict) -> None:
+        key = (record["method"], record["endpoint"])
+        seconds = record["totalMs"] / 1000
+        with self._lock:
+            self._requests[(*key, record["status"] if record["status"] is not None else record["error"])] += 1
+            buckets = self._duration.setdefault(key, [0] * len(DURATION_BUCKETS) + [0, 0.0])
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    buckets[index] += 1
+            buckets[-2] += 1
+            buckets[-1] += seconds
+            for phase in PHASES:
+                self._phases[(*key, phase)] += record[f"{phase}Ms"] / 1000
+            self._bytes[(*key, "sent")] += record["requestBytes"]
+            self._bytes[(*key, "received")] += record["responseBytes"]
+            self._retries[key] += record["retries"]
+            if record["authRefresh"]:
+                self._refreshes[record["authRefresh"]] += 1
+            due = self.path is not None and time.monotonic() - self._last_write >= self.interval
+        if due:
+            self.write()
+
+    def snapshot(self) -> dict:
+        """Plain, picklable copy of the aggregated totals (see ``merge``)."""
+        with self._lock:
+            return {
+                "requests": dict(self._requests),
+                "duration": {key: list(buckets) for key, buckets in self._duration.items()},
+                "phases": dict(self._phases),
+                "bytes": dict(self._bytes),
+                "retries": dict(self._retries),
+                "refreshes": dict(self._refreshes),
+            }
+
+    def merge(self, snapshot: dict) -> None:
+        """Add the totals of another exporter's ``snapshot`` to this one."""
+        with self._lock:
+            for name in ("requests", "phases", "bytes", "retries", "refreshes"):
+                totals = getattr(self, f"_{name}")
+                for key, value in snapshot[name].items():
+                    totals[key] += value
+            for key, buckets in snapshot["duration"].items():
+                mine = self._duration.setdefault(key, [0] * len(DURATION_BUCKETS) + [0, 0.0])
+                for index, value in enumerate(buckets):
+                    mine[index] += value
+
+    def render(self) -> str:
+        """Current metrics in Prometheus text exposition format."""
+        lines = [
+            "# HELP wallet_api_requests_total API requests by method, endpoint and status.",
+            "# TYPE wallet_api_requests_total counter",
+        ]
+        with self._lock:
+            for (method, endpoint, status), count in sorted(self._requests.items(), key=str):
+                lines.append(f"wallet_api_requests_total{{{_labels(method=method, endpoint=endpoint, status=status)}}} {count}")
+
+            lines += ["# HELP wallet_api_request_duration_seconds Total time per API request.", "# TYPE wallet_api_request_duration_seconds histogram"]
+            for (method, endpoint), buckets in sorted(self._duration.items()):
+                labels = _labels(method=method, endpoint=endpoint)
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'wallet_api_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'wallet_api_request_duration_seconds_bucket{{{labels},le="+Inf"}} {buckets[-2]}')
+                lines.append(f"wallet_api_request_duration_seconds_sum{{{labels}}} {buckets[-1]:.6f}")
+                lines.append(f"wallet_api_request_duration_seconds_count{{{labels}}} {buckets[-2]}")
+
+            lines += ["# HELP wallet_api_phase_seconds_total Time spent per request phase.", "# TYPE wallet_api_phase_seconds_total counter"]
+            for (method, endpoint, phase), seconds in sorted(self._phases.items()):
+                lines.append(f"wallet_api_phase_seconds_total{{{_labels(method=method, endpoint=endpoint, phase=phase)}}} {seconds:.6f}")
+
+            lines += ["# HELP wallet_api_bytes_total Request and response body bytes.", "# TYPE wallet_api_bytes_total counter"]
+            for (method, endpoint, direction), count in sorted(self._bytes.items()):
+                lines.append(f"wallet_api_bytes_total{{{_labels(method=method, endpoint=endpoint, direction=direction)}}} {count}")
+
+            lines += ["# HELP wallet_api_retries_total Transport-level retries.", "# TYPE wallet_api_retries_total counter"]
+            for (method, endpoint), count in sorted(self._retries.items()):
+                lines.append(f"wallet_api_retries_total{{{_labels(method=method, endpoint=endpoint)}}} {count}")
+
+            lines += ["# HELP wallet_api_auth_refresh_total Requests during which the token was renewed.", "# TYPE wallet_api_auth_refresh_total counter"]
+            for reason, count in sorted(self._refreshes.items()):
+                lines.append(f"wallet_api_auth_refresh_total{{{_labels(reason=reason)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> None:
+        """Rewrite the metrics file atomically."""
+        if self.path is None:
+            return
+        text = self.render()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f"{self.path.suffix}.{os.getpid()}.tmp")
+        with self._lock:
+            self._last_write = time.monotonic()
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                handle.write(text)
+            os.replace(tmp_path, self.path)
+
+
+class SpanExporter:
+    """Appends one OpenTelemetry-style JSON span per request to a JSONL file."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._handle = open(path, "a", encoding="utf-8")
+
+    def __call__(self, record: dict) -> None:
+        attributes = {
+            "http.request.method": record["method"],
+            "url.template": record["endpoint"],
+            "http.response.status_code": record["status"],
+            "http.request.body.size": record["requestBytes"],
+            "http.response.body.size": record["responseBytes"],
+            "http.request.resend_count": record["retries"],
+            "wallet.queue_ms": round(record["queueMs"], 3),
+            "wallet.dns_ms": round(record["dnsMs"], 3),
+            "wallet.connect_ms": round(record["connectMs"], 3),
+            "wallet.tls_ms": round(record["tlsMs"], 3),
+            "wallet.server_ms": round(record["serverMs"], 3),
+            "wallet.auth_refresh": record["authRefresh"],
+            "wallet.cause": record["cause"],
+        }
+        span = {
+            "traceId": record["traceId"],
+            "spanId": record["spanId"],
+            "parentSpanId": record["parentSpanId"],
+            "name": f"{record['method']} {record['endpoint']}",
+            "kind": "SPAN_KIND_CLIENT",
+            "startTimeUnixNano": int(record["startTime"] * 1e9),
+            "endTimeUnixNano": int(record["endTime"] * 1e9),
+            "attributes": {name: value for name, value in attributes.items() if value is not None},
+            "status": {"code": "STATUS_CODE_ERROR" if record["error"] or (record["status"] or 0) >= 400 else "STATUS_CODE_OK"},
+        }
+        line = json.dumps(span)
+        with self._lock:
+            self._handle.write(line + "\n")
+            self._handle.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._handle.close()
+
+
+def install_from_env() -> None:
+    """Register exporters named by ``WALLET_METRICS_FILE`` / ``WALLET_TRACE_FILE``."""
+    global _metrics_exporter
+    metrics_path = os.environ.get("WALLET_METRICS_FILE", "").strip()
+    if metrics_path:
+        exporter = _metrics_exporter = PrometheusExporter(Path(metrics_path).expanduser())
+        add_request_hook(exporter)
+        atexit.register(exporter.write)
+
+    trace_path = os.environ.get("WALLET_TRACE_FILE", "").strip()
+    if trace_path:
+        spans = SpanExporter(Path(trace_path).expanduser())
+        add_request_hook(spans)
+        atexit.register(spans.close)
+
+
+def metrics_exporter() -> PrometheusExporter | None:
+    """The exporter writing ``WALLET_METRICS_FILE``, or None when it is not set."""
+    return _metrics_exporter
+
+
+def detach_metrics_file() -> bool:
+    """Stop this (worker) process from writing ``WALLET_METRICS_FILE``.
+
+    The worker collects into path-less exporters instead and hands their
+    ``snapshot`` to the parent. Returns whether a metrics file was set.
+    """
+    global _metrics_exporter
+    exporter, _metrics_exporter = _metrics_exporter, None
+    if exporter is None:
+        return False
+    remove_request_hook(exporter)
+    atexit.unregister(exporter.write)
+    return True
@@ -8,36 +8,20 @@ import sys
 
 import requests
 
-from api_client import BASE_URL, CALLER_ID, get_credentials
+from api_client import get_token_manager
 
 
 def main() -> None:
-    username, password = get_credentials()
-
-    auth_body = {
-        "loginId": username,
-        "password": password,
-        "callerId": CALLER_ID,
-        "includeUserSettingsInResponse": True,
-        "includeAccessRightsWithUserSettings": False,
-    }
-
-    print(f"Authenticating with {BASE_URL}...")
+    # A full login (not a cached token) so the user settings below are current;
+    # the new tokens are written to the token cache for the other scripts.
     try:
-        response = requests.post(f"{BASE_URL}/authenticate", json=auth_body, timeout=30)
-        response.raise_for_status()
+        data = get_token_manager().login()
     except requests.RequestException as exc:
         print(f"Authentication error: {exc}", file=sys.stderr)
         sys.exit(1)
 
-    data = response.json()
-    token = data.get("tokens", {}).get("accessToken")
-    if not token:
-        print("Error: Authentication failed — no access token received.", file=sys.stderr)
-        sys.exit(1)
-
     settings = data.get("userSettings", {})
-    print("\nLogin successful!")
+    print("\nUser settings:")
     print(f"  User:         {settings.get('userName')}")
     print(f"  Name:         {settings.get('firstName')} {settings.get('lastName')}")
     print(f"  Organization: {settings.get('organizationName')}")
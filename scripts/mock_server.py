@@ -0,0 +1,913 @@
+"""Local stand-in for GPWebApi, for load, benchmark and regression runs.
+
+Implements the endpoints the Python scripts call, with response shapes
+taken from ``refs/DTO`` and ``src/types``:
+
+    POST  /authenticate                             any login/password is accepted
+    POST  /Authenticate/Refresh
+    GET   /CustomerAccountBalance/{customerId}      ETag / If-None-Match aware
+    GET   /CustomerAccountStatement                 synthetic, deterministic entries
+    GET   /PaymentCurrencyList                      ETag / If-None-Match aware
+    GET   /FXCurrencyList/{Buy|Sell}                ETag / If-None-Match aware
+    POST  /FXDealQuote
+    PATCH /FXDealQuote/{quoteId}/BookAndInstantDeposit
+    POST  /InstantPayment
+    PATCH /InstantPayment/Post
+    GET   /InstantPayment/Search                    paged, sorted, <Field>Min/Max time filters; ``--history`` seeds past records
+    GET   /FXDeal/Search                            as above
+    POST  /FileAttachment                           stored in memory, base64 checked
+    GET   /FileAttachment/{fileAttachmentId}
+    GET   /FileAttachmentInfoList/{customerId}
+    GET   /User/DoesUsernameExist/{username}
+    POST  /Customer/FromTemplate
+    POST  /CustomerUser                             usernames unique regardless of case
+    GET   /CustomerUser/Search
+    PATCH /User/LinkAccessRightTemplate
+
+Each customer (one per login) gets ``--accounts`` accounts. Statements hold
+``--entries-per-day`` entries per day with a continuous running balance,
+generated from the account and date so every fetch of a day returns the same
+data. Booked FX deals and posted payments move the balances returned by
+``/CustomerAccountBalance`` and show up in the search endpoints; statements
+stay synthetic.
+
+``--latency``/``--jitter`` delay every response, and ``--error-rate`` answers
+that fraction of non-auth requests with ``--error-status`` (503 by default)
+to exercise the client's retry paths. State lives in memory only.
+
+Usage:
+    python scripts/mock_server.py                          # http://127.0.0.1:8599/api/v1
+    python scripts/mock_server.py --latency 40 --jitter 10 --error-rate 0.02
+    python scripts/mock_server.py --port 0 --accounts 8 --entries-per-day 50
+    python scripts/mock_server.py --history 5000            # 5000 past payments and FX deals per customer
+
+Then point the scripts at it:
+    WALLET_API_URL=http://127.0.0.1:8599/api/v1 python scripts/account_balances.py
+"""
+
+import argparse
+import base64
+import binascii
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from money import from_minor, quantize
+
+API_PREFIX = "/api/v1"
+
+# (code, name, amount scale, rate scale, symbol, USD value of one unit)
+CURRENCIES = [
+    ("EUR", "Euro", 2, 4, "€", Decimal("1.08")),
+    ("GBP", "British Pound", 2, 4, "£", Decimal("1.27")),
+    ("USD", "US Dollar", 2, 4, "$", Decimal("1")),
+    ("CAD", "Canadian Dollar", 2, 4, "$", Decimal("0.74")),
+    ("CHF", "Swiss Franc", 2, 4, "Fr", Decimal("1.12")),
+    ("JPY", "Japanese Yen", 0, 2, "¥", Decimal("0.0067")),
+]
+CURRENCY_INFO = {code: (scale, rate_scale, usd) for code, _name, scale, rate_scale, _symbol, usd in CURRENCIES}
+# Market convention: the currency listed first is the base of a symbol.
+SYMBOL_ORDER = [code for code, *_rest in CURRENCIES]
+
+STATEMENT_EPOCH = date(2020, 1, 1)
+TRANSACTION_TYPES = ("Deposit", "Instant Payment", "FX Deal", "Fee", "Withdrawal")
+
+
+def _api_time(value: datetime) -> str:
+    """Format a timestamp the way the API does (7-digit fraction)."""
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%f") + "0"
+
+
+def _problem(message: str, code: int = 1000) -> list[dict]:
+    return [{"problemCode": code, "problemType": "Error", "message": message, "messageDetails": "", "fieldName": "", "fieldValue": ""}]
+
+
+def _currency_list() -> dict:
+    return {
+        "currencies": [
+            {
+                "currencyCode": code,
+                "currencyName": name,
+                "currencyAmountScale": scale,
+                "currencyRateScale": rate_scale,
+                "symbol": symbol,
+                "paymentCutoffTime": "16:00",
+                "settlementDaysToAdd": 0,
+            }
+            for code, name, scale, rate_scale, symbol, _usd in CURRENCIES
+        ],
+        "problems": None,
+    }
+
+
+class MockConfig:
+    """Behaviour knobs for the mock server."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        accounts: int = 3,
+        entries_per_day: int = 5,
+        quote_seconds: int = 30,
+        token_minutes: int = 60,
+        history: int = 0,
+        seed: int = 0,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.accounts = accounts
+        self.entries_per_day = entries_per_day
+        self.quote_seconds = quote_seconds
+        self.token_minutes = token_minutes
+        self.history = history
+        self.seed = seed
+
+
+class MockState:
+    """In-memory customers, tokens, quotes and payments. All access goes through ``lock``."""
+
+    def __init__(self, config: MockConfig) -> None:
+        self.config = config
+        self.lock = threading.Lock()
+        self.random = random.Random(config.seed)
+        self.tokens: dict[str, tuple[str, float]] = {}  # access token -> (customer ID, expires at)
+        self.refresh_tokens: dict[str, str] = {}  # refresh token -> customer ID
+        self.customers: dict[str, dict[str, dict]] = {}  # customer ID -> account ID -> account
+        self.quotes: dict[str, dict] = {}
+        self.payments: dict[str, dict] = {}
+        self.history: dict[str, dict[str, list[dict]]] = {}  # customer ID -> "payments"/"fxDeals" -> search records
+        self.attachments: dict[str, dict] = {}  # FileAttachmentId -> request fields plus decoded FileData
+        self.signup_customers: dict[str, dict] = {}  # CustomerId -> Customer/FromTemplate request fields
+        self.users: dict[str, dict] = {}  # lower-cased UserName -> user record (no password)
+        self.counter = 0
+        self.requests = 0
+        self.list_etag = '"' + hashlib.sha1(json.dumps(_currency_list()).encode()).hexdigest()[:16] + '"'
+
+    def next_number(self) -> int:
+        self.counter += 1
+        return self.counter
+
+    def customer_for(self, login: str) -> str:
+        """Stable customer ID for a login, creating its accounts on first use."""
+        customer_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"mock-wallet/{login}"))
+        if customer_id not in self.customers:
+            accounts = {}
+            for index in range(self.config.accounts):
+                code = SYMBOL_ORDER[index % len(SYMBOL_ORDER)]
+                account_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"mock-wallet/{login}/{index}"))
+                accounts[account_id] = {
+                    "accountId": account_id,
+                    "accountNumber": f"{100000 + len(self.customers) * 100 + index}",
+                    "currencyCode": code,
+                    "balance": quantize(Decimal(self.random.randint(1_000, 100_000)), CURRENCY_INFO[code][0]),
+                    "holds": Decimal(0),
+                }
+            self.customers[customer_id] = accounts
+            self.history[customer_id] = _seed_history(customer_id, [acct["currencyCode"] for acct in accounts.values()], self.config.history)
+        return customer_id
+
+    def issue_tokens(self, customer_id: str) -> dict:
+        access, refresh = uuid.uuid4().hex, uuid.uuid4().hex
+        self.tokens[access] = (customer_id, time.time() + self.config.token_minutes * 60)
+        self.refresh_tokens[refresh] = customer_id
+        return {"accessToken": access, "accessTokenExpiresInMinutes": self.config.token_minutes, "refreshToken": refresh, "refreshTokenExpiresInHours": 24}
+
+    def account(self, customer_id: str, currency: str) -> dict | None:
+        return next((acct for acct in self.customers.get(customer_id, {}).values() if acct["currencyCode"] == currency), None)
+
+
+def _payment_record(payment: dict, from_alias: str, created: datetime, posted: datetime | None) -> dict:
+    """A ``PaymentSearchRecord`` (src/types/payment.types.ts)."""
+    scale = CURRENCY_INFO[payment["currencyCode"]][0]
+    return {
+        "paymentId": payment["paymentId"],
+        "paymentReference": payment["paymentReference"],
+        "status": "Posted" if posted else "Created",
+        "fromCustomerAlias": from_alias,
+        "toCustomerAlias": payment["toCustomer"],
+        "paymentTypeName": "Instant Payment",
+        "amount": float(payment["amount"]),
+        "amountTextWithCurrencyCode": f"{payment['amount']:,.{scale}f} {payment['currencyCode']}",
+        "currencyCode": payment["currencyCode"],
+        "valueDate": f"{created:%Y-%m-%d}",
+        "createdTime": _api_time(created),
+        "postedTime": _api_time(posted) if posted else None,
+        "externalReference": payment.get("externalReference") or "",
+        "memo": payment.get("memo") or "",
+    }
+
+
+def _fx_deal_record(deal_id: str, reference: str, quote: dict, booked: datetime) -> dict:
+    """An ``FxDealSearchRecord`` (src/types/fx.types.ts)."""
+    buy, sell = quote["buyCurrencyCode"], quote["sellCurrencyCode"]
+    return {
+        "fxDealId": deal_id,
+        "fxDealReference": reference,
+        "fxDealTypeName": quote.get("dealType") or "SPOT",
+        "bookedForCustomerName": "Mock Customer",
+        "bookedTime": _api_time(booked),
+        "dealDate": f"{booked:%Y-%m-%d}",
+        "buyAmount": float(quote["buyAmount"]),
+        "buyCurrencyCode": buy,
+        "buyAmountTextWithCurrencyCode": f"{Decimal(quote['buyAmount']):,} {buy}",
+        "sellAmount": float(quote["sellAmount"]),
+        "sellCurrencyCode": sell,
+        "sellAmountTextWithCurrencyCode": f"{Decimal(quote['sellAmount']):,} {sell}",
+        "bookedRate": float(quote["rate"]),
+        "bookedRateTextWithCurrencyCodes": f"{quote['rate']} {quote['symbol']}",
+        "rateFormat": "Multiply",
+        "finalValueDate": f"{booked:%Y-%m-%d}",
+    }
+
+
+def _seed_history(customer_id: str, currencies: list[str], count: int) -> dict[str, list[dict]]:
+    """``count`` deterministic past payments and FX deals, one every two hours back from today."""
+    rng = random.Random(f"{customer_id}|history")
+    today = datetime.combine(date.today(), datetime.min.time())
+    payments, deals = [], []
+    for index in range(count):
+        created = today - timedelta(hours=2 * (index + 1), seconds=rng.randint(0, 3599))
+        ccy = currencies[index % len(currencies)] if currencies else "USD"
+        scale = CURRENCY_INFO[ccy][0]
+        payment = {
+            "paymentId": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{customer_id}/payment/{index}")),
+            "paymentReference": f"IPH{index:08d}",
+            "toCustomer": f"PAYEE-{rng.randint(1, 50):03d}",
+            "amount": quantize(Decimal(rng.randint(1, 5_000_00)) / 100, scale),
+            "currencyCode": ccy,
+        }
+        payments.append(_payment_record(payment, "MOCK", created, created + timedelta(seconds=5)))
+
+        buy, sell = rng.sample(SYMBOL_ORDER, 2)
+        base, counter = sorted((buy, sell), key=SYMBOL_ORDER.index)
+        rate = quantize(CURRENCY_INFO[base][2] / CURRENCY_INFO[counter][2], CURRENCY_INFO[counter][1])
+        buy_amount = quantize(Decimal(rng.randint(100, 100_000)), CURRENCY_INFO[buy][0])
+        sell_amount = quantize(buy_amount * (CURRENCY_INFO[buy][2] / CURRENCY_INFO[sell][2]), CURRENCY_INFO[sell][0])
+        quote = {
+            "buyCurrencyCode": buy,
+            "sellCurrencyCode": sell,
+            "buyAmount": str(buy_amount),
+            "sellAmount": str(sell_amount),
+            "rate": str(rate),
+            "symbol": f"{base}{counter}",
+        }
+        deal_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{customer_id}/fxdeal/{index}"))
+        deals.append(_fx_deal_record(deal_id, f"FXH{index:08d}", quote, created))
+    return {"payments": payments, "fxDeals": deals}
+
+
+def _entry_amounts(account_id: str, day: date, count: int, scale: int) -> list[tuple[int, int]]:
+    """Deterministic (debit, credit) minor-unit amounts for one account-day."""
+    rng = random.Random(f"{account_id}|{day.toordinal()}")
+    unit = 10**scale
+    amounts = []
+    for _ in range(count):
+        amount = rng.randint(1 * unit, 500 * unit)
+        # Slightly more credits than debits so balances drift upwards.
+        amounts.append((0, amount) if rng.random() < 0.55 else (amount, 0))
+    return amounts
+
+
+class StatementGenerator:
+    """Synthetic statements with a running balance that is continuous across days."""
+
+    def __init__(self, entries_per_day: int) -> None:
+        self.entries_per_day = entries_per_day
+        self._lock = threading.Lock()
+        self._opening: dict[str, dict[int, int]] = {}  # account -> day ordinal -> opening balance (minor units)
+
+    def opening_balance(self, account_id: str, day: date, scale: int) -> int:
+        """Opening balance of ``day`` in minor units (days before the epoch start at zero)."""
+        if day <= STATEMENT_EPOCH:
+            return 0
+        with self._lock:
+            known = self._opening.setdefault(account_id, {STATEMENT_EPOCH.toordinal(): 0})
+            ordinal = day.toordinal()
+            if ordinal in known:
+                return known[ordinal]
+            start = max(o for o in known if o < ordinal)
+            balance = known[start]
+            for current in range(start, ordinal):
+                for debit, credit in _entry_amounts(account_id, date.fromordinal(current), self.entries_per_day, scale):
+                    balance += credit - debit
+                known[current + 1] = balance
+            return balance
+
+    def statement(self, account: dict, start: date, end: date) -> dict:
+        scale = CURRENCY_INFO[account["currencyCode"]][0]
+        balance = beginning = self.opening_balance(account["accountId"], start, scale)
+        entries = []
+        day = start
+        while day <= end:
+            amounts = _entry_amounts(account["accountId"], day, self.entries_per_day, scale)
+            step = 86_400 // (len(amounts) + 1)
+            for seq, (debit, credit) in enumerate(amounts, start=1):
+                balance += credit - debit
+                entries.append(
+                    {
+                        "transactionTime": _api_time(datetime.combine(day, datetime.min.time()) + timedelta(seconds=seq * step)),
+                        "transactionType": TRANSACTION_TYPES[(debit + credit) % len(TRANSACTION_TYPES)],
+                        "description": f"Mock {'credit' if credit else 'debit'} {day:%Y%m%d}-{seq}",
+                        "debitAmount": float(from_minor(debit, scale)),
+                        "creditAmount": float(from_minor(credit, scale)),
+                        "runningBalance": float(from_minor(balance, scale)),
+                    }
+                )
+            day += timedelta(days=1)
+
+        return {
+            "accountInfo": {
+                "accountId": account["accountId"],
+                "accountNumber": account["accountNumber"],
+                "accountName": f"{account['currencyCode']} Account",
+                "accountCurrencyCode": account["currencyCode"],
+                "accountCurrencyScale": scale,
+                "beginningBalance": float(from_minor(beginning, scale)),
+                "endingBalance": float(from_minor(balance, scale)),
+            },
+            "entries": entries,
+            "problems": None,
+        }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Routes requests to the mock endpoints. ``server.state`` holds the shared ``MockState``."""
+
+    protocol_version = "HTTP/1.1"
+    # Buffer each response into one write and send it at once; otherwise Nagle
+    # plus delayed ACKs add ~40 ms to every keep-alive response.
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+    server: "MockServer"
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # --- plumbing -----------------------------------------------------------
+
+    def _send(self, status: int, body: dict | None = None, headers: dict | None = None) -> None:
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _customer(self) -> str | None:
+        """Customer ID for the bearer token, or None (after sending 401)."""
+        token = (self.headers.get("Authorization") or "").removeprefix("Bearer ").strip()
+        state = self.server.state
+        with state.lock:
+            customer_id, expires_at = state.tokens.get(token, (None, 0))
+        if customer_id is None or expires_at <= time.time():
+            self._send(401, {"problems": _problem("Unauthorized", 401)})
+            return None
+        return customer_id
+
+    def _dispatch(self, method: str) -> None:
+        state = self.server.state
+        config = state.config
+        parts = urlsplit(self.path)
+        path = parts.path.removeprefix(API_PREFIX).rstrip("/")
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        body = self._body() if method in ("POST", "PATCH") else {}
+
+        with state.lock:
+            state.requests += 1
+            delay = max(0.0, state.random.gauss(config.latency_ms, config.jitter_ms)) / 1000 if config.latency_ms or config.jitter_ms else 0.0
+            fail = config.error_rate > 0 and not path.lower().startswith("/authenticate") and state.random.random() < config.error_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            self._send(config.error_status, {"problems": _problem("Injected failure", config.error_status)})
+            return
+
+        for route_method, prefix, handler in ROUTES:
+            if method == route_method and (path.lower() == prefix.lower() or path.lower().startswith(prefix.lower() + "/")):
+                handler(self, path[len(prefix) :].strip("/"), query, body)
+                return
+        self._send(404, {"problems": _problem(f"No route for {method} {path}", 404)})
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_PATCH(self) -> None:
+        self._dispatch("PATCH")
+
+    # --- endpoints ----------------------------------------------------------
+
+    def authenticate(self, _rest: str, _query: dict, body: dict) -> None:
+        login = body.get("loginId") or body.get("LoginId")
+        if not login:
+            self._send(400, {"problems": _problem("loginId is required")})
+            return
+        state = self.server.state
+        with state.lock:
+            customer_id = state.customer_for(login)
+            tokens = state.issue_tokens(customer_id)
+        settings = {"userId": str(uuid.uuid5(uuid.NAMESPACE_URL, f"mock-user/{login}")), "userName": login, "organizationId": customer_id}
+        self._send(200, {"tokens": tokens, "userSettings": settings if body.get("includeUserSettingsInResponse") else None, "problems": None})
+
+    def refresh(self, _rest: str, _query: dict, body: dict) -> None:
+        state = self.server.state
+        with state.lock:
+            customer_id = state.refresh_tokens.pop(body.get("refreshToken") or "", None)
+            tokens = state.issue_tokens(customer_id) if customer_id else None
+        if tokens is None:
+            self._send(401, {"problems": _problem("Invalid refresh token", 401)})
+            return
+        self._send(200, {"tokens": tokens, "problems": None})
+
+    def balances(self, rest: str, _query: dict, _body: dict) -> None:
+        if self._customer() is None:
+            return
+        state = self.server.state
+        with state.lock:
+            accounts = list(state.customers.get(rest, {}).values())
+            rows = []
+            for acct in accounts:
+                scale = CURRENCY_INFO[acct["currencyCode"]][0]
+                available = acct["balance"] - acct["holds"]
+                rows.append(
+                    {
+                        "accountId": acct["accountId"],
+                        "accountNumber": acct["accountNumber"],
+                        "currencyCode": acct["currencyCode"],
+                        "balance": float(acct["balance"]),
+                        "balanceText": f"{acct['balance']:,.{scale}f}",
+                        "activeHoldsTotal": float(acct["holds"]),
+                        "balanceAvailable": float(available),
+                        "balanceAvailableText": f"{available:,.{scale}f}",
+                        "baseCurrencyCode": "USD",
+                    }
+                )
+        body = {"balances": rows, "problems": None}
+        etag = '"' + hashlib.sha1(json.dumps(body).encode()).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, None, {"ETag": etag})
+            return
+        self._send(200, body, {"ETag": etag})
+
+    def statement(self, _rest: str, query: dict, _body: dict) -> None:
+        customer_id = self._customer()
+        if customer_id is None:
+            return
+        try:
+            start = date.fromisoformat(query["strStartDate"])
+            end = date.fromisoformat(query["strEndDate"])
+        except (KeyError, ValueError):
+            self._send(400, {"problems": _problem("strStartDate and strEndDate (YYYY-MM-DD) are required")})
+            return
+        state = self.server.state
+        with state.lock:
+            account = state.customers.get(customer_id, {}).get(query.get("accountId", ""))
+        if account is None:
+            self._send(200, {"accountInfo": None, "entries": [], "problems": _problem("Account not found")})
+            return
+        self._send(200, self.server.statements.statement(account, start, end))
+
+    def currency_list(self, _rest: str, _query: dict, _body: dict) -> None:
+        if self._customer() is None:
+            return
+        etag = self.server.state.list_etag
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, None, {"ETag": etag})
+            return
+        self._send(200, _currency_list(), {"ETag": etag, "Cache-Control": "private, max-age=3600"})
+
+    def fx_quote(self, rest: str, query: dict, body: dict) -> None:
+        if rest:
+            self._send(404, {"problems": _problem(f"No route for POST /FXDealQuote/{rest}", 404)})
+            return
+        customer_id = self._customer()
+        if customer_id is None:
+            return
+        buy, sell = body.get("buyCurrencyCode"), body.get("sellCurrencyCode")
+        amount_ccy = body.get("amountCurrencyCode")
+        if buy not in CURRENCY_INFO or sell not in CURRENCY_INFO or buy == sell or amount_ccy not in (buy, sell):
+            self._send(200, {"quote": None, "problems": _problem("Invalid currency pair")})
+            return
+        try:
+            amount = Decimal(str(body.get("amount")))
+        except ArithmeticError:
+            amount = Decimal(0)
+        if amount <= 0:
+            self._send(200, {"quote": None, "problems": _problem("Amount must be positive")})
+            return
+
+        base, counter = sorted((buy, sell), key=SYMBOL_ORDER.index)
+        rate_scale = CURRENCY_INFO[counter][1] + 2
+        state = self.server.state
+        with state.lock:
+            noise = Decimal(str(1 + state.random.gauss(0, 0.0005)))
+            number = state.next_number()
+        mid = CURRENCY_INFO[base][2] / CURRENCY_INFO[counter][2] * noise
+        # The customer pays the spread: buying the base costs more, selling it earns less.
+        rate = quantize(mid * (Decimal("1.001") if buy == base else Decimal("0.999")), rate_scale)
+
+        def convert(value: Decimal, from_ccy: str, to_ccy: str) -> Decimal:
+            converted = value * rate if from_ccy == base else value / rate
+            return quantize(converted, CURRENCY_INFO[to_ccy][0])
+
+        other = sell if amount_ccy == buy else buy
+        amounts = {amount_ccy: quantize(amount, CURRENCY_INFO[amount_ccy][0]), other: convert(amount, amount_ccy, other)}
+        now = datetime.now()
+        quote = {
+            "quoteId": str(uuid.uuid4()),
+            "quoteReference": f"QT{number:08d}",
+            "quoteSequenceNumber": str(number),
+            "customerAccountNumber": "",
+            "dealType": body.get("dealType") or "SPOT",
+            "buyAmount": str(amounts[buy]),
+            "buyCurrencyCode": buy,
+            "sellAmount": str(amounts[sell]),
+            "sellCurrencyCode": sell,
+            "rate": str(rate),
+            "symbol": f"{base}{counter}",
+            "dealDate": f"{now:%Y-%m-%d}",
+            "valueDate": f"{now:%Y-%m-%d}",
+            "quoteTime": _api_time(now),
+            "expirationTime": _api_time(now + timedelta(seconds=state.config.quote_seconds)),
+            "isForCurrencyCalculator": bool(body.get("isForCurrencyCalculator")),
+        }
+        if not quote["isForCurrencyCalculator"]:
+            with state.lock:
+                state.quotes[quote["quoteId"]] = {**quote, "customerId": customer_id, "expiresAt": time.time() + state.config.quote_seconds}
+        self._send(200, {"quote": quote, "problems": None})
+
+    def fx_book(self, rest: str, _query: dict, _body: dict) -> None:
+        quote_id, _, action = rest.partition("/")
+        if action != "BookAndInstantDeposit":
+            self._send(404, {"problems": _problem(f"No route for PATCH /FXDealQuote/{rest}", 404)})
+            return
+        customer_id = self._customer()
+        if customer_id is None:
+            return
+        state = self.server.state
+        with state.lock:
+            quote = state.quotes.get(quote_id)
+            if quote is None or quote["customerId"] != customer_id:
+                problem = "Quote not found"
+            elif quote.get("booked"):
+                problem = "Quote has already been booked"
+            elif quote["expiresAt"] <= time.time():
+                problem = "Quote has expired"
+            else:
+                problem = None
+                quote["booked"] = True
+                for ccy, delta in ((quote["buyCurrencyCode"], Decimal(quote["buyAmount"])), (quote["sellCurrencyCode"], -Decimal(quote["sellAmount"]))):
+                    acct = state.account(customer_id, ccy)
+                    if acct is not None:
+                        acct["balance"] += delta
+                number = state.next_number()
+        if problem:
+            self._send(200, {"fxDepositData": None, "problems": _problem(problem)})
+            return
+        data = {"fxDealId": str(uuid.uuid4()), "fxDealReference": f"FX{number:08d}", "depositId": str(uuid.uuid4()), "depositReference": f"DP{number:08d}"}
+        with state.lock:
+            state.history[customer_id]["fxDeals"].append(_fx_deal_record(data["fxDealId"], data["fxDealReference"], quote, datetime.now()))
+        self._send(200, {"fxDepositData": data, "problems": None})
+
+    def instant_payment(self, rest: str, _query: dict, body: dict) -> None:
+        if rest:
+            self._send(404, {"problems": _problem(f"No route for POST /InstantPayment/{rest}", 404)})
+            return
+        customer_id = self._customer()
+        if customer_id is None:
+            return
+        currency = body.get("currencyCode")
+        try:
+            amount = Decimal(str(body.get("amount")))
+        except ArithmeticError:
+            amount = Decimal(0)
+        if not body.get("toCustomer"):
+            problem = "toCustomer is required"
+        elif currency not in CURRENCY_INFO:
+            problem = f"Unsupported currency {currency}"
+        elif amount <= 0 or quantize(amount, CURRENCY_INFO[currency][0]) != amount:
+            problem = f"Invalid amount {body.get('amount')}"
+        else:
+            problem = None
+        if problem:
+            self._send(200, {"payment": None, "problems": _problem(problem)})
+            return
+
+        state = self.server.state
+        with state.lock:
+            number = state.next_number()
+            payment = {
+                "paymentId": str(uuid.uuid4()),
+                "paymentReference": f"IP{number:08d}",
+                "timestamp": hex(number),
+                "customerId": customer_id,
+                "amount": amount,
+                "currencyCode": currency,
+                "toCustomer": body.get("toCustomer"),
+                "externalReference": body.get("externalReference"),
+                "memo": body.get("memo"),
+                "created": datetime.now(),
+                "posted": False,
+            }
+            state.payments[payment["paymentId"]] = payment
+        self._send(200, {"payment": {key: payment[key] for key in ("paymentId", "paymentReference", "timestamp")}, "problems": None})
+
+    def instant_payment_post(self, _rest: str, _query: dict, body: dict) -> None:
+        customer_id = self._customer()
+        if customer_id is None:
+            return
+        state = self.server.state
+        with state.lock:
+            payment = state.payments.get(body.get("instantPaymentId") or "")
+            if payment is None or payment["customerId"] != customer_id:
+                problem = "Payment not found"
+            elif payment["timestamp"] != body.get("timestamp"):
+                problem = "Payment was changed by another user"
+            elif payment["posted"]:
+                problem = "Payment has already been posted"
+            else:
+                problem = None
+                payment["posted"] = True
+                acct = state.account(customer_id, payment["currencyCode"])
+                if acct is not None:
+                    acct["balance"] -= payment["amount"]
+                state.history[customer_id]["payments"].append(_payment_record(payment, "MOCK", payment["created"], datetime.now()))
+        self._send(200, {"payment": None, "problems": _problem(problem) if problem else None})
+
+    def _search(self, kind: str, query: dict) -> tuple[list[dict], int] | None:
+        """Sorted page of one customer's search records plus the total count, or None (after sending 401)."""
+        customer_id = self._customer()
+        if customer_id is None:
+            return None
+        try:
+            page_index = max(0, int(query.get("PageIndex", 0)))
+            page_size = max(1, min(int(query.get("PageSize", 25)), 1000))
+        except ValueError:
+            page_index, page_size = 0, 25
+        sort_by = query.get("SortBy") or ""
+        sort_key = sort_by[:1].lower() + sort_by[1:]
+        state = self.server.state
+        with state.lock:
+            records = list(state.history.get(customer_id, {}).get(kind, []))
+        # "<Field>Min" / "<Field>Max" bound a time field, e.g. CreatedTimeMin=2025-06-01T00:00:00.
+        for name, value in query.items():
+            if value and name.endswith(("Min", "Max")):
+                key = name[:1].lower() + name[1:-3]
+                low = name.endswith("Min")
+                records = [record for record in records if ((record.get(key) or "")[:19] >= value if low else (record.get(key) or "")[:19] <= value)]
+        if records and sort_key in records[0]:
+            records.sort(key=lambda record: record[sort_key] or "", reverse=query.get("SortDirection", "").lower() == "descending")
+        start = page_index * page_size
+        return records[start : start + page_size], len(records)
+
+    def payment_search(self, _rest: str, query: dict, _body: dict) -> None:
+        found = self._search("payments", query)
+        if found is not None:
+            page, total = found
+            self._send(200, {"records": {"payments": page, "recordCount": len(page), "totalRecords": total}, "problems": None})
+
+    def fx_deal_search(self, _rest: str, query: dict, _body: dict) -> None:
+        found = self._search("fxDeals", query)
+        if found is not None:
+            page, total = found
+            self._send(200, {"recordCount": len(page), "totalRecords": total, "fxDeals": page, "problems": None})
+
+    def file_attachment_add(self, _rest: str, _query: dict, body: dict) -> None:
+        customer_id = self._customer()
+        if customer_id is None:
+            return
+        try:
+            file_data = base64.b64decode(body.get("FileData") or "", validate=True)
+        except binascii.Error:
+            self._send(200, {"IsSuccessful": False, "Problems": [{"ProblemType": 1, "Message": "FileData is not valid base64"}]})
+            return
+        attachment_id = str(uuid.uuid4())
+        fields = {name: value for name, value in body.items() if name != "FileData"}
+        properties = {"DocumentType": "Passport", "DocumentNumber": f"M{len(file_data):08d}"} if fields.get("FileAttachmentTypeId") in (1, 2) else None
+        with self.server.state.lock:
+            self.server.state.attachments[attachment_id] = {
+                **fields,
+                "FileAttachmentId": attachment_id,
+                "FileSize": len(file_data),
+                "AttachedTime": _api_time(datetime.now()),
+                "Properties": properties,
+                "FileData": file_data,
+            }
+        self._send(200, {"IsSuccessful": True, "Problems": None, "FileAttachment": {"FileAttachmentId": attachment_id, "Properties": properties}})
+
+    def file_attachment_get(self, rest: str, _query: dict, _body: dict) -> None:
+        if self._customer() is None:
+            return
+        with self.server.state.lock:
+            attachment = self.server.state.attachments.get(rest)
+        if attachment is None:
+            self._send(200, {"IsSuccessful": False, "Problems": [{"ProblemType": 1, "Message": "File attachment not found"}]})
+            return
+        data = {**attachment, "FileData": base64.b64encode(attachment["FileData"]).decode()}
+        self._send(200, {"IsSuccessful": True, "Problems": None, "FileAttachment": data})
+
+    def file_attachment_list(self, rest: str, _query: dict, _body: dict) -> None:
+        if self._customer() is None:
+            return
+        with self.server.state.lock:
+            items = [
+                {name: value for name, value in attachment.items() if name != "FileData"}
+                for attachment in self.server.state.attachments.values()
+                if attachment.get("ParentObjectId") == rest
+            ]
+        self._send(200, {"IsSuccessful": True, "Problems": None, "FileAttachments": items})
+
+    def username_exists(self, rest: str, _query: dict, _body: dict) -> None:
+        if self._customer() is None:
+            return
+        with self.server.state.lock:
+            exists = rest.lower() in self.server.state.users
+        self._send(200, {"IsSuccessful": True, "Problems": None, "Exists": exists})
+
+    def customer_from_template(self, _rest: str, _query: dict, body: dict) -> None:
+        if self._customer() is None:
+            return
+        if not body.get("CustomerTemplateId") or not body.get("LastName"):
+            self._send(200, {"IsSuccessful": False, "Problems": [{"ProblemType": 1, "Message": "CustomerTemplateId and LastName are required"}]})
+            return
+        customer_id = str(uuid.uuid4())
+        with self.server.state.lock:
+            self.server.state.signup_customers[customer_id] = dict(body)
+        self._send(200, {"IsSuccessful": True, "Problems": None, "Customer": {"CustomerId": customer_id}})
+
+    def customer_user_add(self, _rest: str, _query: dict, body: dict) -> None:
+        if self._customer() is None:
+            return
+        username = body.get("UserName") or ""
+        state = self.server.state
+        with state.lock:
+            if body.get("CustomerId") not in state.signup_customers:
+                problem = "Customer not found"
+            elif not username or username.lower() in state.users:
+                problem = f"Username {username!r} is not available"
+            else:
+                problem = None
+                user_id = str(uuid.uuid4())
+                state.users[username.lower()] = {"UserId": user_id, "UserName": username, "CustomerId": body["CustomerId"], "AccessRightTemplateId": None}
+        if problem:
+            self._send(200, {"IsSuccessful": False, "Problems": [{"ProblemType": 1, "Message": problem}]})
+            return
+        self._send(200, {"IsSuccessful": True, "Problems": None, "User": {"UserId": user_id}})
+
+    def customer_user_search(self, _rest: str, query: dict, _body: dict) -> None:
+        if self._customer() is None:
+            return
+        username = (query.get("UserName") or "").lower()
+        with self.server.state.lock:
+            users = [dict(user) for key, user in self.server.state.users.items() if not username or key == username]
+        self._send(200, {"IsSuccessful": True, "Problems": None, "Records": {"Users": users, "TotalRecords": len(users)}})
+
+    def link_access_rights(self, _rest: str, _query: dict, body: dict) -> None:
+        if self._customer() is None:
+            return
+        state = self.server.state
+        with state.lock:
+            user = next((user for user in state.users.values() if user["UserId"] == body.get("UserId")), None)
+            if user is not None:
+                user["AccessRightTemplateId"] = body.get("AccessRightTemplateId")
+        if user is None:
+            self._send(200, {"IsSuccessful": False, "Problems": [{"ProblemType": 1, "Message": "User not found"}]})
+            return
+        self._send(200, {"IsSuccessful": True, "Problems": None})
+
+
+# (method, path prefix, handler); more specific prefixes first.
+ROUTES = [
+    ("POST", "/Authenticate/Refresh", MockHandler.refresh),
+    ("POST", "/authenticate", MockHandler.authenticate),
+    ("GET", "/CustomerAccountBalance", MockHandler.balances),
+    ("GET", "/CustomerAccountStatement", MockHandler.statement),
+    ("GET", "/PaymentCurrencyList", MockHandler.currency_list),
+    ("GET", "/FXCurrencyList", MockHandler.currency_list),
+    ("POST", "/FXDealQuote", MockHandler.fx_quote),
+    ("PATCH", "/FXDealQuote", MockHandler.fx_book),
+    ("PATCH", "/InstantPayment/Post", MockHandler.instant_payment_post),
+    ("GET", "/InstantPayment/Search", MockHandler.payment_search),
+    ("GET", "/FXDeal/Search", MockHandler.fx_deal_search),
+    ("POST", "/InstantPayment", MockHandler.instant_payment),
+    ("POST", "/FileAttachment", MockHandler.file_attachment_add),
+    ("GET", "/FileAttachment", MockHandler.file_attachment_get),
+    ("GET", "/FileAttachmentInfoList", MockHandler.file_attachment_list),
+    ("GET", "/User/DoesUsernameExist", MockHandler.username_exists),
+    ("PATCH", "/User/LinkAccessRightTemplate", MockHandler.link_access_rights),
+    ("POST", "/Customer/FromTemplate", MockHandler.customer_from_template),
+    ("GET", "/CustomerUser/Search", MockHandler.customer_user_search),
+    ("POST", "/CustomerUser", MockHandler.customer_user_add),
+]
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded HTTP server carrying the shared mock state."""
+
+    daemon_threads = True
+    # The default backlog of 5 drops connection bursts (1 s SYN retry) at high concurrency.
+    request_queue_size = 256
+
+    def __init__(self, address: tuple[str, int], config: MockConfig | None = None, verbose: bool = False) -> None:
+        super().__init__(address, MockHandler)
+        self.state = MockState(config or MockConfig())
+        self.statements = StatementGenerator(self.state.config.entries_per_day)
+        self.verbose = verbose
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+
+def start_server(config: MockConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> MockServer:
+    """Start a mock server on a background thread and return it (``port=0`` picks a free port).
+
+    Call ``server.shutdown()`` to stop it; ``server.base_url`` is the value for ``WALLET_API_URL``.
+    """
+    server = MockServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="mock-wallet-api", daemon=True).start()
+    return server
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run a local mock of the wallet API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8599, help="Port to listen on, 0 for any free port (default 8599)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean added latency per request in ms (default 0)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Standard deviation of the added latency in ms (default 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of non-auth requests that fail (default 0)")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status for injected failures (default 503)")
+    parser.add_argument("--accounts", type=int, default=3, help="Accounts per customer (default 3)")
+    parser.add_argument("--entries-per-day", type=int, default=5, help="Statement entries per account per day (default 5)")
+    parser.add_argument("--quote-seconds", type=int, default=30, help="FX quote validity in seconds (default 30)")
+    parser.add_argument("--token-minutes", type=int, default=60, help="Access token lifetime in minutes (default 60)")
+    parser.add_argument("--history", type=int, default=0, help="Past payments and FX deals seeded per customer (default 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for balances, rates, latency and failures")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    config = MockConfig(
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        accounts=args.accounts,
+        entries_per_day=args.entries_per_day,
+        quote_seconds=args.quote_seconds,
+        token_minutes=args.token_minutes,
+        history=args.history,
+        seed=args.seed,
+    )
+    try:
+        server = MockServer((args.host, args.port), config, verbose=args.verbose)
+    except OSError as exc:
+        print(f"Error: Cannot listen on {args.host}:{args.port}: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    print("\n=== MOCK WALLET API ===")
+    print(f"  Listening on {server.base_url}")
+    print(f"  export WALLET_API_URL={server.base_url}")
+    print("  Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(f"\nServed {server.state.requests:,} request(s).")
+
+
+if __name__ == "__main__":
+    main()
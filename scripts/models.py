@@ -0,0 +1,210 @@
+"""Fast JSON decoding and compact response models for large API payloads.
+
+``loads`` decodes response bodies with ``orjson`` or ``msgspec`` when one is
+installed and falls back to the standard library otherwise; force a backend
+with ``WALLET_JSON_BACKEND=orjson|msgspec|json``.
+
+Statement responses are wrapped in models mirroring the API types
+(``src/types/statement.types.ts``, ``refs/DTO/DTOResponseBase.cs``). A model
+is a tuple subclass with ``__slots__ = ()``, so an entry costs one small
+tuple instead of a per-entry hash table, and is built from the decoded dict
+at C speed. The ``entries`` list is converted lazily, on first read, and
+``len()`` never converts anything. Models keep the dict read API (``get``,
+``[]``, ``in``), so code written against plain ``response.json()`` dicts
+works unchanged.
+
+Requires (optional, for the fast backends):
+    uv pip install orjson           # or msgspec
+"""
+
+import json
+import os
+import sys
+from collections import namedtuple
+from collections.abc import Iterator, Sequence
+from itertools import repeat
+from operator import itemgetter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+import requests
+
+
+def _select_backend(name: str) -> str:
+    name = name.strip().lower() or "auto"
+    if name == "auto":
+        return "orjson" if orjson is not None else "msgspec" if msgspec is not None else "json"
+    if name not in ("orjson", "msgspec", "json"):
+        print(f"Error: Unknown WALLET_JSON_BACKEND {name!r} (expected orjson, msgspec or json).", file=sys.stderr)
+        sys.exit(1)
+    if (name == "orjson" and orjson is None) or (name == "msgspec" and msgspec is None):
+        print(f"Error: WALLET_JSON_BACKEND={name} but {name} is not installed (uv pip install {name}).", file=sys.stderr)
+        sys.exit(1)
+    return name
+
+
+JSON_BACKEND = _select_backend(os.environ.get("WALLET_JSON_BACKEND", "auto"))
+
+if JSON_BACKEND == "orjson":
+    loads = orjson.loads
+elif JSON_BACKEND == "msgspec":
+    loads = msgspec.json.Decoder().decode
+else:
+    loads = json.loads
+
+
+def response_json(response: requests.Response):
+    """Decode a response body with the configured backend (drop-in for ``response.json()``)."""
+    return loads(response.content)
+
+
+class Model(tuple):
+    """Base for compact response models: a tuple with ``__slots__ = ()``.
+
+    Subclasses list their JSON field names in ``FIELDS``; each becomes a
+    read-only attribute, as with ``namedtuple``. A field missing from the JSON
+    reads as None, and ``get`` returns its default for None values, so
+    ``entry.get("description", "")`` behaves as it does on the raw dict.
+    """
+
+    __slots__ = ()
+    FIELDS: tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._index = {name: index for index, name in enumerate(cls.FIELDS)}
+        cls._values = itemgetter(*cls.FIELDS)
+        # namedtuple's field descriptors read the tuple slot directly, bypassing __getitem__.
+        layout = namedtuple(cls.__name__, cls.FIELDS)
+        for name in cls.FIELDS:
+            setattr(cls, name, layout.__dict__[name])
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        try:
+            values = cls._values(data)
+        except KeyError:
+            values = tuple(map(data.get, cls.FIELDS))
+        return tuple.__new__(cls, values)
+
+    @classmethod
+    def from_dicts(cls, items: list[dict]) -> list:
+        """Convert a whole list in one pass (no Python-level call per item when no field is missing)."""
+        try:
+            return list(map(tuple.__new__, repeat(cls), map(cls._values, items)))
+        except KeyError:
+            return [cls.from_dict(item) for item in items]
+
+    def get(self, key: str, default=None):
+        index = self._index.get(key)
+        value = None if index is None else tuple.__getitem__(self, index)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return tuple.__getitem__(self, self._index[key])
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def keys(self) -> tuple[str, ...]:
+        return self.FIELDS
+
+    def to_dict(self) -> dict:
+        """Plain-dict copy, e.g. for ``json.dumps`` (which would write a model as a list)."""
+        return dict(zip(self.FIELDS, self))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class LazyModels(Sequence):
+    """List of JSON objects converted to ``model`` instances on first access.
+
+    ``len()`` is free; the first read converts the whole list in one pass
+    and drops the dicts.
+    """
+
+    __slots__ = ("_items", "_model", "_converted")
+
+    def __init__(self, items: list, model: type[Model]) -> None:
+        self._items = items
+        self._model = model
+        self._converted = False
+
+    def _convert(self) -> list:
+        if not self._converted:
+            self._items = self._model.from_dicts(self._items)
+            self._converted = True
+        return self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._convert()[index]
+
+    def __iter__(self) -> Iterator[Model]:
+        return iter(self._convert())
+
+    def __repr__(self) -> str:
+        return f"<{len(self._items)} {self._model.__name__}>"
+
+
+class Problem(Model):
+    __slots__ = ()
+    FIELDS = ("problemCode", "problemType", "message", "messageDetails", "fieldName", "fieldValue")
+
+
+class AccountInfo(Model):
+    __slots__ = ()
+    FIELDS = (
+        "accountId",
+        "accountNumber",
+        "accountName",
+        "accountCurrencyCode",
+        "accountCurrencyScale",
+        "beginningBalance",
+        "endingBalance",
+    )
+
+
+class StatementEntry(Model):
+    __slots__ = ()
+    FIELDS = ("transactionTime", "transactionType", "description", "debitAmount", "creditAmount", "runningBalance")
+
+
+class StatementResponse(Model):
+    """``GET /CustomerAccountStatement`` response with lazily converted ``entries``."""
+
+    __slots__ = ()
+    FIELDS = ("accountInfo", "entries", "problems")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StatementResponse":
+        info = data.get("accountInfo")
+        problems = data.get("problems")
+        return tuple.__new__(
+            cls,
+            (
+                AccountInfo.from_dict(info) if info else None,
+                LazyModels(data.get("entries") or [], StatementEntry),
+                [Problem.from_dict(problem) for problem in problems] if problems else None,
+            ),
+        )
+
+    @classmethod
+    def from_response(cls, response: requests.Response) -> "StatementResponse":
+        return cls.from_dict(response_json(response))
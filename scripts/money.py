@@ -0,0 +1,110 @@
+"""Exact, scale-aware money arithmetic shared by all scripts.
+
+Amounts are ``Decimal`` values quantized to the currency's scale
+(``currencyAmountScale`` / ``accountCurrencyScale`` from the API, 2 when
+unknown). Bulk paths can work in integer minor units (``to_minor`` /
+``from_minor``), which sum exactly and far faster than Decimals.
+
+Quantizers, format specs and the arithmetic context are built once per scale
+and cached, so per-amount work is a single quantize or format call.
+"""
+
+from collections.abc import Iterable
+from decimal import ROUND_HALF_UP, Context, Decimal, InvalidOperation
+from functools import lru_cache
+
+DEFAULT_SCALE = 2
+ZERO = Decimal(0)
+
+# 34 significant digits (IEEE decimal128) is far beyond any wallet amount.
+MONEY_CONTEXT = Context(prec=34, rounding=ROUND_HALF_UP)
+
+
+@lru_cache(maxsize=None)
+def quantum(scale: int) -> Decimal:
+    """The smallest unit at ``scale`` decimal places, e.g. ``Decimal("0.01")`` for 2."""
+    return Decimal(1).scaleb(-scale)
+
+
+@lru_cache(maxsize=None)
+def _format_spec(scale: int, grouping: bool) -> str:
+    return f"{',' if grouping else ''}.{scale}f"
+
+
+def to_decimal(value: object) -> Decimal:
+    """Convert an API or user value (str, int, float, Decimal, None) to an exact Decimal.
+
+    Floats go through their shortest repr, so ``0.1`` becomes ``Decimal("0.1")``
+    rather than its binary expansion. Raises ValueError for non-numeric input.
+    """
+    if value is None or value == "":
+        return ZERO
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        value = repr(value)
+    try:
+        result = Decimal(value.strip() if isinstance(value, str) else value)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"invalid amount {value!r}") from None
+    if not result.is_finite():
+        raise ValueError(f"invalid amount {value!r}")
+    return result
+
+
+def quantize(value: object, scale: int = DEFAULT_SCALE) -> Decimal:
+    """Round a value to ``scale`` decimal places (half-up)."""
+    return to_decimal(value).quantize(quantum(scale), context=MONEY_CONTEXT)
+
+
+def parse_amount(value: object, scale: int | None = DEFAULT_SCALE) -> Decimal:
+    """Parse a user-supplied amount, rejecting more decimal places than ``scale`` allows.
+
+    Pass ``scale=None`` when the currency scale is unknown to skip that check.
+    """
+    amount = to_decimal(value)
+    if scale is None:
+        return amount
+    quantized = amount.quantize(quantum(scale), context=MONEY_CONTEXT)
+    if quantized != amount:
+        raise ValueError(f"amount {value!r} has more than {scale} decimal place(s)")
+    return quantized
+
+
+def format_amount(value: object, scale: int = DEFAULT_SCALE, grouping: bool = True) -> str:
+    """Format an amount with exactly ``scale`` decimals (and thousands separators)."""
+    return format(quantize(value, scale), _format_spec(scale, grouping))
+
+
+def to_minor(value: object, scale: int = DEFAULT_SCALE) -> int:
+    """Convert an amount to integer minor units, e.g. ``12.34`` -> ``1234`` at scale 2."""
+    return int(quantize(value, scale).scaleb(scale))
+
+
+def from_minor(units: int, scale: int = DEFAULT_SCALE) -> Decimal:
+    """Convert integer minor units back to a Decimal amount."""
+    return Decimal(int(units)).scaleb(-scale)
+
+
+def sum_amounts(values: Iterable[object], scale: int = DEFAULT_SCALE) -> Decimal:
+    """Exact sum of amounts, accumulated in integer minor units."""
+    return from_minor(sum(to_minor(value, scale) for value in values), scale)
+
+
+def to_wire(value: Decimal) -> float:
+    """Convert an amount to the JSON number sent to the API.
+
+    The float's shortest repr is the same decimal text, so the server sees
+    the exact amount. Raises ValueError for amounts with more significant
+    digits than a float can carry (over 15).
+    """
+    number = float(value)
+    if Decimal(repr(number)) != value:
+        raise ValueError(f"amount {value} cannot be sent exactly as a JSON number")
+    return number
+
+
+def scale_of(value: Decimal, minimum: int = DEFAULT_SCALE) -> int:
+    """Decimal places needed to show ``value`` exactly, but at least ``minimum``."""
+    exponent = value.as_tuple().exponent
+    return max(minimum, -exponent if isinstance(exponent, int) else 0)
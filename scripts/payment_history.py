@@ -0,0 +1,21 @@
+"""Export the full InstantPayment history to CSV or JSONL.
+
+Walks every page of ``GET /InstantPayment/Search`` (the web client only
+shows the newest 25), fetching pages concurrently and writing them out in
+order. See ``history_export.py`` for how paging and de-duplication work.
+
+Usage:
+    python scripts/payment_history.py
+    python scripts/payment_history.py --format jsonl -o payments.jsonl --workers 8
+    python scripts/payment_history.py --page-size 250 --param Status=Posted
+"""
+
+from history_export import PAYMENTS, run
+
+
+def main() -> None:
+    run(PAYMENTS, "payment_history")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Write-ahead journal for batch instant payments.
+
+Records each payment's progress through the two-step flow in a local SQLite
+database (WAL mode), keyed by an idempotency key for the payout (see
+``payment_key``):
+
+    creating  -> POST /InstantPayment sent, response not yet recorded
+    created   -> paymentId/timestamp recorded, not yet posted
+    posting   -> PATCH /InstantPayment/Post sent, response not yet recorded
+    posted    -> PATCH /InstantPayment/Post succeeded
+    create_failed / post_failed -> last attempt failed (retried on resume)
+
+Re-running a batch against the same journal skips posted payments, posts
+already-created ones without creating them again, and only creates the rest.
+
+A step is claimed before its request is sent, in one SQLite statement, so
+of several workers or processes sharing a journal only one sends it. A row
+left in ``creating`` or ``posting`` belongs to whoever claimed it until
+``CLAIM_TIMEOUT`` has passed; after that (e.g. the claimant crashed) the step
+is claimed and sent again. An orphan of an interrupted create was never
+posted and so moved no funds.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from money import to_decimal
+
+# Seconds after which a step claimed but never finished may be claimed again.
+# Longer than a request with all its retries, so a live claim is never taken over.
+CLAIM_TIMEOUT = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payments (
+    key               TEXT PRIMARY KEY,
+    line              INTEGER,
+    to_customer       TEXT NOT NULL,
+    amount            TEXT NOT NULL,
+    currency          TEXT NOT NULL,
+    reference         TEXT NOT NULL DEFAULT '',
+    status            TEXT NOT NULL,
+    payment_id        TEXT,
+    payment_reference TEXT,
+    timestamp         TEXT,
+    error             TEXT,
+    updated_at        REAL NOT NULL
+)
+"""
+
+
+def _content(row: dict) -> str:
+    """Payee, amount, currency and reference of a payout row, normalised alike for raw and validated rows."""
+    try:
+        amount = format(to_decimal(row.get("amount")).normalize(), "f")
+    except ValueError:
+        amount = str(row.get("amount")).strip()
+    currency = str(row.get("currency") or "USD").strip().upper()
+    return "\x1f".join((str(row.get("to_customer") or "").strip(), amount, currency, str(row.get("reference") or "")))
+
+
+def payment_key(row: dict) -> str:
+    """Idempotency key for a payout row.
+
+    The row's own ``key`` column when it has one; otherwise a digest of its
+    payee, amount, currency and reference plus its ``occurrence`` among rows
+    with that same content (see ``number_occurrences``). The line number is
+    not part of it, so inserting, removing or reordering other rows never
+    changes the key of a payout, while identical rows and payouts sharing a
+    reference (say a payroll run) are still distinct payments.
+    """
+    explicit = str(row.get("key") or "").strip()
+    if explicit:
+        return f"key:{explicit}"
+    digest = hashlib.sha256(_content(row).encode()).hexdigest()[:32]
+    return f"row:{digest}:{row.get('occurrence', 1)}"
+
+
+def number_occurrences(rows: Iterable[dict]) -> Iterator[dict]:
+    """Tag each row with its ``occurrence`` among earlier rows of the same content (1 for the first)."""
+    seen: Counter[str] = Counter()
+    for row in rows:
+        content = _content(row)
+        seen[content] += 1
+        yield {**row, "occurrence": seen[content]}
+
+
+class PaymentJournal:
+    """Thread-safe SQLite journal of batch payment progress."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "PaymentJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(self, key: str) -> dict | None:
+        """Return the journal entry for ``key``, or None if the payment was never attempted."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM payments WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def record(self, key: str, row: dict, status: str, **fields) -> None:
+        """Insert or update the entry for ``key`` with a new status (committed immediately)."""
+        values = {
+            "key": key,
+            "line": row.get("line"),
+            "to_customer": row["to_customer"],
+            "amount": str(row["amount"]),
+            "currency": row["currency"],
+            "reference": row.get("reference", ""),
+            "status": status,
+            "payment_id": fields.get("payment_id"),
+            "payment_reference": fields.get("payment_reference"),
+            "timestamp": fields.get("timestamp"),
+            "error": fields.get("error"),
+            "updated_at": time.time(),
+        }
+        columns = ", ".join(values)
+        placeholders = ", ".join(f":{name}" for name in values)
+        # Keep the recorded payment details when a later step does not repeat them.
+        updates = ", ".join(
+            f"{name} = COALESCE(excluded.{name}, {name})" if name in ("payment_id", "payment_reference", "timestamp") else f"{name} = excluded.{name}"
+            for name in values
+            if name != "key"
+        )
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO payments ({columns}) VALUES ({placeholders}) ON CONFLICT(key) DO UPDATE SET {updates}",
+                values,
+            )
+
+    def claim_create(self, key: str, row: dict) -> dict | None:
+        """Claim the create step of a payment, atomically.
+
+        Returns None when the caller now owns the step (a new key, a failed
+        create, or a stale ``creating`` claim), otherwise the current entry.
+        """
+        now = time.time()
+        values = {
+            "key": key,
+            "line": row.get("line"),
+            "to_customer": row["to_customer"],
+            "amount": str(row["amount"]),
+            "currency": row["currency"],
+            "reference": row.get("reference", ""),
+            "now": now,
+            "stale": now - CLAIM_TIMEOUT,
+        }
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO payments (key, line, to_customer, amount, currency, reference, status, updated_at) "
+                "VALUES (:key, :line, :to_customer, :amount, :currency, :reference, 'creating', :now) "
+                "ON CONFLICT(key) DO UPDATE SET status = 'creating', error = NULL, updated_at = :now "
+                "WHERE status = 'create_failed' OR (status = 'creating' AND updated_at < :stale)",
+                values,
+            )
+            if cursor.rowcount:
+                return None
+            row = self._conn.execute("SELECT * FROM payments WHERE key = ?", (key,)).fetchone()
+        return dict(row)
+
+    def claim_post(self, key: str) -> bool:
+        """Claim the post step of a created payment, atomically. True when the caller owns it."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE payments SET status = 'posting', updated_at = ? "
+                "WHERE key = ? AND payment_id IS NOT NULL AND (status IN ('created', 'post_failed') OR (status = 'posting' AND updated_at < ?))",
+                (now, key, now - CLAIM_TIMEOUT),
+            )
+        return cursor.rowcount == 1
+
+    def pending_posts(self) -> Iterator[dict]:
+        """Yield entries that were created but not (successfully) posted."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM payments WHERE status IN ('created', 'posting', 'post_failed') AND payment_id IS NOT NULL ORDER BY line"
+            ).fetchall()
+        for row in rows:
+            yield dict(row)
+
+    def status_counts(self) -> dict[str, int]:
+        """Return the number of journal entries per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM payments GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
@@ -0,0 +1,273 @@
+"""Client-side rate limiting and adaptive concurrency for the sync API client.
+
+Every request made through ``api_client.api_request`` passes through the
+limiter of its endpoint family (auth, balance, statement, fx, payment, search,
+document, other); history searches have their own family so paging through
+them does not eat into the payment budget, and so do file attachment
+transfers, whose large bodies are bound by concurrency rather than rate. Each family has two gates:
+
+* a token bucket capping the sustained request rate (with a burst allowance),
+  paused for ``Retry-After`` seconds whenever the server answers 429;
+* an AIMD concurrency limit: +1 slot per window of successful requests,
+  halved (at most once per round trip) on 429/5xx, transport errors, throttled
+  retries, or when short-term latency drifts well above the long-term average.
+
+Limiting is opt-in: with ``WALLET_RATE_LIMITS`` unset or empty every request
+goes straight out, bounded only by the caller's worker count. Set it to "on"
+for the ``RATE_LIMITS`` defaults, or to per-family overrides (the other
+families keep their defaults)::
+
+    WALLET_RATE_LIMITS=on
+    WALLET_RATE_LIMITS=payment=5:10,balance=50   # family=rate[:burst], requests/second
+
+Limits are per process and apply to threads sharing the client (processes of
+one job split them with ``share_limits``). ``async_api_client`` does not go
+through these limiters; it has its own per-family in-flight caps.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# family: (requests per second, burst, max concurrency)
+RATE_LIMITS = {
+    "auth": (2.0, 5, 2),
+    "balance": (20.0, 40, 20),
+    "statement": (10.0, 20, 10),
+    "fx": (10.0, 20, 5),
+    "payment": (10.0, 20, 10),
+    "search": (20.0, 40, 8),
+    "document": (50.0, 50, 8),
+    "other": (20.0, 40, 10),
+}
+
+OVERLOAD_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def endpoint_family(path: str) -> str:
+    """Map an API path to the endpoint family used for rate and concurrency limits."""
+    lowered = path.lower()
+    if lowered.endswith("/search"):
+        return "search"
+    if lowered.startswith("/authenticate"):
+        return "auth"
+    if lowered.startswith("/customeraccountbalance"):
+        return "balance"
+    if lowered.startswith("/customeraccountstatement"):
+        return "statement"
+    if lowered.startswith(("/fxdealquote", "/fxcurrencylist", "/fxdeal")):
+        return "fx"
+    if lowered.startswith("/instantpayment"):
+        return "payment"
+    if lowered.startswith("/fileattachment"):
+        return "document"
+    return "other"
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, holding up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a token is available, take it, and return the seconds waited."""
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - started
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for ``seconds`` (e.g. a server ``Retry-After``)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight requests, driven by outcome and latency.
+
+    Each success adds ``1 / limit`` (one slot per window of ``limit``
+    requests); an overload signal multiplies the limit by ``backoff``, at most
+    once per smoothed round trip so one burst of failures counts once.
+    Latency growth is detected by comparing a fast and a slow moving average.
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        initial: int | None = None,
+        backoff: float = 0.5,
+        tolerance: float = 2.0,
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(initial if initial is not None else max(minimum, maximum // 2))
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.decreases = 0
+        self._short = 0.0
+        self._long = 0.0
+        self._samples = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> float:
+        """Block until a slot is free, take it, and return the seconds waited."""
+        started = time.monotonic()
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        return time.monotonic() - started
+
+    def release(self, latency: float, overloaded: bool) -> None:
+        """Return a slot and adjust the limit from the request's outcome."""
+        with self._cond:
+            self.in_flight -= 1
+            if not overloaded:
+                self._samples += 1
+                self._short = latency if self._samples == 1 else self._short * 0.8 + latency * 0.2
+                self._long = latency if self._samples == 1 else self._long * 0.98 + latency * 0.02
+                overloaded = self._samples >= 20 and self._short > self.tolerance * self._long
+
+            now = time.monotonic()
+            if overloaded:
+                if now - self._last_decrease >= max(self._short, 0.05):
+                    self.limit = max(float(self.minimum), self.limit * self.backoff)
+                    self._last_decrease = now
+                    self.decreases += 1
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class FamilyLimiter:
+    """Token bucket plus adaptive concurrency for one endpoint family."""
+
+    def __init__(self, family: str, rate: float, burst: int, max_concurrency: int) -> None:
+        self.family = family
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.throttled = 0
+
+    @contextmanager
+    def slot(self):
+        """Hold one request slot. Yields a dict: set ``status`` / ``retry_after`` / ``throttled``.
+
+        ``queued`` holds the seconds spent waiting for the slot.
+        """
+        outcome = {"queued": self.bucket.acquire(), "status": None, "retry_after": None, "throttled": False}
+        outcome["queued"] += self.concurrency.acquire()
+        started = time.monotonic()
+        overloaded = True
+        try:
+            yield outcome
+            overloaded = outcome["throttled"] or outcome["status"] in OVERLOAD_STATUSES
+        finally:
+            if outcome["status"] == 429:
+                self.throttled += 1
+                if outcome["retry_after"]:
+                    self.bucket.pause(outcome["retry_after"])
+            self.concurrency.release(time.monotonic() - started, overloaded)
+
+    def stats(self) -> dict:
+        return {
+            "family": self.family,
+            "rate": self.bucket.rate,
+            "limit": round(self.concurrency.limit, 2),
+            "inFlight": self.concurrency.in_flight,
+            "decreases": self.concurrency.decreases,
+            "throttled": self.throttled,
+        }
+
+
+def parse_rate_limits(value: str) -> dict[str, tuple[float, int, int]] | None:
+    """Parse ``WALLET_RATE_LIMITS`` over the defaults. Returns None (no limiting) when empty or "off"."""
+    limits = dict(RATE_LIMITS)
+    value = value.strip()
+    if value.lower() in ("", "off", "0", "false", "no"):
+        return None
+    if value.lower() in ("on", "1", "true", "yes", "default"):
+        return limits
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        family, _, spec = item.partition("=")
+        family = family.strip().lower()
+        if family not in limits:
+            raise ValueError(f"unknown endpoint family {family!r} (expected one of {', '.join(limits)})")
+        rate_text, _, burst_text = spec.partition(":")
+        rate = float(rate_text)
+        if rate <= 0:
+            raise ValueError(f"rate for {family!r} must be positive")
+        burst = int(burst_text) if burst_text else max(1, int(rate * 2))
+        limits[family] = (rate, burst, limits[family][2])
+    return limits
+
+
+def _limits_from_env() -> dict[str, tuple[float, int, int]] | None:
+    try:
+        return parse_rate_limits(os.environ.get("WALLET_RATE_LIMITS", ""))
+    except ValueError as exc:
+        print(f"Error: Invalid WALLET_RATE_LIMITS: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
+_limits = _limits_from_env()
+_limiters: dict[str, FamilyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(path: str) -> FamilyLimiter | None:
+    """Return the limiter for ``path``'s endpoint family, or None when limiting is off."""
+    if _limits is None:
+        return None
+    family = endpoint_family(path)
+    limiter = _limiters.get(family)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(family)
+            if limiter is None:
+                limiter = _limiters[family] = FamilyLimiter(family, *_limits[family])
+    return limiter
+
+
+def configure_limits(limits: dict[str, tuple[float, int, int]] | None) -> None:
+    """Replace the per-family limits (None disables limiting) and reset all limiters."""
+    global _limits
+    with _limiters_lock:
+        _limits = {**RATE_LIMITS, **limits} if limits is not None else None
+        _limiters.clear()
+
+
+def share_limits(parts: int) -> None:
+    """Cut this process's limits to 1/``parts`` of the configured ones.
+
+    Worker processes of one job call this so that together they stay within
+    the budget a single process would have.
+    """
+    global _limits
+    with _limiters_lock:
+        if _limits is not None and parts > 1:
+            _limits = {family: (rate / parts, max(1, burst // parts), max(1, concurrency // parts)) for family, (rate, burst, concurrency) in _limits.items()}
+            _limiters.clear()
+
+
+def limiter_stats() -> list[dict]:
+    """Current rate, concurrency limit and throttle count of every active family."""
+    return [limiter.stats() for limiter in list(_limiters.values())]
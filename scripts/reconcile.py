@@ -0,0 +1,418 @@
+"""Reconcile instant payments and FX deals against account statement entries.
+
+Every payment and FX deal becomes one or more expected statement legs: a
+payment is a debit in its currency (a credit when paid to one of your
+``--alias`` values), an FX deal a credit of the bought amount (its instant
+deposit) and a debit of the sold amount. Legs are then joined against the
+statement entries of all the customer's accounts in two hash-indexed passes,
+so the work grows linearly with the number of rows:
+
+1. By reference: every word of an entry's description is looked up in an
+   index of payment, FX deal and deposit references. A hit in the right
+   currency and direction is a match, or an amount mismatch when the amounts
+   differ.
+2. By amount and date: legs still open are looked up by (currency,
+   direction, amount, date) within ``--date-tolerance`` days of their own
+   date, taking the first unmatched entry with that key.
+
+Legs left over are missing from the statement; entries left over (fees,
+incoming transfers, ...) are unexplained. Each account's ``runningBalance``
+is also checked entry by entry: previous balance + credit - debit must equal
+the running balance, in exact decimal arithmetic.
+
+FX deal search records carry no deposit reference; pass the ledger written
+by ``fx_autobook.py`` with ``--fx-ledger`` to match deposits by it too.
+
+Inputs default to the API: the payments and FX deals created or booked in
+``--start``..``--end`` (searched with a few days' margin either side, since
+a payment is dated by when it posted) and the statements of every account
+for the same range. Files written by
+``payment_history.py``, ``fx_history.py`` and ``statement_export.py`` (CSV
+or JSONL) can be given instead, e.g. to reconcile yesterday's exports.
+
+Usage:
+    python scripts/reconcile.py --start 2025-06-01 --end 2025-06-30
+    python scripts/reconcile.py --start 2025-06-01 --end 2025-06-30 --fx-ledger deals.ledger.csv --alias MYALIAS
+    python scripts/reconcile.py --start 2025-06-01 --end 2025-06-30 \\
+        --payments payments.jsonl --fx-deals fx_deals.jsonl --statement all.jsonl -o exceptions.csv
+
+Exits with status 1 when any leg is missing or mismatched, or a running
+balance does not carry over.
+"""
+
+import argparse
+import csv
+import re
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from pathlib import Path
+
+import requests
+
+from api_client import REQUEST_TIMEOUT, authenticate, configure_session, get_balances
+from batch_input import read_rows
+from concurrency import bounded_map
+from history_export import FX_DEALS, PAYMENTS, export_history
+from money import format_amount, to_decimal
+from statement_export import date_windows, fetch_window, parse_date
+
+REPORT_FIELDS = [
+    "issue",
+    "source",
+    "reference",
+    "currency",
+    "direction",
+    "date",
+    "expected",
+    "actual",
+    "accountId",
+    "transactionTime",
+    "description",
+]
+
+ISSUES = ("amount_mismatch", "missing_from_statement", "balance_break", "unexplained_entry")
+# Issues that fail the run; unexplained entries (fees, incoming transfers) are expected.
+FAILING_ISSUES = ("amount_mismatch", "missing_from_statement", "balance_break")
+
+# Days searched either side of --start/--end: a payment is searched by when it
+# was created but dated by when it posted.
+HISTORY_MARGIN_DAYS = 7
+
+# Payments that never reach the ledger.
+UNPOSTED_STATUSES = frozenset({"created", "cancelled", "canceled", "rejected", "failed", "void"})
+
+_REFERENCE_TOKEN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{3,}")
+
+
+class Leg:
+    """One statement entry a payment or FX deal is expected to produce."""
+
+    __slots__ = ("source", "references", "currency", "direction", "amount", "day", "entry", "matched_by")
+
+    def __init__(self, source: str, references: tuple[str, ...], currency: str, direction: str, amount: Decimal, day: date | None) -> None:
+        self.source = source
+        self.references = references
+        self.currency = currency
+        self.direction = direction
+        self.amount = amount
+        self.day = day
+        self.entry: Entry | None = None
+        self.matched_by: str | None = None
+
+
+class Entry:
+    """One statement entry, reduced to what matching needs."""
+
+    __slots__ = ("account_id", "currency", "time", "day", "direction", "amount", "debit", "credit", "running", "description", "leg")
+
+    def __init__(self, row: dict) -> None:
+        self.account_id = str(row.get("accountId") or "")
+        self.currency = str(row.get("currencyCode") or "").upper()
+        self.time = str(row.get("transactionTime") or "")
+        self.day = _day(self.time)
+        self.debit = to_decimal(row.get("debitAmount"))
+        self.credit = to_decimal(row.get("creditAmount"))
+        self.direction = "credit" if self.credit else "debit"
+        self.amount = self.credit or self.debit
+        running = row.get("runningBalance")
+        self.running = None if running in (None, "") else to_decimal(running)
+        self.description = str(row.get("description") or "")
+        self.leg: Leg | None = None
+
+
+def _day(value: object) -> date | None:
+    """Calendar date of an API timestamp or yyyy-MM-dd string (None if absent or unparseable)."""
+    text = str(value or "")[:10]
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def _reference(value: object) -> str:
+    return str(value or "").strip().upper()
+
+
+def payment_legs(records, aliases: frozenset[str] = frozenset()) -> tuple[list[Leg], int]:
+    """Legs for posted payments. Returns (legs, payments skipped as not posted)."""
+    legs = []
+    skipped = 0
+    for record in records:
+        if not record.get("postedTime") and str(record.get("status") or "").lower() in UNPOSTED_STATUSES:
+            skipped += 1
+            continue
+        incoming = _reference(record.get("toCustomerAlias")) in aliases and _reference(record.get("fromCustomerAlias")) not in aliases
+        references = tuple(filter(None, (_reference(record.get("paymentReference")), _reference(record.get("externalReference")))))
+        legs.append(
+            Leg(
+                "payment",
+                references,
+                _reference(record.get("currencyCode")),
+                "credit" if incoming else "debit",
+                abs(to_decimal(record.get("amount"))),
+                _day(record.get("postedTime") or record.get("valueDate") or record.get("createdTime")),
+            )
+        )
+    return legs, skipped
+
+
+def fx_legs(records, deposit_references: dict[str, str] | None = None) -> list[Leg]:
+    """Two legs per FX deal: the bought amount deposited, the sold amount debited."""
+    deposit_references = deposit_references or {}
+    legs = []
+    for record in records:
+        deal_reference = _reference(record.get("fxDealReference"))
+        day = _day(record.get("bookedTime") or record.get("dealDate"))
+        deposit = deposit_references.get(deal_reference)
+        buy_references = (deposit, deal_reference) if deposit else (deal_reference,)
+        legs.append(Leg("fx_buy", buy_references, _reference(record.get("buyCurrencyCode")), "credit", abs(to_decimal(record.get("buyAmount"))), day))
+        legs.append(Leg("fx_sell", (deal_reference,), _reference(record.get("sellCurrencyCode")), "debit", abs(to_decimal(record.get("sellAmount"))), day))
+    return legs
+
+
+def deposit_references(ledger_rows) -> dict[str, str]:
+    """Map FX deal reference to deposit reference from an ``fx_autobook.py`` results ledger."""
+    return {
+        _reference(row.get("fx_deal_reference")): _reference(row.get("deposit_reference"))
+        for row in ledger_rows
+        if row.get("fx_deal_reference") and row.get("deposit_reference")
+    }
+
+
+def match_by_reference(legs: list[Leg], entries: list[Entry]) -> None:
+    """Pass 1: join entries to legs through references found in their descriptions."""
+    index: dict[str, list[Leg]] = defaultdict(list)
+    for leg in legs:
+        for reference in leg.references:
+            index[reference].append(leg)
+
+    for entry in entries:
+        for token in _REFERENCE_TOKEN.findall(entry.description):
+            candidates = index.get(token.upper())
+            if not candidates:
+                continue
+            leg = next((leg for leg in candidates if leg.entry is None and leg.currency == entry.currency and leg.direction == entry.direction), None)
+            if leg is not None:
+                leg.entry, leg.matched_by, entry.leg = entry, "reference", leg
+                break
+
+
+def match_by_amount(legs: list[Leg], entries: list[Entry], date_tolerance: int = 1) -> None:
+    """Pass 2: join the remaining legs to unmatched entries with the same amount, near the same date."""
+    index: dict[tuple, deque[Entry]] = defaultdict(deque)
+    for entry in entries:
+        if entry.leg is None:
+            index[entry.currency, entry.direction, entry.amount, entry.day].append(entry)
+
+    # Nearest day first: 0, -1, +1, -2, +2, ...
+    offsets = [0]
+    for days in range(1, date_tolerance + 1):
+        offsets += [-days, days]
+    for leg in legs:
+        if leg.entry is not None or leg.day is None:
+            continue
+        for offset in offsets:
+            bucket = index.get((leg.currency, leg.direction, leg.amount, leg.day + timedelta(days=offset)))
+            if bucket:
+                entry = bucket.popleft()
+                leg.entry, leg.matched_by, entry.leg = entry, "amount", leg
+                break
+
+
+def balance_breaks(entries: list[Entry]) -> list[tuple[Entry, Decimal]]:
+    """Entries whose running balance does not follow from the previous one in the same account.
+
+    ``entries`` must be in statement order. Returns (entry, expected) pairs.
+    """
+    by_account: dict[str, list[Entry]] = defaultdict(list)
+    for entry in entries:
+        by_account[entry.account_id].append(entry)
+
+    breaks = []
+    # Statement order, not transactionTime, defines the sequence (timestamps can tie).
+    for account_entries in by_account.values():
+        previous = None
+        for entry in account_entries:
+            if entry.running is None:
+                previous = None
+                continue
+            if previous is not None:
+                expected = previous + entry.credit - entry.debit
+                if expected != entry.running:
+                    breaks.append((entry, expected))
+            previous = entry.running
+    return breaks
+
+
+def reconcile(legs: list[Leg], entries: list[Entry], date_tolerance: int = 1) -> dict:
+    """Match ``legs`` against ``entries`` and collect every exception.
+
+    Returns counts and a list of report rows (``REPORT_FIELDS``).
+    """
+    match_by_reference(legs, entries)
+    match_by_amount(legs, entries, date_tolerance)
+
+    counts: Counter[str] = Counter()
+    rows = []
+
+    def row(issue: str, leg: Leg | None, entry: Entry | None, expected: object = "", actual: object = "") -> None:
+        counts[issue] += 1
+        rows.append(
+            {
+                "issue": issue,
+                "source": leg.source if leg else "statement",
+                "reference": leg.references[0] if leg and leg.references else "",
+                "currency": leg.currency if leg else entry.currency,
+                "direction": leg.direction if leg else entry.direction,
+                "date": str(leg.day or "") if leg else str(entry.day or ""),
+                "expected": expected,
+                "actual": actual,
+                "accountId": entry.account_id if entry else "",
+                "transactionTime": entry.time if entry else "",
+                "description": entry.description if entry else "",
+            }
+        )
+
+    for leg in legs:
+        if leg.entry is None:
+            row("missing_from_statement", leg, None, leg.amount)
+            continue
+        counts[f"matched_by_{leg.matched_by}"] += 1
+        if leg.entry.amount != leg.amount:
+            row("amount_mismatch", leg, leg.entry, leg.amount, leg.entry.amount)
+    for entry in entries:
+        if entry.leg is None:
+            row("unexplained_entry", None, entry, "", entry.amount)
+    for entry, expected in balance_breaks(entries):
+        row("balance_break", None, entry, expected, entry.running)
+    return {"counts": counts, "rows": rows}
+
+
+class _ListSink:
+    """``export_history`` sink collecting records in memory."""
+
+    def __init__(self) -> None:
+        self.records: list[dict] = []
+
+    def write(self, rows: list[dict]) -> None:
+        self.records.extend(rows)
+
+
+def fetch_history(token: str, source, start: datetime, end: datetime, workers: int) -> list[dict]:
+    """Search records of ``source`` for the range plus ``HISTORY_MARGIN_DAYS`` either side."""
+    margin = timedelta(days=HISTORY_MARGIN_DAYS)
+    sink = _ListSink()
+    export_history(token, source, sink, page_size=250, workers=workers, params=source.date_params(start - margin, end + margin))
+    return sink.records
+
+
+def fetch_statements(token: str, customer_id: str, start: datetime, end: datetime, workers: int, window_days: int = 30) -> list[dict]:
+    """Statement rows (``statement_export.ENTRY_FIELDS``) of every account for the range."""
+    accounts = get_balances(token, customer_id)
+    windows = list(date_windows(start, end, window_days))
+    tasks = ((account, window_start, window_end) for account in accounts for window_start, window_end in windows)
+    rows = []
+    for window_rows in bounded_map(partial(fetch_window, token=token, timeout=REQUEST_TIMEOUT), tasks, workers, ordered=True):
+        rows.extend(window_rows)
+    return rows
+
+
+def in_range(legs: list[Leg], start: date, end: date) -> list[Leg]:
+    return [leg for leg in legs if leg.day is not None and start <= leg.day <= end]
+
+
+def write_report(path: Path, rows: list[dict]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reconcile payments and FX deals against account statements.")
+    parser.add_argument("--start", required=True, type=parse_date, help="Start date (yyyy-MM-dd, inclusive)")
+    parser.add_argument("--end", required=True, type=parse_date, help="End date (yyyy-MM-dd, inclusive)")
+    parser.add_argument("--payments", type=Path, help="Payment history CSV/JSONL (default: fetch from the API)")
+    parser.add_argument("--fx-deals", type=Path, help="FX deal history CSV/JSONL (default: fetch from the API)")
+    parser.add_argument("--statement", type=Path, help="Statement export CSV/JSONL of all accounts (default: fetch from the API)")
+    parser.add_argument("--fx-ledger", type=Path, help="fx_autobook.py results ledger, for deposit references")
+    parser.add_argument("--alias", action="append", default=[], help="Your customer alias; payments to it are credits (repeatable)")
+    parser.add_argument("--date-tolerance", type=int, default=1, help="Days an entry may post before/after its payment or deal (default 1)")
+    parser.add_argument("-o", "--output", type=Path, help="Exceptions report CSV (default reconcile_<start>_<end>.csv)")
+    parser.add_argument("--workers", type=int, default=4, help="Requests in flight when fetching from the API (default 4)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.start > args.end:
+        print("Error: Start date cannot be after end date.", file=sys.stderr)
+        sys.exit(1)
+    if args.workers < 1 or args.date_tolerance < 0:
+        print("Error: --workers must be at least 1 and --date-tolerance cannot be negative.", file=sys.stderr)
+        sys.exit(1)
+    for path in (args.payments, args.fx_deals, args.statement, args.fx_ledger):
+        if path is not None and not path.is_file():
+            print(f"Error: Input file not found: {path}", file=sys.stderr)
+            sys.exit(1)
+
+    token = customer_id = None
+    if args.payments is None or args.fx_deals is None or args.statement is None:
+        configure_session(pool_size=args.workers)
+        token, customer_id = authenticate()
+
+    print(f"\n=== RECONCILIATION {args.start:%Y-%m-%d} to {args.end:%Y-%m-%d} ===")
+    started = time.monotonic()
+
+    try:
+        payments = read_rows(args.payments) if args.payments else fetch_history(token, PAYMENTS, args.start, args.end, args.workers)
+        deals = read_rows(args.fx_deals) if args.fx_deals else fetch_history(token, FX_DEALS, args.start, args.end, args.workers)
+        statement = read_rows(args.statement) if args.statement else fetch_statements(token, customer_id, args.start, args.end, args.workers)
+        deposits = deposit_references(read_rows(args.fx_ledger)) if args.fx_ledger else {}
+    except (requests.RequestException, ValueError) as exc:
+        print(f"Failed to load reconciliation inputs: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    start, end = args.start.date(), args.end.date()
+    aliases = frozenset(_reference(alias) for alias in args.alias)
+    legs_from_payments, unposted = payment_legs(payments, aliases)
+    legs = in_range(legs_from_payments, start, end) + in_range(fx_legs(deals, deposits), start, end)
+    entries = [entry for entry in map(Entry, statement) if entry.day is None or start <= entry.day <= end]
+    result = reconcile(legs, entries, args.date_tolerance)
+    counts = result["counts"]
+
+    output = args.output or Path(f"reconcile_{args.start:%Y%m%d}_{args.end:%Y%m%d}.csv")
+    write_report(output, result["rows"])
+
+    accounts = len({entry.account_id for entry in entries})
+    print(
+        f"  Expected legs:     {len(legs):>10,}  ({sum(leg.source == 'payment' for leg in legs):,} payment, {sum(leg.source != 'payment' for leg in legs):,} FX)"
+    )
+    if unposted:
+        print(f"  Not posted:        {unposted:>10,}  payment(s) skipped")
+    print(f"  Statement entries: {len(entries):>10,}  across {accounts} account(s)")
+    print(f"\n  {'Matched by reference:':<26}{counts['matched_by_reference']:>10,}")
+    print(f"  {'Matched by amount/date:':<26}{counts['matched_by_amount']:>10,}")
+    for issue in ISSUES:
+        print(f"  {issue.replace('_', ' ').capitalize() + ':':<26}{counts[issue]:>10,}")
+
+    mismatched = [row for row in result["rows"] if row["issue"] == "amount_mismatch"][:5]
+    if mismatched:
+        print("\n  First amount mismatches:")
+        for row in mismatched:
+            print(f"    {row['reference']:<20}{row['currency']:<5}expected {format_amount(row['expected']):>15}  statement {format_amount(row['actual']):>15}")
+
+    print(f"\n  Report: {output} ({len(result['rows']):,} row(s))")
+    print(f"  Completed in {time.monotonic() - started:.1f}s.")
+    print("\n=== COMPLETE ===")
+
+    if any(counts[issue] for issue in FAILING_ISSUES):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
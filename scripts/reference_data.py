@@ -0,0 +1,163 @@
+"""Cached reference data: payment currencies and the FX Buy/Sell currency lists.
+
+These lists change rarely, so they are kept in memory and on disk and only
+re-downloaded once they are older than ``WALLET_REFDATA_TTL`` seconds
+(default 3600). Stale entries are revalidated with ``If-None-Match`` /
+``If-Modified-Since`` when the server sent an ETag or Last-Modified header,
+so an unchanged list costs a 304 instead of a full download. If the API is
+unreachable, the last cached copy is used with a warning.
+
+The cache lives at ``~/.cache/mini-wallet/reference.json`` by default; set
+``WALLET_REFDATA_CACHE`` to move it, or to an empty string to keep it in
+memory only.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from api_client import BASE_URL, api_request, token_login
+from concurrency import bounded_map
+from models import response_json
+from money import DEFAULT_SCALE
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "mini-wallet" / "reference.json"
+REFDATA_TTL = float(os.environ.get("WALLET_REFDATA_TTL", "3600"))
+
+FX_SIDES = ("Buy", "Sell")
+
+
+def _configured_path() -> Path | None:
+    raw = os.environ.get("WALLET_REFDATA_CACHE")
+    if raw is None:
+        return DEFAULT_CACHE_PATH
+    return Path(raw).expanduser() if raw.strip() else None
+
+
+class ReferenceDataCache:
+    """In-memory + on-disk cache of GET responses with TTL and conditional revalidation.
+
+    Entries are keyed by ``"<base_url>|<username>|<path>"``, since the lists
+    can differ between customers, and hold the decoded body plus the
+    validators (ETag, Last-Modified) needed to revalidate it. A token that no
+    ``TokenManager`` issued is keyed by its hash and kept in memory only.
+    """
+
+    def __init__(self, path: Path | None = None, ttl: float = REFDATA_TTL, enabled: bool = True) -> None:
+        self.path = path if path is not None else _configured_path()
+        self.enabled = enabled and self.path is not None
+        self.ttl = ttl
+        self._memory: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str, path: str) -> dict:
+        """Return the JSON body for ``GET path``, from cache when fresh."""
+        login = token_login(token)
+        owner = login if login is not None else f"token:{hashlib.sha256(token.encode()).hexdigest()[:16]}"
+        key = f"{BASE_URL}|{owner}|{path}"
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and login is not None:
+                entry = self._read_all().get(key)
+                if entry is not None:
+                    self._memory[key] = entry
+        if entry is not None and time.time() - entry.get("fetchedAt", 0) < self.ttl:
+            return entry["data"]
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("lastModified"):
+                headers["If-Modified-Since"] = entry["lastModified"]
+
+        try:
+            response = api_request("GET", path, token, headers=headers)
+        except requests.RequestException as exc:
+            if entry is None:
+                raise
+            print(f"Warning: Using cached {path} ({exc})", file=sys.stderr)
+            return entry["data"]
+
+        if response.status_code == 304 and entry is not None:
+            entry = {**entry, "fetchedAt": time.time()}
+        else:
+            entry = {
+                "data": response_json(response),
+                "etag": response.headers.get("ETag"),
+                "lastModified": response.headers.get("Last-Modified"),
+                "fetchedAt": time.time(),
+            }
+        with self._lock:
+            self._memory[key] = entry
+            if login is not None:
+                self._store(key, entry)
+        return entry["data"]
+
+    def clear(self) -> None:
+        """Forget every cached entry, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+            if self.enabled:
+                self.path.unlink(missing_ok=True)
+
+    def _read_all(self) -> dict[str, dict]:
+        if not self.enabled:
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _store(self, key: str, entry: dict) -> None:
+        """Merge ``entry`` into the cache file atomically. Call while holding the lock."""
+        if not self.enabled:
+            return
+        data = self._read_all()
+        data[key] = entry
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f"{self.path.suffix}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(data, handle)
+        os.replace(tmp_path, self.path)
+
+
+_cache: ReferenceDataCache | None = None
+
+
+def get_reference_cache() -> ReferenceDataCache:
+    """Return the process-wide reference data cache."""
+    global _cache
+    if _cache is None:
+        _cache = ReferenceDataCache()
+    return _cache
+
+
+def payment_currencies(token: str) -> list[dict]:
+    """Currencies available for instant payments (``/PaymentCurrencyList``)."""
+    return get_reference_cache().get(token, "/PaymentCurrencyList").get("currencies", [])
+
+
+def fx_currencies(token: str, side: str) -> list[dict]:
+    """FX currency list for one side (Buy or Sell)."""
+    return get_reference_cache().get(token, f"/FXCurrencyList/{side}").get("currencies", [])
+
+
+def fx_currency_sides(token: str) -> tuple[list[dict], list[dict]]:
+    """Return (buy_currencies, sell_currencies), fetching both sides in parallel."""
+    buy, sell = bounded_map(lambda side: fx_currencies(token, side), FX_SIDES, len(FX_SIDES), ordered=True)
+    return buy, sell
+
+
+def amount_scales(currencies: list[dict]) -> dict[str, int]:
+    """Map currency code to its amount scale (decimal places)."""
+    return {cur.get("currencyCode", ""): cur.get("currencyAmountScale", DEFAULT_SCALE) for cur in currencies}
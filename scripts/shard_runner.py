@@ -0,0 +1,362 @@
+"""Run very large batch jobs across several processes, sharded by customer or account.
+
+A single process spends most of a big job decoding JSON and formatting rows
+on one core while the others sit idle. This runner splits the job into
+shards by a stable hash of the customer or account, runs each shard in a
+worker process of its own, and merges the results in a fixed order, so the
+output is the same whichever shard finishes first. Each worker has:
+
+* its own pooled session (``--workers`` threads, as in the single-process scripts);
+* its own token manager, backed by the shared on-disk token cache, so the
+  processes share one login instead of logging in once each;
+* an equal share of the client rate limits, when they are on (see
+  ``rate_limit.share_limits``).
+
+``WALLET_RATE_LIMITS`` is the budget of the whole job, not of each process:
+with limiting on, N processes together send no faster than one would, so
+sharding helps only once the budget is raised (or limiting is left off, the
+default) and the extra cores then go to decoding and formatting.
+
+Jobs:
+    payments    Payout file as for ``batch_payment.py``, sharded by receiver.
+                Every shard uses the same journal, so a run can be resumed
+                with any shard count or with ``batch_payment.py`` itself; the
+                shard ledgers are merged back into input line order.
+    balances    Customers file as for ``treasury.py``, sharded by login or
+                customer ID; the report is the same as treasury's.
+    statements  Statements of the login's accounts as for ``statement_export.py``,
+                sharded by account; per-account parts are joined in account order.
+
+With ``WALLET_METRICS_FILE`` set, each worker's request metrics are sent back
+and merged into the parent's file, which is written once for the whole job.
+
+Usage:
+    python scripts/shard_runner.py payments payouts.csv --processes 4 --workers 8
+    python scripts/shard_runner.py balances customers.csv --processes 4 --json
+    python scripts/shard_runner.py statements --start 2025-01-01 --end 2025-12-31 --processes 4 --format jsonl -o all.jsonl
+"""
+
+import argparse
+import csv
+import heapq
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+import requests
+
+import rate_limit
+from api_client import REQUEST_TIMEOUT, TokenManager, authenticate, configure_session, get_balances, get_credentials
+from batch_input import read_rows
+from batch_payment import LEDGER_FIELDS, LEDGER_STATUSES, currency_scales, open_ledger, process_payment
+from concurrency import bounded_map
+from instrumentation import PrometheusExporter, add_request_hook, detach_metrics_file, metrics_exporter, remove_request_hook
+from payment_journal import PaymentJournal, number_occurrences
+from statement_export import SINKS, date_windows, fetch_window, parse_date, resolve_accounts
+from treasury import fetch_customer, fetch_scales, report
+
+# Set in each worker process by _init_worker
+_collect_metrics = False
+
+
+def shard_of(key: object, shards: int) -> int:
+    """Shard index for a customer or account key.
+
+    crc32 rather than ``hash()``: string hashes are salted per process, and
+    every worker must agree on the owner of each key.
+    """
+    return zlib.crc32(str(key or "").strip().lower().encode()) % shards
+
+
+def _init_worker(processes: int, workers: int) -> None:
+    """Give a new worker process its own session, rate-limit share and metrics collector."""
+    global _collect_metrics
+    configure_session(pool_size=workers)
+    rate_limit.share_limits(processes)
+    _collect_metrics = detach_metrics_file()
+
+
+def run_shard(job: str, index: int, shards: int, options: dict) -> dict:
+    """Run one shard of ``job`` in a worker process. Returns its result plus the shard's metrics."""
+    started = time.monotonic()
+    # A collector per shard, so a worker running several shards reports each request once.
+    collector = PrometheusExporter(None) if _collect_metrics else None
+    if collector is not None:
+        add_request_hook(collector)
+    try:
+        result = JOBS[job](index, shards, options)
+    finally:
+        if collector is not None:
+            remove_request_hook(collector)
+    result.update(index=index, seconds=time.monotonic() - started, metrics=collector.snapshot() if collector is not None else None)
+    return result
+
+
+# --- payments ----------------------------------------------------------------
+
+
+def payments_shard(index: int, shards: int, options: dict) -> dict:
+    """Send this shard's payouts, writing its ledger part in input line order."""
+    token, _customer_id = authenticate()
+    from_customer, _ = get_credentials()
+    scales = currency_scales(token)
+    # Identical payouts share a receiver and so a shard: occurrences number the same as in one process.
+    rows = number_occurrences(row for row in read_rows(Path(options["input"])) if shard_of(row.get("to_customer"), shards) == index)
+    part = f"{options['ledger']}.shard{index}"
+    counts: Counter[str] = Counter()
+
+    with PaymentJournal(Path(options["journal"])) as journal, open(part, "w", encoding="utf-8", newline="") as handle:
+        ledger = csv.DictWriter(handle, fieldnames=LEDGER_FIELDS)
+        worker = partial(process_payment, token=token, from_customer=from_customer, journal=journal, scales=scales)
+        for record in bounded_map(worker, rows, options["workers"], ordered=True):
+            ledger.writerow(record)
+            counts[record["status"]] += 1
+    return {"counts": dict(counts), "part": part}
+
+
+def merge_ledgers(results: list[dict], ledger_path: Path) -> None:
+    """Merge the shard ledger parts (each in line order) into one ledger in input order, appended to ``ledger_path``."""
+    handles = [open(result["part"], encoding="utf-8", newline="") for result in results]
+    try:
+        out, ledger = open_ledger(ledger_path)
+        with out:
+            parts = (csv.DictReader(handle, fieldnames=LEDGER_FIELDS) for handle in handles)
+            ledger.writerows(heapq.merge(*parts, key=lambda record: int(record["line"])))
+    finally:
+        for handle in handles:
+            handle.close()
+    for result in results:
+        os.remove(result["part"])
+
+
+def summarize_payments(args: argparse.Namespace, results: list[dict], elapsed: float) -> int:
+    merge_ledgers(results, args.ledger)
+    counts: Counter[str] = Counter()
+    for result in results:
+        counts.update(result["counts"])
+    processed = sum(counts.values())
+    print("\nSummary:")
+    for status in LEDGER_STATUSES:
+        print(f"  {status:<14}{counts[status]:>8}")
+    print(f"  {'total':<14}{processed:>8}")
+    print(f"\nCompleted in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} payments/s).")
+    return 0 if processed == counts["posted"] + counts["already_posted"] else 1
+
+
+# --- balances ----------------------------------------------------------------
+
+
+def balances_shard(index: int, shards: int, options: dict) -> dict:
+    """Fetch the balances of this shard's customers, tagged with their input line."""
+    rows = [row for row in read_rows(Path(options["input"])) if shard_of(row.get("username") or row.get("customer_id"), shards) == index]
+    managers = {row["username"]: TokenManager(row["username"], row.get("password") or "") for row in rows if row.get("username")}
+
+    def fetch(row: dict) -> tuple[int, dict]:
+        return row["line"], fetch_customer(row, managers)
+
+    customers = list(bounded_map(fetch, rows, options["workers"], ordered=True))
+    return {"customers": customers, "scales": fetch_scales(rows, managers) if rows else {}}
+
+
+def summarize_balances(args: argparse.Namespace, results: list[dict], elapsed: float) -> int:
+    customers = sorted((item for result in results for item in result["customers"]), key=lambda item: item[0])
+    scales = {currency: scale for result in results for currency, scale in result["scales"].items()}
+    return 1 if report([customer for _line, customer in customers], elapsed, args.json, scales) else 0
+
+
+# --- statements --------------------------------------------------------------
+
+
+def statements_shard(index: int, shards: int, options: dict) -> dict:
+    """Export this shard's accounts, one part file per account."""
+    token, _customer_id = authenticate()
+    start, end = datetime.fromisoformat(options["start"]), datetime.fromisoformat(options["end"])
+    windows = list(date_windows(start, end, options["window_days"]))
+    worker = partial(fetch_window, token=token, timeout=options["timeout"])
+    parts = []
+    entries = 0
+    for position, account in enumerate(options["accounts"]):
+        if shard_of(account.get("accountId"), shards) != index:
+            continue
+        part = f"{options['output']}.part{position}"
+        sink = SINKS[options["format"]](Path(part))
+        try:
+            for rows in bounded_map(worker, ((account, window_start, window_end) for window_start, window_end in windows), options["workers"], ordered=True):
+                sink.write(rows)
+                entries += len(rows)
+        except requests.RequestException as exc:
+            return {"entries": entries, "parts": parts + [(position, part)], "error": f"{account.get('currencyCode')}: {exc}"}
+        finally:
+            sink.close()
+        parts.append((position, part))
+    return {"entries": entries, "parts": parts, "error": None}
+
+
+def summarize_statements(args: argparse.Namespace, results: list[dict], elapsed: float) -> int:
+    """Join the per-account parts in account order (one CSV header) into the output file."""
+    parts = sorted(part for result in results for part in result["parts"])
+    errors = [result["error"] for result in results if result["error"]]
+    if not errors:
+        with open(args.output, "wb") as out:
+            for number, (_position, part) in enumerate(parts):
+                with open(part, "rb") as handle:
+                    if args.format == "csv" and number:
+                        handle.readline()
+                    shutil.copyfileobj(handle, out)
+    for _position, part in parts:
+        os.remove(part)
+
+    if errors:
+        for error in errors:
+            print(f"Failed to retrieve statement window: {error}", file=sys.stderr)
+        return 1
+    total_entries = sum(result["entries"] for result in results)
+    print(f"\nExported {total_entries:,} entries to {args.output} in {elapsed:.1f}s.")
+    return 0
+
+
+JOBS = {"payments": payments_shard, "balances": balances_shard, "statements": statements_shard}
+
+
+def parse_args() -> argparse.Namespace:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--processes", type=int, default=os.cpu_count() or 2, help="Worker processes (default: CPU count)")
+    common.add_argument("--shards", type=int, help="Shards to split the job into (default: --processes)")
+    common.add_argument("--workers", type=int, help="Threads per process (default as in the single-process script)")
+
+    parser = argparse.ArgumentParser(description="Run a large batch job across several processes.")
+    jobs = parser.add_subparsers(dest="job", required=True)
+
+    payments = jobs.add_parser("payments", parents=[common], help="Bulk instant payments (batch_payment.py input)")
+    payments.add_argument("input", type=Path, help="CSV or JSONL file of payouts")
+    payments.add_argument("--ledger", type=Path, help="Results ledger CSV, appended to (default <input>.ledger.csv)")
+    payments.add_argument("--journal", type=Path, help="Resume journal (default <input>.journal.db)")
+
+    balances = jobs.add_parser("balances", parents=[common], help="Balances of many customers (treasury.py input)")
+    balances.add_argument("input", type=Path, help="CSV or JSONL file of customers/credentials")
+    balances.add_argument("--json", action="store_true", help="Print results as JSON")
+
+    statements = jobs.add_parser("statements", parents=[common], help="Statement export across accounts")
+    statements.add_argument("--account", default="all", help="Account ID, account number, currency code, or 'all' (default)")
+    statements.add_argument("--start", required=True, type=parse_date, help="Start date (yyyy-MM-dd, inclusive)")
+    statements.add_argument("--end", required=True, type=parse_date, help="End date (yyyy-MM-dd, inclusive)")
+    statements.add_argument("--format", choices=("csv", "jsonl"), default="csv", help="Output format (default csv)")
+    statements.add_argument("-o", "--output", type=Path, help="Output file (default statement_<account>_<start>_<end>.<format>)")
+    statements.add_argument("--window-days", type=int, default=30, help="Days per request window (default 30)")
+    statements.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Per-window request timeout in seconds")
+    return parser.parse_args()
+
+
+def job_options(args: argparse.Namespace) -> dict:
+    """Validate the arguments and build the picklable options every shard receives."""
+    if args.job in ("payments", "balances") and not args.input.is_file():
+        print(f"Error: Input file not found: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.job == "payments":
+        args.workers = args.workers or 8
+        args.ledger = args.ledger or args.input.with_suffix(".ledger.csv")
+        journal = args.journal or args.input.with_suffix(".journal.db")
+        try:
+            # Checked before any payment is sent; the merged results are appended after the shards finish.
+            open_ledger(args.ledger)[0].close()
+        except ValueError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        # Create the journal (and its WAL) once, before the workers open it concurrently.
+        PaymentJournal(journal).close()
+        print(f"  Input:   {args.input}")
+        print(f"  Ledger:  {args.ledger}")
+        print(f"  Journal: {journal}")
+        return {"input": str(args.input), "ledger": str(args.ledger), "journal": str(journal), "workers": args.workers}
+
+    if args.job == "balances":
+        args.workers = args.workers or 16
+        print(f"  Input:   {args.input}")
+        return {"input": str(args.input), "workers": args.workers}
+
+    args.workers = args.workers or 4
+    if args.start > args.end:
+        print("Error: Start date cannot be after end date.", file=sys.stderr)
+        sys.exit(1)
+    if args.window_days < 1:
+        print("Error: --window-days must be at least 1.", file=sys.stderr)
+        sys.exit(1)
+    token, customer_id = authenticate()
+    try:
+        accounts = resolve_accounts(get_balances(token, customer_id), args.account)
+    except requests.HTTPError as exc:
+        print(f"Failed to retrieve balances: {exc}", file=sys.stderr)
+        sys.exit(1)
+    if not accounts:
+        print(f"Error: No account matches {args.account!r}.", file=sys.stderr)
+        sys.exit(1)
+    args.output = args.output or Path(f"statement_{args.account}_{args.start:%Y%m%d}_{args.end:%Y%m%d}.{args.format}")
+    print(f"  Accounts: {', '.join(str(acc.get('currencyCode')) for acc in accounts)}")
+    print(f"  Period:   {args.start:%Y-%m-%d} to {args.end:%Y-%m-%d}")
+    print(f"  Output:   {args.output}")
+    return {
+        "accounts": accounts,
+        "start": args.start.isoformat(),
+        "end": args.end.isoformat(),
+        "format": args.format,
+        "output": str(args.output),
+        "window_days": args.window_days,
+        "timeout": args.timeout,
+        "workers": args.workers,
+    }
+
+
+SUMMARIES = {"payments": summarize_payments, "balances": summarize_balances, "statements": summarize_statements}
+
+
+def main() -> None:
+    args = parse_args()
+    shards = args.shards or args.processes
+    if args.processes < 1 or shards < 1 or (args.workers is not None and args.workers < 1):
+        print("Error: --processes, --shards and --workers must be at least 1.", file=sys.stderr)
+        sys.exit(1)
+    processes = min(args.processes, shards)
+    if args.job != "balances":
+        # Log in once up front; the workers pick the token up from the token cache.
+        authenticate()
+
+    print(f"\n=== SHARDED {args.job.upper()} ({shards} shard(s), {processes} process(es)) ===")
+    options = job_options(args)
+    print(f"  Threads per process: {args.workers}\n")
+
+    started = time.monotonic()
+    results: list[dict] = []
+    # spawn, not fork: every worker starts clean instead of inheriting the parent's sockets and locks.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(processes, mp_context=context, initializer=_init_worker, initargs=(processes, args.workers)) as pool:
+        futures = [pool.submit(run_shard, args.job, index, shards, options) for index in range(shards)]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"  Shard {result['index'] + 1}/{shards} finished in {result['seconds']:.1f}s ({len(results)}/{shards} done)")
+    elapsed = time.monotonic() - started
+
+    results.sort(key=lambda result: result["index"])
+    exporter = metrics_exporter()
+    if exporter is not None:
+        for result in results:
+            if result["metrics"]:
+                exporter.merge(result["metrics"])
+
+    status = SUMMARIES[args.job](args, results, elapsed)
+    if status:
+        sys.exit(status)
+    print("\n=== COMPLETE ===")
+
+
+if __name__ == "__main__":
+    main()
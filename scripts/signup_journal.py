@@ -0,0 +1,110 @@
+"""Write-ahead journal for bulk customer signup.
+
+Records each prospective user's progress through the signup workflow in a
+local SQLite database (WAL mode), keyed by the lower-cased username:
+
+    customer_creating -> POST /Customer/FromTemplate sent, response not yet recorded
+    customer_created  -> customerId recorded
+    user_creating     -> POST /CustomerUser sent, response not yet recorded
+    user_created      -> userId recorded, access rights not yet linked
+    completed         -> PATCH /User/LinkAccessRightTemplate succeeded
+    check_failed / username_taken / customer_failed / user_failed / link_failed
+                      -> last attempt failed at that step (retried on resume)
+
+Re-running a file against the same journal skips completed users and
+resumes everyone else at the step that did not finish, reusing the IDs
+already recorded. A user left in ``user_creating`` or ``user_failed`` is
+looked up before being created again, in case the interrupted request did
+reach the server. A customer left in ``customer_creating`` is created again;
+if the interrupted attempt did reach the server, that orphan has no user and
+so no login.
+
+Passwords are never written to the journal; the input file stays the source
+of every user's details.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signups (
+    key          TEXT PRIMARY KEY,
+    line         INTEGER,
+    username     TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    customer_id  TEXT,
+    user_id      TEXT,
+    error        TEXT,
+    updated_at   REAL NOT NULL
+)
+"""
+
+
+def signup_key(username: str) -> str:
+    """Journal key for a username (usernames are unique regardless of case)."""
+    return username.strip().lower()
+
+
+class SignupJournal:
+    """Thread-safe SQLite journal of bulk signup progress."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "SignupJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(self, key: str) -> dict | None:
+        """Return the journal entry for ``key``, or None if the user was never attempted."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM signups WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def record(self, key: str, row: dict, status: str, **fields) -> None:
+        """Insert or update the entry for ``key`` with a new status (committed immediately).
+
+        ``customer_id`` and ``user_id`` are kept when a later step does not repeat them.
+        """
+        values = {
+            "key": key,
+            "line": row.get("line"),
+            "username": row["username"],
+            "status": status,
+            "customer_id": fields.get("customer_id"),
+            "user_id": fields.get("user_id"),
+            "error": fields.get("error"),
+            "updated_at": time.time(),
+        }
+        columns = ", ".join(values)
+        placeholders = ", ".join(f":{name}" for name in values)
+        updates = ", ".join(
+            f"{name} = COALESCE(excluded.{name}, {name})" if name in ("customer_id", "user_id") else f"{name} = excluded.{name}"
+            for name in values
+            if name != "key"
+        )
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO signups ({columns}) VALUES ({placeholders}) ON CONFLICT(key) DO UPDATE SET {updates}",
+                values,
+            )
+
+    def status_counts(self) -> dict[str, int]:
+        """Return the number of journal entries per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM signups GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
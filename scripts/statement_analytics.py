@@ -0,0 +1,383 @@
+"""Columnar statement analytics on NumPy arrays.
+
+Loads statement entries (from the API, the local statement store, or a
+``statement_export.py`` file) into a ``StatementFrame`` of parallel NumPy
+columns, then computes totals, net change, daily/monthly aggregates,
+per-type breakdowns and running-balance continuity checks with vectorised
+group-bys instead of per-row Python loops. Multi-account sets are handled in
+one frame, grouped by account.
+
+Amounts are held as int64 minor units (see ``money.py``) at the largest
+scale among the frame's currencies, so totals are exact and results come back
+as Decimals at each account's own currency scale. Each row is checked
+against the scale of its ``currencyCode`` from the payment currency list (or
+``--scale`` for every row); an amount with more decimals is refused, never
+rounded. Parquet ``decimal128`` columns are read straight into scaled
+integers. Entries without a running balance are left out of the continuity
+check rather than counted as breaks.
+
+Requires:
+    uv pip install numpy            # pyarrow too, for Parquet input
+
+Usage:
+    python scripts/statement_analytics.py export.jsonl
+    python scripts/statement_analytics.py export.parquet --by month
+    python scripts/statement_analytics.py export.csv --by type --json
+    python scripts/statement_analytics.py wkyc.jsonl --scale 8   # no currency list lookup
+"""
+
+import argparse
+import csv
+import json
+import sys
+from collections.abc import Iterable
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import requests
+
+from money import DEFAULT_SCALE, format_amount, from_minor, parse_amount, quantize
+
+GROUPINGS = ("day", "month", "type")
+
+
+class StatementFrame:
+    """Statement entries as parallel NumPy columns.
+
+    ``accounts`` and ``types`` hold the distinct labels; ``account_codes`` and
+    ``type_codes`` index into them row by row. ``debit``, ``credit`` and
+    ``running_balance`` are int64 minor units at ``scale`` decimal places;
+    ``has_balance`` marks the rows that carry a running balance, and
+    ``account_scales`` is the currency scale of each account.
+    """
+
+    __slots__ = (
+        "scale",
+        "accounts",
+        "account_codes",
+        "account_scales",
+        "times",
+        "types",
+        "type_codes",
+        "debit",
+        "credit",
+        "running_balance",
+        "has_balance",
+    )
+
+    def __init__(
+        self,
+        account_ids: Iterable[str],
+        times: Iterable[str],
+        types: Iterable[str],
+        debit: np.ndarray,
+        credit: np.ndarray,
+        running_balance: np.ndarray,
+        has_balance: np.ndarray | None = None,
+        scale: int = DEFAULT_SCALE,
+        account_scales: dict[str, int] | None = None,
+    ) -> None:
+        self.scale = scale
+        self.accounts, self.account_codes = np.unique(np.asarray(account_ids, dtype=str), return_inverse=True)
+        self.account_scales = np.array([(account_scales or {}).get(str(account), scale) for account in self.accounts], dtype=np.int64)
+        self.types, self.type_codes = np.unique(np.asarray(types, dtype=str), return_inverse=True)
+        # Truncating to 19 chars drops the API's 7-digit fraction, which NumPy cannot parse.
+        self.times = np.asarray(times, dtype="U19").astype("datetime64[s]")
+        self.debit = np.asarray(debit, dtype=np.int64)
+        self.credit = np.asarray(credit, dtype=np.int64)
+        self.running_balance = np.asarray(running_balance, dtype=np.int64)
+        self.has_balance = np.ones(len(self.debit), dtype=bool) if has_balance is None else np.asarray(has_balance, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.debit)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict], account_id: str = "", scale: int | None = None, currency_scales: dict[str, int] | None = None) -> "StatementFrame":
+        """Build a frame from API-shaped entry dicts (``accountId`` and ``currencyCode`` optional per row).
+
+        Every amount is checked against ``scale``, or else the scale of the
+        row's currency in ``currency_scales`` (``DEFAULT_SCALE`` when absent).
+        Raises ValueError for an amount with more decimals than that.
+        """
+        account_ids, times, types, amounts, has_balance = [], [], [], [], []
+        account_scales: dict[str, int] = {}
+        for row in rows:
+            account = row.get("accountId") or account_id
+            row_scale = scale if scale is not None else (currency_scales or {}).get(row.get("currencyCode"), DEFAULT_SCALE)
+            account_scales.setdefault(account, row_scale)
+            running = row.get("runningBalance")
+            account_ids.append(account)
+            times.append(row.get("transactionTime") or "")
+            types.append(row.get("transactionType") or "")
+            has_balance.append(running not in (None, ""))
+            try:
+                amounts.append(tuple(parse_amount(value, row_scale) for value in (row.get("debitAmount"), row.get("creditAmount"), running)))
+            except ValueError as exc:
+                raise ValueError(f"{exc} (account {account}, currency {row.get('currencyCode') or 'unknown'})") from None
+
+        frame_scale = max(account_scales.values(), default=DEFAULT_SCALE if scale is None else scale)
+        columns = [np.fromiter((int(amount.scaleb(frame_scale)) for amount in column), dtype=np.int64, count=len(amounts)) for column in zip(*amounts)]
+        if not columns:
+            columns = [np.empty(0, dtype=np.int64)] * 3
+        return cls(account_ids, times, types, *columns, has_balance, scale=frame_scale, account_scales=account_scales)
+
+    @classmethod
+    def from_statement(cls, data: dict) -> "StatementFrame":
+        """Build a frame from one ``/CustomerAccountStatement`` response."""
+        info = data.get("accountInfo") or {}
+        scale = info.get("accountCurrencyScale")
+        return cls.from_rows(data.get("entries") or [], info.get("accountId") or "", DEFAULT_SCALE if scale is None else scale)
+
+    def totals(self) -> list[dict]:
+        """Total debits, credits, net change and entry count per account."""
+        size = len(self.accounts)
+        debit = _group_sum(self.account_codes, self.debit, size)
+        credit = _group_sum(self.account_codes, self.credit, size)
+        count = np.bincount(self.account_codes, minlength=size)
+        return [self._result(account, None, None, d, c, n) for account, d, c, n in zip(range(size), debit, credit, count)]
+
+    def aggregate(self, by: str) -> list[dict]:
+        """Debit/credit/net/count per account and day, month or transaction type."""
+        if by == "type":
+            period_codes = self.type_codes.astype(np.int64)
+            labels = self.types
+            mask = np.ones(len(self), dtype=bool)
+        else:
+            unit = "D" if by == "day" else "M"
+            mask = ~np.isnat(self.times)
+            period_codes = self.times[mask].astype(f"datetime64[{unit}]").astype(np.int64)
+            labels = None
+
+        accounts = self.account_codes[mask].astype(np.int64)
+        if len(accounts) == 0:
+            return []
+
+        base = period_codes.min()
+        span = period_codes.max() - base + 1
+        keys, inverse = np.unique(accounts * span + (period_codes - base), return_inverse=True)
+        debit = _group_sum(inverse, self.debit[mask], len(keys))
+        credit = _group_sum(inverse, self.credit[mask], len(keys))
+        count = np.bincount(inverse)
+
+        account_idx = keys // span
+        periods = keys % span + base
+        if labels is None:
+            unit = "D" if by == "day" else "M"
+            period_labels = periods.astype(f"datetime64[{unit}]").astype(str)
+        else:
+            period_labels = labels[periods]
+
+        return [self._result(a, by, str(p), d, c, n) for a, p, d, c, n in zip(account_idx, period_labels, debit, credit, count)]
+
+    def _result(self, account: int, by: str | None, label: str | None, debit: int, credit: int, count: int) -> dict:
+        # Every amount was checked against its account's scale, so quantizing to it is exact.
+        scale = int(self.account_scales[account])
+        result = {"accountId": str(self.accounts[account])}
+        if by is not None:
+            result[by] = label
+        result.update(
+            debit=quantize(from_minor(debit, self.scale), scale),
+            credit=quantize(from_minor(credit, self.scale), scale),
+            net=quantize(from_minor(credit - debit, self.scale), scale),
+            count=int(count),
+            scale=scale,
+        )
+        return result
+
+    def balance_breaks(self) -> np.ndarray:
+        """Row indices whose running balance does not follow from the previous entry.
+
+        Entries are ordered by account, then time, then original position; each
+        must satisfy ``running = previous running + credit - debit``. An entry
+        without a running balance is not checked, nor is the one after it.
+        """
+        if len(self) < 2:
+            return np.empty(0, dtype=np.int64)
+
+        order = np.lexsort((np.arange(len(self)), self.times, self.account_codes))
+        running = self.running_balance[order]
+        has_balance = self.has_balance[order]
+        expected = running[:-1] + self.credit[order][1:] - self.debit[order][1:]
+        same_account = self.account_codes[order][1:] == self.account_codes[order][:-1]
+        broken = same_account & has_balance[1:] & has_balance[:-1] & (running[1:] != expected)
+        return order[1:][broken]
+
+
+def _decimal_units(column) -> tuple[np.ndarray, np.ndarray]:
+    """Unscaled int64 values and validity of a pyarrow ``decimal128`` column, read from its buffers.
+
+    A decimal128 is a little-endian 128-bit integer at the column's scale;
+    while it fits in int64 its high word is the sign extension of the low one.
+    """
+    units, valid = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=bool)]
+    for chunk in column.chunks:
+        words = np.frombuffer(chunk.buffers()[1], dtype="<i8")[2 * chunk.offset : 2 * (chunk.offset + len(chunk))]
+        low, high = words[0::2], words[1::2]
+        present = chunk.is_valid().to_numpy(zero_copy_only=False)
+        if np.any(present & (high != low >> 63)):
+            raise ValueError(f"amount out of range for int64 minor units in {column.type}")
+        units.append(np.where(present, low, 0))
+        valid.append(present)
+    return np.concatenate(units), np.concatenate(valid)
+
+
+def _group_sum(codes: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """Exact int64 sum of ``values`` per group code (bincount would go through float64)."""
+    totals = np.zeros(size, dtype=np.int64)
+    if len(values) == 0:
+        return totals
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    totals[sorted_codes[starts]] = np.add.reduceat(values[order], starts)
+    return totals
+
+
+def load_file(path: Path, scale: int | None = None, currency_scales: dict[str, int] | None = None) -> StatementFrame:
+    """Load a ``statement_export.py`` output file (CSV, JSONL or Parquet).
+
+    Amounts are checked as in ``StatementFrame.from_rows``; raises ValueError
+    for one with more decimals than its currency (or ``scale``) allows.
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        return _load_parquet(path, scale, currency_scales)
+
+    with open(path, encoding="utf-8", newline="") as handle:
+        if suffix in (".jsonl", ".ndjson"):
+            rows = (json.loads(line, parse_float=Decimal) for line in handle if line.strip())
+        else:
+            rows = csv.DictReader(handle)
+        return StatementFrame.from_rows(rows, scale=scale, currency_scales=currency_scales)
+
+
+def _load_parquet(path: Path, scale: int | None, currency_scales: dict[str, int] | None) -> StatementFrame:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Error: Parquet input requires pyarrow (uv pip install pyarrow).", file=sys.stderr)
+        sys.exit(1)
+    labels = ["accountId", "currencyCode", "transactionTime", "transactionType"]
+    if "currencyCode" not in pq.read_schema(path).names:
+        labels.remove("currencyCode")  # exports from before currency codes were added
+    table = pq.read_table(path, columns=[*labels, "debitAmount", "creditAmount", "runningBalance"])
+    columns = {name: np.where(col == None, "", col) for name, col in ((name, table.column(name).to_numpy(zero_copy_only=False)) for name in labels)}  # noqa: E711 - elementwise
+    account_ids, times, types = columns["accountId"], columns["transactionTime"], columns["transactionType"]
+    currencies = columns.get("currencyCode", np.full(table.num_rows, ""))
+
+    row_scales = np.array([scale if scale is not None else (currency_scales or {}).get(code, DEFAULT_SCALE) for code in currencies], dtype=np.int64)
+    frame_scale = int(row_scales.max()) if len(row_scales) else DEFAULT_SCALE if scale is None else scale
+    amounts = []
+    for name in ("debitAmount", "creditAmount", "runningBalance"):
+        column = table.column(name)
+        if pa.types.is_decimal128(column.type):
+            amounts.append(_rescale(name, *_decimal_units(column), column.type.scale, row_scales, frame_scale))
+        else:
+            # Older exports wrote float64 amounts: check each against its row's scale.
+            values = column.to_pylist()
+            units = [int(parse_amount(value, int(places)).scaleb(frame_scale)) for value, places in zip(values, row_scales)]
+            amounts.append((np.array(units, dtype=np.int64), np.array([value is not None for value in values], dtype=bool)))
+
+    (debit, _), (credit, _), (running, has_balance) = amounts
+    account_scales = dict(zip(account_ids.tolist(), row_scales.tolist()))
+    return StatementFrame(account_ids, times, types, debit, credit, running, has_balance, scale=frame_scale, account_scales=account_scales)
+
+
+def _rescale(name: str, units: np.ndarray, present: np.ndarray, places: int, row_scales: np.ndarray, scale: int) -> tuple[np.ndarray, np.ndarray]:
+    """Decimal units at ``places`` -> units at ``scale``, refusing values finer than their row's scale."""
+    step = 10 ** np.maximum(places - row_scales, 0)
+    bad = np.flatnonzero(present & (units % step != 0))
+    if len(bad):
+        row = int(bad[0])
+        raise ValueError(f"{name} {from_minor(int(units[row]), places)} (row {row + 1}) has more than {row_scales[row]} decimal place(s)")
+    if places >= scale:
+        return units // 10 ** (places - scale), present
+    return units * 10 ** (scale - places), present
+
+
+def _has_currency_codes(path: Path) -> bool:
+    """Whether an export file has a ``currencyCode`` column (checked on its header or first record)."""
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return False  # load_file reports the missing dependency
+        return "currencyCode" in pq.read_schema(path).names
+    with open(path, encoding="utf-8", newline="") as handle:
+        if suffix in (".jsonl", ".ndjson"):
+            first = next((line for line in handle if line.strip()), "{}")
+            return "currencyCode" in json.loads(first)
+        return "currencyCode" in (csv.DictReader(handle).fieldnames or [])
+
+
+def payment_scales() -> dict[str, int]:
+    """Amount scale of every payment currency (logging in; the list is cached by ``reference_data``)."""
+    from api_client import authenticate
+    from reference_data import amount_scales, payment_currencies
+
+    token, _customer_id = authenticate()
+    return amount_scales(payment_currencies(token))
+
+
+def print_table(rows: list[dict], label: str | None = None) -> None:
+    """Print totals (no label) or grouped aggregates (label = grouping key)."""
+    group_header = f"{label.title():<18}" if label else ""
+    print(f"\n{'Account':<38}{group_header}{'Debits':>16}{'Credits':>16}{'Net':>16}{'Entries':>9}")
+    print("-" * (95 + len(group_header)))
+    for row in rows:
+        group = f"{row[label]:<18}" if label else ""
+        print(
+            f"{row['accountId']:<38}{group}{format_amount(row['debit'], row['scale']):>16}{format_amount(row['credit'], row['scale']):>16}"
+            f"{format_amount(row['net'], row['scale']):>16}{row['count']:>9,}"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Summarise exported statement entries.")
+    parser.add_argument("input", type=Path, help="CSV, JSONL or Parquet file from statement_export.py")
+    parser.add_argument("--by", choices=GROUPINGS, help="Also aggregate per day, month or transaction type")
+    parser.add_argument("--scale", type=int, help="Decimal places for every account (default: each currency's, from the payment currency list)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.input.is_file():
+        print(f"Error: Input file not found: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        # Only a file with currency codes needs the list; --scale skips the login altogether.
+        currency_scales = payment_scales() if args.scale is None and _has_currency_codes(args.input) else None
+        frame = load_file(args.input, args.scale, currency_scales)
+    except requests.RequestException as exc:
+        print(f"Error: Cannot fetch the payment currency list ({exc}); pass --scale.", file=sys.stderr)
+        sys.exit(1)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    totals = frame.totals()
+    grouped = frame.aggregate(args.by) if args.by else None
+    breaks = frame.balance_breaks()
+
+    if args.json:
+        print(json.dumps({"totals": totals, "groups": grouped, "balanceBreaks": breaks.tolist()}, indent=2, default=str))
+        return
+
+    print(f"\n=== STATEMENT ANALYTICS ({len(frame):,} entries, {len(frame.accounts)} account(s)) ===")
+    print_table(totals)
+    if grouped is not None:
+        print_table(grouped, args.by)
+
+    if len(breaks):
+        print(f"\nRunning balance breaks: {len(breaks):,} (first rows: {', '.join(map(str, breaks[:10]))})")
+    else:
+        print("\nRunning balance continuity: OK")
+
+
+if __name__ == "__main__":
+    main()
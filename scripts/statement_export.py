@@ -0,0 +1,224 @@
+"""Export account statements for long date ranges to CSV, JSONL or Parquet.
+
+Non-interactive counterpart to ``account_statement.py``. The range is split
+into date windows that are fetched concurrently and written out in date
+order as they arrive, so memory use depends on the worker count, not on the
+length of the range. Each window is a small request, which also keeps
+busy accounts well under the per-request timeout.
+
+Usage:
+    python scripts/statement_export.py --account USD --start 2025-01-01 --end 2025-12-31
+    python scripts/statement_export.py --account all --start 2025-01-01 --end 2025-12-31 --format jsonl -o all.jsonl
+    python scripts/statement_export.py --account <accountId> --start 2025-01-01 --end 2025-03-31 --format parquet
+
+``--account`` accepts an account ID, account number, currency code, or
+``all``. Parquet output requires ``pyarrow`` (``uv pip install pyarrow``);
+its amount columns are exact decimals at the largest scale of the exported
+currencies.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+
+import requests
+
+from account_statement import fetch_statement, find_account
+from api_client import REQUEST_TIMEOUT, authenticate, configure_session, get_balances
+from concurrency import bounded_map
+from money import DEFAULT_SCALE, quantize
+from reference_data import amount_scales, payment_currencies
+
+ENTRY_FIELDS = [
+    "accountId",
+    "accountNumber",
+    "currencyCode",
+    "transactionTime",
+    "transactionType",
+    "description",
+    "debitAmount",
+    "creditAmount",
+    "runningBalance",
+]
+
+AMOUNT_FIELDS = ENTRY_FIELDS[6:]
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+# Digits of the Parquet decimal amount columns (the most decimal128 holds)
+AMOUNT_PRECISION = 38
+
+
+def date_windows(start_date: datetime, end_date: datetime, window_days: int) -> Iterator[tuple[datetime, datetime]]:
+    """Split an inclusive date range into consecutive, non-overlapping inclusive windows."""
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=window_days - 1), end_date)
+        yield window_start, window_end
+        window_start = window_end + timedelta(days=1)
+
+
+def resolve_accounts(balances: list[dict], selector: str) -> list[dict]:
+    """Pick accounts by ID, account number or currency code; ``all`` selects every account."""
+    if selector.lower() == "all":
+        return balances
+    account = find_account(balances, selector)
+    return [account] if account is not None else []
+
+
+def export_scale(token: str, accounts: list[dict]) -> int:
+    """Largest amount scale among the accounts' currencies (``DEFAULT_SCALE`` for unknown ones)."""
+    try:
+        scales = amount_scales(payment_currencies(token))
+    except requests.RequestException:
+        scales = {}
+    return max(scales.get(account.get("currencyCode"), DEFAULT_SCALE) for account in accounts)
+
+
+def fetch_window(task: tuple[dict, datetime, datetime], token: str, timeout: float) -> list[dict]:
+    """Fetch one account/window and return its entries flattened to ENTRY_FIELDS rows."""
+    account, window_start, window_end = task
+    data = fetch_statement(token, account.get("accountId"), window_start, window_end, timeout=timeout)
+
+    account_fields = {
+        "accountId": account.get("accountId"),
+        "accountNumber": account.get("accountNumber"),
+        "currencyCode": account.get("currencyCode"),
+    }
+    return [{**account_fields, **{name: entry.get(name) for name in ENTRY_FIELDS[3:]}} for entry in data.get("entries") or []]
+
+
+class CsvSink:
+    def __init__(self, path: Path, fields: list[str] = ENTRY_FIELDS) -> None:
+        self._handle = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._handle, fieldnames=fields, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, rows: list[dict]) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+class JsonlSink:
+    def __init__(self, path: Path) -> None:
+        self._handle = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: list[dict]) -> None:
+        self._handle.writelines(json.dumps(row) + "\n" for row in rows)
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+class ParquetSink:
+    """Writes one Parquet row group per window, so nothing accumulates in memory.
+
+    Amounts are stored as ``decimal128`` at ``scale``, so they stay exact.
+    """
+
+    def __init__(self, path: Path, scale: int = DEFAULT_SCALE) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("Error: Parquet output requires pyarrow (uv pip install pyarrow).", file=sys.stderr)
+            sys.exit(1)
+
+        self._pa = pa
+        self._scale = scale
+        amount_type = pa.decimal128(AMOUNT_PRECISION, scale)
+        self._schema = pa.schema([(name, pa.string()) for name in ENTRY_FIELDS[:6]] + [(name, amount_type) for name in AMOUNT_FIELDS])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows: list[dict]) -> None:
+        if not rows:
+            return
+        scale = self._scale
+        rows = [{**row, **{name: None if row.get(name) is None else quantize(row[name], scale) for name in AMOUNT_FIELDS}} for row in rows]
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+SINKS = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink}
+
+
+def parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, use yyyy-MM-dd") from None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export account statements to CSV, JSONL or Parquet.")
+    parser.add_argument("--account", required=True, help="Account ID, account number, currency code, or 'all'")
+    parser.add_argument("--start", required=True, type=parse_date, help="Start date (yyyy-MM-dd, inclusive)")
+    parser.add_argument("--end", required=True, type=parse_date, help="End date (yyyy-MM-dd, inclusive)")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="Output format (default csv)")
+    parser.add_argument("-o", "--output", type=Path, help="Output file (default statement_<account>_<start>_<end>.<format>)")
+    parser.add_argument("--window-days", type=int, default=30, help="Days per request window (default 30)")
+    parser.add_argument("--workers", type=int, default=4, help="Windows fetched concurrently (default 4)")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Per-window request timeout in seconds")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.start > args.end:
+        print("Error: Start date cannot be after end date.", file=sys.stderr)
+        sys.exit(1)
+    if args.window_days < 1 or args.workers < 1:
+        print("Error: --window-days and --workers must be at least 1.", file=sys.stderr)
+        sys.exit(1)
+
+    configure_session(pool_size=args.workers)
+    token, customer_id = authenticate()
+
+    try:
+        accounts = resolve_accounts(get_balances(token, customer_id), args.account)
+    except requests.HTTPError as exc:
+        print(f"Failed to retrieve balances: {exc}", file=sys.stderr)
+        sys.exit(1)
+    if not accounts:
+        print(f"Error: No account matches {args.account!r}.", file=sys.stderr)
+        sys.exit(1)
+
+    output = args.output or Path(f"statement_{args.account}_{args.start:%Y%m%d}_{args.end:%Y%m%d}.{args.format}")
+    windows = list(date_windows(args.start, args.end, args.window_days))
+    tasks = ((account, window_start, window_end) for account in accounts for window_start, window_end in windows)
+
+    print(f"\n=== STATEMENT EXPORT ({args.format.upper()}) ===")
+    print(f"  Accounts: {', '.join(str(acc.get('currencyCode')) for acc in accounts)}")
+    print(f"  Period:   {args.start:%Y-%m-%d} to {args.end:%Y-%m-%d} ({len(windows)} window(s) per account)")
+    print(f"  Output:   {output}\n")
+
+    started = time.monotonic()
+    total_entries = 0
+    sink = ParquetSink(output, export_scale(token, accounts)) if args.format == "parquet" else SINKS[args.format](output)
+    try:
+        worker = partial(fetch_window, token=token, timeout=args.timeout)
+        for rows in bounded_map(worker, tasks, args.workers, ordered=True):
+            sink.write(rows)
+            total_entries += len(rows)
+    except requests.RequestException as exc:
+        print(f"Failed to retrieve statement window: {exc}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        sink.close()
+
+    print(f"Exported {total_entries:,} entries in {time.monotonic() - started:.1f}s.")
+    print("\n=== COMPLETE ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Local SQLite store of statement entries with incremental (delta) sync.
+
+Entries are indexed by (account ID, transaction time). For each account the
+store remembers the date range it has synced, so a later sync only fetches
+the days since the last run (plus any older days a query asks for that were
+never fetched), and range queries are answered from the local index.
+
+The last synced day is always re-fetched and replaced, because entries can
+still be posted to it after a sync.
+
+Amounts are stored as exact decimal text and read back as ``Decimal``.
+
+The store lives at ``~/.cache/mini-wallet/statements.db`` by default; set
+``WALLET_STATEMENT_DB`` to move it, or to an empty string to disable it (in
+which case ``account_statement.py`` fetches directly from the API).
+
+Usage:
+    python scripts/statement_store.py                      # sync all accounts, last 90 days
+    python scripts/statement_store.py --start 2025-01-01   # sync all accounts since a date
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import requests
+
+from account_statement import fetch_statement
+from api_client import authenticate, get_balances
+from concurrency import bounded_map
+from models import StatementResponse
+from money import to_decimal
+from statement_export import date_windows
+
+DEFAULT_DB_PATH = Path.home() / ".cache" / "mini-wallet" / "statements.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    account_id      TEXT PRIMARY KEY,
+    account_number  TEXT,
+    account_name    TEXT,
+    currency_code   TEXT,
+    currency_scale  INTEGER,
+    synced_from     TEXT,
+    synced_through  TEXT,
+    updated_at      REAL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    account_id        TEXT NOT NULL,
+    transaction_time  TEXT NOT NULL,
+    seq               INTEGER NOT NULL,
+    transaction_type  TEXT,
+    description       TEXT,
+    debit_amount      TEXT,
+    credit_amount     TEXT,
+    running_balance   TEXT,
+    PRIMARY KEY (account_id, transaction_time, seq)
+) WITHOUT ROWID;
+"""
+
+
+def _amount(value: object) -> str | None:
+    """An API amount as exact decimal text for storage (None stays None)."""
+    return None if value is None else str(to_decimal(value))
+
+
+def _day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def configured_db_path() -> Path | None:
+    """Store location from ``WALLET_STATEMENT_DB`` (None when disabled)."""
+    raw = os.environ.get("WALLET_STATEMENT_DB")
+    if raw is None:
+        return DEFAULT_DB_PATH
+    return Path(raw).expanduser() if raw.strip() else None
+
+
+class StatementStore:
+    """Statement entries for many accounts, synced incrementally from the API."""
+
+    def __init__(self, path: Path = DEFAULT_DB_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "StatementStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def synced_range(self, account_id: str) -> tuple[str, str] | None:
+        """Return the (from, through) dates already synced for an account, if any."""
+        row = self._conn.execute("SELECT synced_from, synced_through FROM accounts WHERE account_id = ?", (account_id,)).fetchone()
+        if row is None or row["synced_from"] is None:
+            return None
+        return row["synced_from"], row["synced_through"]
+
+    def missing_ranges(self, account_id: str, start_date: datetime, end_date: datetime) -> list[tuple[datetime, datetime]]:
+        """Date ranges that must be fetched so [start, end] is fully stored.
+
+        Ranges always adjoin the synced range, so it stays contiguous.
+        """
+        start_date, end_date = _day(start_date), _day(end_date)
+        synced = self.synced_range(account_id)
+        if synced is None:
+            return [(start_date, end_date)]
+
+        synced_from = datetime.strptime(synced[0], "%Y-%m-%d")
+        synced_through = datetime.strptime(synced[1], "%Y-%m-%d")
+        ranges = []
+        if start_date < synced_from:
+            ranges.append((start_date, synced_from - timedelta(days=1)))
+        if end_date >= synced_through:
+            # The last synced day is re-fetched: it may have gained entries since.
+            ranges.append((synced_through, end_date))
+        return ranges
+
+    def save_window(self, account: dict, window_start: datetime, window_end: datetime, data: StatementResponse) -> None:
+        """Replace the stored entries for one fetched window and extend the synced range."""
+        account_id = account.get("accountId")
+        info = data.get("accountInfo") or {}
+        first_day = window_start.strftime("%Y-%m-%d")
+        last_day = window_end.strftime("%Y-%m-%d")
+
+        rows = [
+            (
+                account_id,
+                entry.transactionTime or "",
+                seq,
+                entry.transactionType,
+                entry.description,
+                _amount(entry.debitAmount or 0),
+                _amount(entry.creditAmount or 0),
+                _amount(entry.runningBalance),
+            )
+            for seq, entry in enumerate(data.entries)
+        ]
+
+        with self._conn:
+            # Day-granular replace: "<= last_day~" covers every time on last_day.
+            self._conn.execute(
+                "DELETE FROM entries WHERE account_id = ? AND transaction_time >= ? AND transaction_time <= ?",
+                (account_id, first_day, f"{last_day}~"),
+            )
+            self._conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute(
+                """
+                INSERT INTO accounts VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(account_id) DO UPDATE SET
+                    account_number = COALESCE(excluded.account_number, account_number),
+                    account_name   = COALESCE(excluded.account_name, account_name),
+                    currency_code  = COALESCE(excluded.currency_code, currency_code),
+                    currency_scale = COALESCE(excluded.currency_scale, currency_scale),
+                    synced_from    = MIN(COALESCE(synced_from, excluded.synced_from), excluded.synced_from),
+                    synced_through = MAX(COALESCE(synced_through, excluded.synced_through), excluded.synced_through),
+                    updated_at     = excluded.updated_at
+                """,
+                (
+                    account_id,
+                    info.get("accountNumber") or account.get("accountNumber"),
+                    info.get("accountName"),
+                    info.get("accountCurrencyCode") or account.get("currencyCode"),
+                    info.get("accountCurrencyScale"),
+                    first_day,
+                    last_day,
+                    time.time(),
+                ),
+            )
+
+    def sync(
+        self,
+        token: str,
+        account: dict,
+        start_date: datetime,
+        end_date: datetime,
+        window_days: int = 30,
+        workers: int = 4,
+    ) -> int:
+        """Fetch whatever part of [start, end] is not stored yet. Returns the number of entries fetched."""
+        account_id = account.get("accountId")
+        synced = self.synced_range(account_id)
+        windows = []
+        for range_start, range_end in self.missing_ranges(account_id, start_date, end_date):
+            range_windows = list(date_windows(range_start, range_end, window_days))
+            if synced is not None and f"{range_end:%Y-%m-%d}" < synced[0]:
+                # Backfill newest-first so a failure midway leaves the synced range contiguous.
+                range_windows.reverse()
+            windows.extend(range_windows)
+
+        def fetch(window: tuple[datetime, datetime]) -> tuple[datetime, datetime, dict]:
+            return (*window, fetch_statement(token, account_id, *window))
+
+        fetched = 0
+        for window_start, window_end, data in bounded_map(fetch, windows, workers, ordered=True):
+            self.save_window(account, window_start, window_end, data)
+            fetched += len(data.entries)
+        return fetched
+
+    def query(self, account_id: str, start_date: datetime, end_date: datetime) -> StatementResponse:
+        """Return stored entries in [start, end] in the same shape as the statement API response."""
+        rows = self._conn.execute(
+            """
+            SELECT transaction_time, transaction_type, description, debit_amount, credit_amount, running_balance
+            FROM entries
+            WHERE account_id = ? AND transaction_time >= ? AND transaction_time <= ?
+            ORDER BY transaction_time, seq
+            """,
+            (account_id, start_date.strftime("%Y-%m-%d"), f"{end_date:%Y-%m-%d}~"),
+        ).fetchall()
+        entries = [
+            {
+                "transactionTime": row["transaction_time"],
+                "transactionType": row["transaction_type"],
+                "description": row["description"],
+                "debitAmount": to_decimal(row["debit_amount"]),
+                "creditAmount": to_decimal(row["credit_amount"]),
+                "runningBalance": None if row["running_balance"] is None else to_decimal(row["running_balance"]),
+            }
+            for row in rows
+        ]
+
+        account = self._conn.execute("SELECT * FROM accounts WHERE account_id = ?", (account_id,)).fetchone()
+        account_info = {}
+        if account is not None:
+            previous = self._conn.execute(
+                "SELECT running_balance FROM entries WHERE account_id = ? AND transaction_time < ? ORDER BY transaction_time DESC, seq DESC LIMIT 1",
+                (account_id, start_date.strftime("%Y-%m-%d")),
+            ).fetchone()
+            if previous is not None and previous["running_balance"] is not None:
+                beginning = to_decimal(previous["running_balance"])
+            elif entries and entries[0]["runningBalance"] is not None:
+                first = entries[0]
+                beginning = first["runningBalance"] - first["creditAmount"] + first["debitAmount"]
+            else:
+                beginning = None
+            account_info = {
+                "accountId": account_id,
+                "accountNumber": account["account_number"],
+                "accountName": account["account_name"],
+                "accountCurrencyCode": account["currency_code"],
+                "accountCurrencyScale": account["currency_scale"],
+                "beginningBalance": beginning,
+                "endingBalance": entries[-1]["runningBalance"] if entries else beginning,
+            }
+        return StatementResponse.from_dict({"accountInfo": account_info, "entries": entries})
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Incrementally sync statement entries for all accounts into the local store.")
+    parser.add_argument("--start", type=lambda value: datetime.strptime(value, "%Y-%m-%d"), help="Earliest date to sync (default 90 days ago)")
+    parser.add_argument("--db", type=Path, help="Store path (default WALLET_STATEMENT_DB or ~/.cache/mini-wallet/statements.db)")
+    parser.add_argument("--workers", type=int, default=4, help="Windows fetched concurrently per account (default 4)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    db_path = args.db or configured_db_path()
+    if db_path is None:
+        print("Error: Statement store disabled (WALLET_STATEMENT_DB is empty); pass --db.", file=sys.stderr)
+        sys.exit(1)
+
+    end_date = _day(datetime.now())
+    start_date = args.start or end_date - timedelta(days=90)
+
+    token, customer_id = authenticate()
+    try:
+        balances = get_balances(token, customer_id)
+    except requests.HTTPError as exc:
+        print(f"Failed to retrieve balances: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"\n=== SYNCING STATEMENTS INTO {db_path} ===")
+    with StatementStore(db_path) as store:
+        for account in balances:
+            try:
+                fetched = store.sync(token, account, start_date, end_date, workers=args.workers)
+            except requests.RequestException as exc:
+                print(f"  {account.get('currencyCode', 'N/A'):<8} failed: {exc}", file=sys.stderr)
+                continue
+            synced_from, synced_through = store.synced_range(account.get("accountId")) or ("-", "-")
+            print(f"  {account.get('currencyCode', 'N/A'):<8} {fetched:>8,} entries fetched (stored {synced_from} to {synced_through})")
+
+    print("\n=== COMPLETE ===")
+
+
+if __name__ == "__main__":
+    main()
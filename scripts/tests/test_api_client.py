@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api_client import TokenManager
+from token_cache import TokenCache
+
+
+class SlowLogin(TokenManager):
+    """TokenManager whose login takes ``delay`` seconds and is recorded instead of sent."""
+
+    def __init__(self, username: str, cache: TokenCache, calls: list, delay: float = 0.2) -> None:
+        super().__init__(username, "secret", cache=cache)
+        self.calls = calls
+        self.delay = delay
+
+    def _authenticate(self) -> dict:
+        started = time.monotonic()
+        time.sleep(self.delay)
+        self.calls.append((self.username, started, time.monotonic()))
+        tokens = {
+            "accessToken": f"token-{self.username}-{len(self.calls)}",
+            "refreshToken": "r",
+            "accessTokenExpiresInMinutes": 30,
+            "refreshTokenExpiresInHours": 1,
+        }
+        return {"tokens": tokens, "userSettings": {"organizationId": f"customer-{self.username}"}}
+
+
+def run_all(managers: list[TokenManager]) -> list[str]:
+    tokens = [None] * len(managers)
+
+    def get(index: int) -> None:
+        tokens[index] = managers[index].get_token()
+
+    threads = [threading.Thread(target=get, args=(index,)) for index in range(len(managers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return tokens
+
+
+def test_one_login_per_user_across_managers_sharing_the_cache(tmp_path):
+    calls = []
+    cache = TokenCache(tmp_path / "tokens.json")
+    tokens = run_all([SlowLogin("alice", cache, calls) for _ in range(4)])
+    assert len(calls) == 1
+    assert len(set(tokens)) == 1
+    assert TokenCache(tmp_path / "tokens.json").load(SlowLogin("alice", cache, calls)._key)["accessToken"] == tokens[0]
+
+
+def test_logins_of_different_users_overlap(tmp_path):
+    calls = []
+    cache = TokenCache(tmp_path / "tokens.json")
+    started = time.monotonic()
+    run_all([SlowLogin(f"user{n}", cache, calls) for n in range(6)])
+    elapsed = time.monotonic() - started
+    assert len(calls) == 6
+    # Six 0.2 s logins run together, not one after another (1.2 s).
+    assert elapsed < 0.6
+    assert max(start for _user, start, _end in calls) < min(end for _user, _start, end in calls)
+
+
+def test_async_client_only_leaves_the_event_loop_to_renew(tmp_path, monkeypatch):
+    pytest.importorskip("aiohttp")
+    import async_api_client
+
+    threaded = []
+
+    async def to_thread(func, *args):
+        threaded.append(func.__name__)
+        return func(*args)
+
+    monkeypatch.setattr(async_api_client.asyncio, "to_thread", to_thread)
+    manager = SlowLogin("alice", TokenCache(tmp_path / "tokens.json"), [], delay=0)
+    client = async_api_client.AsyncWalletClient(manager)
+
+    async def authenticate_three_times():
+        return [await client.authenticate() for _ in range(3)]
+
+    results = asyncio.run(authenticate_three_times())
+    assert threaded == ["get_token"]
+    assert len(set(results)) == 1 and results[0][1] == "customer-alice"
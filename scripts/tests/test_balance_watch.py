@@ -0,0 +1,109 @@
+import argparse
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+import balance_watch
+from balance_watch import BalanceTable, ChangeEmitter, WatchedCustomer, diff_balances, poll_customer, watch
+
+
+class BrokenLogin:
+    customer_id = "C1"
+
+    def get_token(self) -> str:
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+
+def customer() -> WatchedCustomer:
+    return WatchedCustomer(0, "Acme", "C1", BrokenLogin(), 5.0)
+
+
+def balance(account_id: str, amount: str, held: str = "0") -> dict:
+    return {
+        "accountId": account_id,
+        "accountNumber": f"N-{account_id}",
+        "currencyCode": "USD",
+        "balance": amount,
+        "balanceAvailable": amount,
+        "activeHoldsTotal": held,
+    }
+
+
+def test_first_poll_only_records_unless_initial_events_are_wanted():
+    table = BalanceTable()
+    assert diff_balances(customer(), [balance("A", "10.00")], table, emit_initial=False) == []
+    assert table.row("A") is not None
+
+    events = diff_balances(customer(), [balance("A", "10.00")], BalanceTable(), emit_initial=True)
+    assert [event["event"] for event in events] == ["snapshot"]
+
+
+def test_changes_additions_and_removals_are_emitted_once():
+    table = BalanceTable()
+    watched = customer()
+    diff_balances(watched, [balance("A", "10.00"), balance("B", "1.5")], table, emit_initial=False)
+
+    assert diff_balances(watched, [balance("A", "10.00"), balance("B", "1.50")], table, emit_initial=False) == []
+
+    events = diff_balances(watched, [balance("A", "12.25", held="2.25"), balance("C", "0.001")], table, emit_initial=False)
+    by_account = {event["accountId"]: event for event in events}
+    assert by_account["A"]["event"] == "changed"
+    assert by_account["A"]["balance"] == "12.25" and by_account["A"]["activeHoldsTotal"] == "2.25"
+    assert by_account["A"]["previous"]["balance"] == "10.00"
+    assert by_account["C"]["event"] == "added" and by_account["C"]["balance"] == "0.001"
+    assert by_account["B"]["event"] == "removed" and by_account["B"]["previous"]["balance"] == "1.50"
+    assert set(watched.accounts) == {"A", "C"}
+
+
+def test_removed_account_is_freed_and_added_again_when_it_returns():
+    table = BalanceTable()
+    watched = customer()
+    diff_balances(watched, [balance("A", "1"), balance("B", "2"), balance("C", "3")], table, emit_initial=False)
+
+    diff_balances(watched, [balance("B", "2"), balance("C", "3")], table, emit_initial=False)
+    assert len(table) == 2 and len(table.balances) == 2
+    assert table.row("A") is None and table.row("C") == (3_000_000, 3_000_000, 0)
+
+    events = diff_balances(watched, [balance("A", "5"), balance("B", "2"), balance("C", "3")], table, emit_initial=False)
+    assert [(event["event"], event["accountId"], event["balance"]) for event in events] == [("added", "A", "5.00")]
+    assert "previous" not in events[0]
+
+
+def test_slow_customer_does_not_hold_up_the_others(monkeypatch):
+    def poll(watched):
+        time.sleep(1.0 if watched.label == "slow" else 0.01)
+        return {"customer": watched, "status": "not_modified"}
+
+    monkeypatch.setattr(balance_watch, "poll_customer", poll)
+    slow, fast = WatchedCustomer(0, "slow", "C1", BrokenLogin(), 0.05), WatchedCustomer(1, "fast", "C2", BrokenLogin(), 0.05)
+    args = argparse.Namespace(min_interval=0.05, max_interval=0.05, backoff=1.0, workers=4, duration=0.6, emit_initial=False)
+    watch([slow, fast], BalanceTable(), ChangeEmitter(), args, time.monotonic())
+    assert slow.polls == 0
+    assert fast.polls >= 5
+
+
+def test_poll_failure_is_reported_not_raised():
+    result = poll_customer(customer())
+    assert result["status"] == "error"
+    assert "Expecting value" in result["error"]
+
+
+def test_client_that_stops_reading_is_dropped_without_blocking():
+    path = Path(tempfile.mkdtemp()) / "watch.sock"
+    emitter = ChangeEmitter(path)
+    reader = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        reader.connect(str(path))
+        deadline = time.monotonic() + 5
+        while not emitter._clients and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        for _ in range(2000):  # far more than a socket buffer holds
+            emitter.emit({"event": "changed", "padding": "x" * 1000})
+        assert time.monotonic() - started < 5
+        assert emitter._clients == []
+    finally:
+        reader.close()
+        emitter.close()
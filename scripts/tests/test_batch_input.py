@@ -0,0 +1,13 @@
+from batch_input import read_rows
+
+
+def test_csv_rows_carry_their_file_line(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text("to_customer,amount\nWPAY2,10\nWPAY3,11\n", encoding="utf-8")
+    assert list(read_rows(path)) == [{"to_customer": "WPAY2", "amount": "10", "line": 2}, {"to_customer": "WPAY3", "amount": "11", "line": 3}]
+
+
+def test_jsonl_skips_blank_lines(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    path.write_text('{"a": 1}\n\n{"a": 2}\n', encoding="utf-8")
+    assert list(read_rows(path)) == [{"a": 1, "line": 1}, {"a": 2, "line": 3}]
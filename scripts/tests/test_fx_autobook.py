@@ -0,0 +1,27 @@
+from decimal import Decimal
+
+import pytest
+
+from fx_autobook import validate_deal
+
+BUY = {"EUR": 2, "JPY": 0}
+SELL = {"USD": 2, "KWD": 3}
+
+
+def test_amount_is_checked_against_its_currency_scale():
+    deal = validate_deal({"buy_currency": "eur", "sell_currency": "KWD", "amount": "10.125", "amount_currency": "kwd"}, BUY, SELL)
+    assert deal["amount"] == Decimal("10.125") and deal["amount_currency"] == "KWD"
+
+    with pytest.raises(ValueError, match="more than 0 decimal place"):
+        validate_deal({"buy_currency": "JPY", "sell_currency": "USD", "amount": "1000.5"}, BUY, SELL)
+    with pytest.raises(ValueError, match="more than 2 decimal place"):
+        validate_deal({"buy_currency": "JPY", "sell_currency": "USD", "amount": "10.125", "amount_currency": "USD"}, BUY, SELL)
+
+
+def test_currencies_must_be_on_the_fx_lists():
+    with pytest.raises(ValueError, match="not available for buying"):
+        validate_deal({"buy_currency": "USD", "sell_currency": "KWD", "amount": "1"}, BUY, SELL)
+    with pytest.raises(ValueError, match="not available for selling"):
+        validate_deal({"buy_currency": "EUR", "sell_currency": "JPY", "amount": "1"}, BUY, SELL)
+    with pytest.raises(ValueError, match="positive"):
+        validate_deal({"buy_currency": "EUR", "sell_currency": "USD", "amount": "0"}, BUY, SELL)
@@ -0,0 +1,35 @@
+import math
+
+import pytest
+
+from fx_watch import RateHistory, parse_pair
+
+
+def test_history_keeps_the_latest_samples_in_order():
+    history = RateHistory("EURUSD", capacity=3)
+    for second, rate in enumerate([1.0, 2.0, 3.0, 4.0, 5.0]):
+        history.append(float(second), rate, 0.1)
+    assert len(history) == 3
+    assert history.latest() == (4.0, 5.0, 0.1)
+    assert list(history._window(history.rates)) == [3.0, 4.0, 5.0]
+    stats = history.stats()
+    assert (stats["min"], stats["max"], stats["mean"]) == (3.0, 5.0, 4.0)
+    assert stats["stdev"] == pytest.approx(math.sqrt(2 / 3))
+
+
+def test_stats_without_spreads_or_samples():
+    history = RateHistory("EURUSD", capacity=2)
+    assert history.stats() == {"symbol": "EURUSD", "samples": 0}
+    history.append(0.0, 1.1)
+    stats = history.stats()
+    assert stats["spread"] is None and stats["meanSpread"] is None
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        RateHistory("EURUSD", capacity=0)
+
+
+def test_parse_pair():
+    assert parse_pair("eur/usd") == ("EUR", "USD")
+    assert parse_pair("GBPJPY") == ("GBP", "JPY")
@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+import pytest
+
+from money import format_amount, from_minor, parse_amount, quantize, scale_of, sum_amounts, to_decimal, to_minor, to_wire
+
+
+def test_to_decimal_uses_the_shortest_float_repr():
+    assert to_decimal(0.1) == Decimal("0.1")
+    assert to_decimal(" 12.50 ") == Decimal("12.50")
+    assert to_decimal(None) == Decimal(0)
+    with pytest.raises(ValueError):
+        to_decimal("abc")
+    with pytest.raises(ValueError):
+        to_decimal("NaN")
+
+
+def test_quantize_rounds_half_up():
+    assert quantize("2.345") == Decimal("2.35")
+    assert quantize("-2.345") == Decimal("-2.35")
+    assert quantize("10.5", 0) == Decimal("11")
+
+
+def test_parse_amount_enforces_the_scale():
+    assert parse_amount("10", 2) == Decimal("10.00")
+    assert parse_amount("0.001", None) == Decimal("0.001")
+    with pytest.raises(ValueError):
+        parse_amount("0.001", 2)
+    with pytest.raises(ValueError):
+        parse_amount("10.5", 0)
+
+
+def test_minor_units_round_trip():
+    assert to_minor("12.34") == 1234
+    assert to_minor(0.1, 6) == 100_000
+    assert from_minor(1234) == Decimal("12.34")
+    assert from_minor(to_minor("1.005", 3), 3) == Decimal("1.005")
+
+
+def test_sum_amounts_is_exact():
+    assert sum_amounts([0.1] * 10) == Decimal("1.00")
+    assert sum_amounts(["0.1", "0.2"], 3) == Decimal("0.300")
+
+
+def test_format_amount():
+    assert format_amount("1234567.5") == "1,234,567.50"
+    assert format_amount(1234, 0, grouping=False) == "1234"
+
+
+def test_to_wire_rejects_amounts_a_float_cannot_carry():
+    assert to_wire(Decimal("25.50")) == 25.5
+    with pytest.raises(ValueError):
+        to_wire(Decimal("1234567890123456.78"))
+
+
+def test_scale_of():
+    assert scale_of(Decimal("1.5")) == 2
+    assert scale_of(Decimal("1.125")) == 3
+    assert scale_of(Decimal("1E+3"), 0) == 0
@@ -0,0 +1,89 @@
+import threading
+import time
+from decimal import Decimal
+
+from payment_journal import CLAIM_TIMEOUT, PaymentJournal, number_occurrences, payment_key
+
+
+def payout(line: int, to_customer: str = "WPAY2", amount: str = "10.00", reference: str = "") -> dict:
+    return {"line": line, "to_customer": to_customer, "amount": Decimal(amount), "currency": "USD", "reference": reference}
+
+
+def test_payment_key_keeps_payouts_sharing_a_reference_apart():
+    rows = [payout(2, "WPAY2", reference="payroll-oct"), payout(3, "WPAY3", reference="payroll-oct"), payout(4, "WPAY2", "12.00", reference="payroll-oct")]
+    assert len({payment_key(row) for row in rows}) == 3
+
+
+def test_payment_key_is_stable_and_includes_the_reference():
+    assert payment_key(payout(2)) == payment_key(payout(9))
+    assert payment_key(payout(2)) != payment_key(payout(2, reference="inv-1"))
+    assert payment_key(payout(2)) != payment_key(payout(2, amount="10.01"))
+    assert payment_key({"to_customer": "WPAY2", "amount": "10", "currency": "usd"}) == payment_key(payout(2))
+    assert payment_key({**payout(2), "key": "batch-7/1"}) == "key:batch-7/1"
+
+
+def test_identical_rows_are_distinct_payments():
+    rows = list(number_occurrences([payout(2), payout(3), payout(4, "WPAY3")]))
+    assert [row["occurrence"] for row in rows] == [1, 2, 1]
+    assert len({payment_key(row) for row in rows}) == 3
+
+
+def test_editing_the_file_does_not_resend_posted_payments(tmp_path):
+    original = [payout(2, "alice"), payout(3, "bob"), payout(4, "carol"), payout(5, "bob")]
+    edited = [payout(2, "zoe"), payout(3, "carol"), payout(4, "bob"), payout(5, "alice"), payout(6, "bob"), payout(7, "bob")]
+    with PaymentJournal(tmp_path / "journal.db") as journal:
+        for row in number_occurrences(original):
+            key = payment_key(row)
+            assert journal.claim_create(key, row) is None
+            journal.record(key, row, "posted", payment_id=f"p-{row['line']}")
+
+        to_send = [row["to_customer"] for row in number_occurrences(edited) if journal.claim_create(payment_key(row), row) is None]
+    # Only the new payee and the third payment to bob go out; the four posted ones are recognised.
+    assert to_send == ["zoe", "bob"]
+
+
+def test_claim_create_is_granted_once(tmp_path):
+    with PaymentJournal(tmp_path / "journal.db") as journal:
+        row = payout(2)
+        key = payment_key(row)
+        assert journal.claim_create(key, row) is None
+        entry = journal.claim_create(key, row)
+        assert entry is not None and entry["status"] == "creating"
+
+
+def test_claim_create_is_granted_once_across_threads(tmp_path):
+    row = payout(2)
+    key = payment_key(row)
+    winners = []
+    with PaymentJournal(tmp_path / "journal.db") as journal:
+        threads = [threading.Thread(target=lambda: winners.append(journal.claim_create(key, row) is None)) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert winners.count(True) == 1
+
+
+def test_failed_or_stale_create_can_be_claimed_again(tmp_path):
+    with PaymentJournal(tmp_path / "journal.db") as journal:
+        failed, stale = payout(2), payout(3, "WPAY3")
+        journal.record(payment_key(failed), failed, "create_failed", error="boom")
+        journal.claim_create(payment_key(stale), stale)
+        journal._conn.execute("UPDATE payments SET updated_at = ? WHERE key = ?", (time.time() - CLAIM_TIMEOUT - 1, payment_key(stale)))
+        assert journal.claim_create(payment_key(failed), failed) is None
+        assert journal.claim_create(payment_key(stale), stale) is None
+
+
+def test_claim_post_only_for_created_payments(tmp_path):
+    with PaymentJournal(tmp_path / "journal.db") as journal:
+        row = payout(2)
+        key = payment_key(row)
+        journal.claim_create(key, row)
+        assert not journal.claim_post(key)
+        journal.record(key, row, "created", payment_id="p-1", timestamp="t")
+        assert journal.claim_post(key)
+        assert not journal.claim_post(key)
+        assert [entry["key"] for entry in journal.pending_posts()] == [key]
+        journal.record(key, row, "posted")
+        assert not journal.claim_post(key)
+        assert list(journal.pending_posts()) == []
@@ -0,0 +1,44 @@
+import json
+
+import reference_data
+from api_client import TokenManager
+from reference_data import ReferenceDataCache
+from token_cache import TokenCache
+
+
+class Response:
+    status_code = 200
+    headers: dict = {}
+
+    def __init__(self, body: dict) -> None:
+        self.content = json.dumps(body).encode()
+
+
+def logged_in(username: str, cache: TokenCache) -> str:
+    manager = TokenManager(username, "secret", cache=cache)
+    manager._adopt({"accessToken": f"token-{username}", "refreshToken": "r", "expiresAt": 2e9, "refreshExpiresAt": 2e9, "customerId": username})
+    return manager.get_token()
+
+
+def test_each_login_has_its_own_entries(tmp_path, monkeypatch):
+    lists = {"token-alice": ["USD"], "token-bob": ["USD", "JPY"]}
+    sent = []
+
+    def api_request(method, path, token, **kwargs):
+        sent.append(token)
+        return Response({"currencies": [{"currencyCode": code} for code in lists[token]]})
+
+    monkeypatch.setattr(reference_data, "api_request", api_request)
+    tokens = TokenCache(tmp_path / "tokens.json")
+    alice, bob = logged_in("alice", tokens), logged_in("bob", tokens)
+    cache = ReferenceDataCache(tmp_path / "reference.json")
+
+    assert len(cache.get(alice, "/PaymentCurrencyList")["currencies"]) == 1
+    assert len(cache.get(bob, "/PaymentCurrencyList")["currencies"]) == 2
+    assert len(cache.get(alice, "/PaymentCurrencyList")["currencies"]) == 1
+    assert sent == [alice, bob]
+
+    # A fresh process reads both entries back from disk.
+    reloaded = ReferenceDataCache(tmp_path / "reference.json")
+    assert len(reloaded.get(bob, "/PaymentCurrencyList")["currencies"]) == 2
+    assert sent == [alice, bob]
@@ -0,0 +1,46 @@
+import csv
+
+import pytest
+
+from batch_payment import LEDGER_FIELDS
+from shard_runner import merge_ledgers, shard_of
+
+
+def test_shard_of_is_stable_and_ignores_case_and_spacing():
+    assert shard_of("WPAY123", 4) == shard_of(" wpay123 ", 4)
+    assert all(0 <= shard_of(f"customer-{n}", 4) < 4 for n in range(100))
+    # crc32, not the per-process salted hash(): the value must never change.
+    assert shard_of("WPAY123", 1000) == 513
+    assert shard_of(None, 3) == shard_of("", 3)
+
+
+def write_part(path, lines):
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=LEDGER_FIELDS)
+        for line in lines:
+            writer.writerow({"line": line, "to_customer": f"c{line}", "status": "posted"})
+    return {"part": str(path)}
+
+
+def test_merge_ledgers_restores_input_line_order(tmp_path):
+    results = [write_part(tmp_path / "a", [2, 5, 11]), write_part(tmp_path / "b", [3, 4, 10]), write_part(tmp_path / "c", [])]
+    ledger = tmp_path / "ledger.csv"
+    merge_ledgers(results, ledger)
+    with open(ledger, encoding="utf-8", newline="") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row["line"] for row in rows] == ["2", "3", "4", "5", "10", "11"]
+    assert rows[0]["to_customer"] == "c2" and rows[-1]["status"] == "posted"
+
+
+def test_merged_results_are_appended_to_an_existing_ledger(tmp_path):
+    ledger = tmp_path / "ledger.csv"
+    merge_ledgers([write_part(tmp_path / "a", [2, 3])], ledger)
+    merge_ledgers([write_part(tmp_path / "b", [4])], ledger)
+    with open(ledger, encoding="utf-8", newline="") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row["line"] for row in rows] == ["2", "3", "4"]
+
+    other = tmp_path / "other.csv"
+    other.write_text("line,status\n1,posted\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="not a payment ledger"):
+        merge_ledgers([write_part(tmp_path / "c", [5])], other)
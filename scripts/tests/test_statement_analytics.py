@@ -0,0 +1,122 @@
+from decimal import Decimal
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from statement_analytics import StatementFrame  # noqa: E402
+
+ROWS = [
+    {
+        "accountId": "a-1",
+        "transactionTime": "2025-01-01T10:00:00.0000000",
+        "transactionType": "Payment",
+        "debitAmount": 0.1,
+        "creditAmount": 0,
+        "runningBalance": 99.9,
+    },
+    {
+        "accountId": "a-1",
+        "transactionTime": "2025-01-01T11:00:00.0000000",
+        "transactionType": "FX",
+        "debitAmount": 0,
+        "creditAmount": 0.2,
+        "runningBalance": 100.1,
+    },
+    {
+        "accountId": "a-1",
+        "transactionTime": "2025-02-03T09:00:00.0000000",
+        "transactionType": "Payment",
+        "debitAmount": 0.3,
+        "creditAmount": 0,
+        "runningBalance": 99.8,
+    },
+    {
+        "accountId": "a-2",
+        "transactionTime": "2025-01-05T09:00:00.0000000",
+        "transactionType": "Payment",
+        "debitAmount": 0,
+        "creditAmount": 5,
+        "runningBalance": 5,
+    },
+]
+
+
+def test_totals_are_exact():
+    totals = {row["accountId"]: row for row in StatementFrame.from_rows(ROWS).totals()}
+    assert totals["a-1"]["debit"] == Decimal("0.40")
+    assert totals["a-1"]["credit"] == Decimal("0.20")
+    assert totals["a-1"]["net"] == Decimal("-0.20")
+    assert totals["a-1"]["count"] == 3
+    assert totals["a-2"]["net"] == Decimal("5.00")
+
+
+def test_aggregate_by_month_and_type():
+    frame = StatementFrame.from_rows(ROWS)
+    months = {(row["accountId"], row["month"]): row["count"] for row in frame.aggregate("month")}
+    assert months == {("a-1", "2025-01"): 2, ("a-1", "2025-02"): 1, ("a-2", "2025-01"): 1}
+    types = {(row["accountId"], row["type"]): row["debit"] for row in frame.aggregate("type")}
+    assert types[("a-1", "Payment")] == Decimal("0.40")
+
+
+def test_balance_breaks():
+    assert len(StatementFrame.from_rows(ROWS).balance_breaks()) == 0
+    broken = [dict(row) for row in ROWS]
+    broken[2]["runningBalance"] = 99.7
+    assert list(StatementFrame.from_rows(broken).balance_breaks()) == [2]
+
+
+def test_missing_running_balance_is_not_a_break():
+    rows = [dict(row) for row in ROWS]
+    del rows[1]["runningBalance"]
+    frame = StatementFrame.from_rows(rows)
+    assert len(frame.balance_breaks()) == 0
+    assert frame.totals()[0]["credit"] == Decimal("0.20")
+
+
+MIXED = [
+    {"accountId": "kwd", "currencyCode": "KWD", "transactionTime": "2025-01-01T10:00:00", "debitAmount": "1.005", "runningBalance": "8.995"},
+    {"accountId": "kwd", "currencyCode": "KWD", "transactionTime": "2025-01-02T10:00:00", "creditAmount": "0.001", "runningBalance": "8.996"},
+    {"accountId": "jpy", "currencyCode": "JPY", "transactionTime": "2025-01-01T10:00:00", "creditAmount": "1500", "runningBalance": "1500"},
+    {"accountId": "usd", "currencyCode": "USD", "transactionTime": "2025-01-01T10:00:00", "debitAmount": "0.1", "runningBalance": "9.9"},
+]
+SCALES = {"KWD": 3, "JPY": 0, "USD": 2}
+
+
+def test_each_account_uses_its_currency_scale():
+    totals = {row["accountId"]: row for row in StatementFrame.from_rows(MIXED, currency_scales=SCALES).totals()}
+    assert totals["kwd"]["net"] == Decimal("-1.004") and totals["kwd"]["scale"] == 3
+    assert str(totals["jpy"]["credit"]) == "1500"
+    assert str(totals["usd"]["debit"]) == "0.10"
+
+
+def test_amount_finer_than_its_currency_is_refused():
+    with pytest.raises(ValueError, match="more than 2 decimal place"):
+        StatementFrame.from_rows(MIXED)  # no currency list: everything at the default scale
+    rows = [*MIXED, {**MIXED[2], "creditAmount": "0.5"}]
+    with pytest.raises(ValueError, match="more than 0 decimal place"):
+        StatementFrame.from_rows(rows, currency_scales=SCALES)
+
+
+def test_parquet_decimals_are_read_exactly(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    from statement_analytics import load_file
+
+    big = "12345678901234.567"  # more digits than a float64 holds
+    rows = [*MIXED, {**MIXED[0], "debitAmount": None, "creditAmount": big, "runningBalance": None, "transactionTime": "2025-01-03T10:00:00"}]
+    amount = pa.decimal128(38, 3)
+    columns = {name: pa.array([row.get(name) for row in rows], pa.string()) for name in ("accountId", "currencyCode", "transactionTime", "transactionType")}
+    for name in ("debitAmount", "creditAmount", "runningBalance"):
+        columns[name] = pa.array([None if row.get(name) is None else Decimal(row[name]) for row in rows], amount)
+    path = tmp_path / "statement.parquet"
+    pq.write_table(pa.table(columns), path)
+
+    frame = load_file(path, currency_scales=SCALES)
+    totals = {row["accountId"]: row for row in frame.totals()}
+    assert totals["kwd"]["credit"] == Decimal(big) + Decimal("0.001")
+    assert totals["jpy"]["credit"] == Decimal("1500")
+    assert len(frame.balance_breaks()) == 0
+
+    with pytest.raises(ValueError, match="more than 2 decimal place"):
+        load_file(path)
@@ -0,0 +1,41 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from statement_export import ENTRY_FIELDS, ParquetSink, date_windows, resolve_accounts
+
+BALANCES = [
+    {"accountId": "a-1", "accountNumber": "100000", "currencyCode": "EUR"},
+    {"accountId": "a-2", "accountNumber": "100001", "currencyCode": "USD"},
+]
+
+
+def test_date_windows_cover_the_range_without_overlap():
+    windows = list(date_windows(datetime(2025, 1, 1), datetime(2025, 1, 10), 4))
+    assert windows == [
+        (datetime(2025, 1, 1), datetime(2025, 1, 4)),
+        (datetime(2025, 1, 5), datetime(2025, 1, 8)),
+        (datetime(2025, 1, 9), datetime(2025, 1, 10)),
+    ]
+
+
+def test_resolve_accounts():
+    assert resolve_accounts(BALANCES, "all") == BALANCES
+    assert resolve_accounts(BALANCES, "usd") == [BALANCES[1]]
+    assert resolve_accounts(BALANCES, "100000") == [BALANCES[0]]
+    assert resolve_accounts(BALANCES, "JPY") == []
+
+
+def test_parquet_amounts_are_exact_decimals(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    row = dict.fromkeys(ENTRY_FIELDS, "x")
+    row.update(debitAmount=0.1, creditAmount=None, runningBalance=1234567890123.455)
+    sink = ParquetSink(tmp_path / "out.parquet", scale=3)
+    sink.write([row])
+    sink.close()
+
+    written = pq.read_table(tmp_path / "out.parquet").to_pylist()[0]
+    assert written["debitAmount"] == Decimal("0.100")
+    assert written["creditAmount"] is None
+    assert written["runningBalance"] == Decimal("1234567890123.455")
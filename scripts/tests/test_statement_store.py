@@ -0,0 +1,30 @@
+from datetime import datetime
+from decimal import Decimal
+
+from models import StatementResponse
+from statement_store import StatementStore
+
+ACCOUNT = {"accountId": "a-1", "accountNumber": "100000", "currencyCode": "USD"}
+
+
+def statement(*entries: tuple[str, float, float, float]) -> StatementResponse:
+    rows = [
+        {"transactionTime": time, "transactionType": "Payment", "description": "", "debitAmount": debit, "creditAmount": credit, "runningBalance": balance}
+        for time, debit, credit, balance in entries
+    ]
+    return StatementResponse.from_dict({"accountInfo": {"accountId": "a-1", "accountCurrencyScale": 2}, "entries": rows})
+
+
+def test_amounts_round_trip_exactly(tmp_path):
+    with StatementStore(tmp_path / "store.db") as store:
+        data = statement(("2025-01-01T10:00:00", 0, 0.1, 100.3), ("2025-01-02T10:00:00", 0.2, 0, 100.1))
+        store.save_window(ACCOUNT, datetime(2025, 1, 1), datetime(2025, 1, 2), data)
+
+        result = store.query("a-1", datetime(2025, 1, 1), datetime(2025, 1, 2))
+        entries = result.get("entries")
+        assert [entry.creditAmount for entry in entries] == [Decimal("0.1"), Decimal("0")]
+        assert result["accountInfo"]["beginningBalance"] == Decimal("100.2")
+        assert result["accountInfo"]["endingBalance"] == Decimal("100.1")
+
+        later = store.query("a-1", datetime(2025, 1, 2), datetime(2025, 1, 2))
+        assert later["accountInfo"]["beginningBalance"] == Decimal("100.3")
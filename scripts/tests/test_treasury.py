@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+from api_client import AuthenticationError
+from treasury import aggregate, fetch_customer
+
+
+class FailingLogin:
+    customer_id = None
+
+    def get_token(self) -> str:
+        raise AuthenticationError("Authentication failed for bad — no access token received.")
+
+
+def test_totals_use_each_currency_scale():
+    results = [
+        {"balances": [{"currencyCode": "JPY", "balance": 1000, "balanceAvailable": 1000, "activeHoldsTotal": 0}]},
+        {"balances": [{"currencyCode": "JPY", "balance": 2500, "balanceAvailable": 2000, "activeHoldsTotal": 500}]},
+        {"balances": [{"currencyCode": "KWD", "balance": 0.1, "balanceAvailable": 0.1, "activeHoldsTotal": 0}]},
+        {"balances": [{"currencyCode": "USD", "balance": 0.1, "balanceAvailable": 0.2, "activeHoldsTotal": 0}]},
+    ]
+    totals = aggregate(results, {"JPY": 0, "KWD": 3})
+    assert totals["JPY"]["balance"] == Decimal("3500") and str(totals["JPY"]["balance"]) == "3500"
+    assert totals["JPY"]["accounts"] == 2
+    assert str(totals["KWD"]["balance"]) == "0.100"
+    assert str(totals["USD"]["balanceAvailable"]) == "0.20"
+    assert list(totals) == ["JPY", "KWD", "USD"]
+
+
+def test_failed_login_is_that_customers_error():
+    result = fetch_customer({"line": 2, "username": "bad", "label": "Bad"}, {"bad": FailingLogin()})
+    assert result["balances"] == []
+    assert "Authentication failed" in result["error"]
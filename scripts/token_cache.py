@@ -0,0 +1,111 @@
+"""On-disk token cache shared by every script and process on this machine.
+
+Tokens are stored as JSON keyed by ``"<base_url>|<username>"`` so several
+logins (or environments) can share one file. A renewal runs under an
+exclusive file lock of its own key, so concurrent cron jobs never log in
+twice for the same user while logins of different users proceed in
+parallel; the shared file itself is locked only while an entry is written.
+
+Set ``WALLET_TOKEN_CACHE`` to change the cache path, or to an empty string
+to keep tokens in memory only.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "mini-wallet" / "tokens.json"
+
+
+def _usable_until(entry: dict) -> float:
+    return max(entry.get("expiresAt", 0), entry.get("refreshExpiresAt", 0))
+
+
+def _configured_path() -> Path | None:
+    raw = os.environ.get("WALLET_TOKEN_CACHE")
+    if raw is None:
+        return DEFAULT_CACHE_PATH
+    return Path(raw).expanduser() if raw.strip() else None
+
+
+class TokenCache:
+    """JSON token store guarded by an inter-process file lock."""
+
+    def __init__(self, path: Path | None = None, enabled: bool = True) -> None:
+        self.path = path if path is not None else _configured_path()
+        self.enabled = enabled and self.path is not None
+
+    @contextmanager
+    def locked(self, key: str) -> Iterator[None]:
+        """Hold an exclusive lock on ``key``'s entry for the duration of the block."""
+        if not self.enabled:
+            yield
+            return
+        digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+        with self._file_lock(self.path.with_suffix(f"{self.path.suffix}.{digest}.lock")):
+            yield
+
+    @staticmethod
+    @contextmanager
+    def _file_lock(lock_path: Path) -> Iterator[None]:
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read_all(self) -> dict[str, dict]:
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def load(self, key: str) -> dict | None:
+        """Return the cached entry for ``key`` unless both of its tokens have expired."""
+        if not self.enabled:
+            return None
+        entry = self._read_all().get(key)
+        if not entry or _usable_until(entry) <= time.time():
+            return None
+        return entry
+
+    def store(self, key: str, entry: dict) -> None:
+        """Write ``entry`` atomically, dropping any fully expired entries.
+
+        Other keys may be written concurrently, so the read-modify-write of the
+        file holds the file's own lock (only for as long as it takes).
+        """
+        if not self.enabled:
+            return
+        with self._file_lock(self.path.with_suffix(self.path.suffix + ".lock")):
+            now = time.time()
+            data = {k: v for k, v in self._read_all().items() if _usable_until(v) > now}
+            data[key] = entry
+
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump(data, handle)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
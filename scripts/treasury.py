@@ -0,0 +1,144 @@
+"""Fetch balances for many customers concurrently and aggregate them per currency.
+
+Each customer is either its own login (``username``/``password`` columns, one
+``TokenManager`` and cached token per login) or a customer ID reachable with
+the default credentials from ``.env`` (``customer_id`` column only). Balance
+calls run on a worker pool, so the whole fan-out takes about as long as the
+slowest single call rather than the sum of all of them. A login that fails
+is reported as that customer's error; the other customers still complete.
+
+Per-currency totals are shown at each currency's amount scale, from the
+payment currency list.
+
+Input file (CSV header or JSONL keys):
+    username, password   Login for this customer (optional)
+    customer_id          Customer ID (optional when a login is given)
+    label                Display name (optional)
+
+Usage:
+    python scripts/treasury.py customers.csv
+    python scripts/treasury.py customers.jsonl --workers 32 --json
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from functools import partial
+from pathlib import Path
+
+import requests
+
+from api_client import TokenManager, configure_session, fetch_balances, get_token_manager
+from batch_input import read_rows
+from concurrency import bounded_map
+from money import DEFAULT_SCALE, ZERO, format_amount, quantize, to_decimal
+from reference_data import amount_scales, payment_currencies
+
+AMOUNT_FIELDS = ("balance", "balanceAvailable", "activeHoldsTotal")
+
+
+def fetch_customer(row: dict, managers: dict[str, TokenManager]) -> dict:
+    """Fetch one customer's balances. Never raises; errors are reported in the result."""
+    label = row.get("label") or row.get("customer_id") or row.get("username") or f"line {row['line']}"
+    started = time.monotonic()
+    try:
+        manager = managers[row["username"]] if row.get("username") else get_token_manager()
+        customer_id = row.get("customer_id") or manager.customer_id
+        balances = fetch_balances(manager.get_token(), customer_id)
+    except (requests.RequestException, ValueError) as exc:  # including a failed login or a non-JSON body
+        return {"label": label, "customer_id": row.get("customer_id"), "balances": [], "error": str(exc), "seconds": time.monotonic() - started}
+
+    return {"label": label, "customer_id": customer_id, "balances": balances, "error": None, "seconds": time.monotonic() - started}
+
+
+def fetch_scales(rows: list[dict], managers: dict[str, TokenManager]) -> dict[str, int]:
+    """Amount scale per currency from the payment currency list, fetched with the first login that works."""
+    candidates = list(managers.values())
+    if any(not row.get("username") for row in rows):
+        candidates.append(get_token_manager())
+    for manager in candidates:
+        try:
+            return amount_scales(payment_currencies(manager.get_token()))
+        except (requests.RequestException, ValueError):
+            continue
+    return {}
+
+
+def aggregate(results: list[dict], scales: dict[str, int] | None = None) -> dict[str, dict]:
+    """Sum balance, available and held amounts (exactly, as Decimals) per currency across all customers.
+
+    Totals are quantized to each currency's scale (``DEFAULT_SCALE`` when it is not in ``scales``).
+    """
+    totals: dict[str, dict] = defaultdict(lambda: {"balance": ZERO, "balanceAvailable": ZERO, "activeHoldsTotal": ZERO, "accounts": 0})
+    for result in results:
+        for bal in result["balances"]:
+            total = totals[bal.get("currencyCode", "N/A")]
+            for name in AMOUNT_FIELDS:
+                total[name] += to_decimal(bal.get(name))
+            total["accounts"] += 1
+    for currency, total in totals.items():
+        scale = (scales or {}).get(currency, DEFAULT_SCALE)
+        total.update({name: quantize(total[name], scale) for name in AMOUNT_FIELDS}, scale=scale)
+    return dict(sorted(totals.items()))
+
+
+def report(results: list[dict], elapsed: float, as_json: bool = False, scales: dict[str, int] | None = None) -> int:
+    """Print per-customer results and per-currency totals. Returns the number of failed customers."""
+    totals = aggregate(results, scales)
+    failed = [result for result in results if result["error"]]
+
+    if as_json:
+        print(json.dumps({"customers": results, "totals": totals, "seconds": elapsed}, indent=2, default=str))
+        return len(failed)
+
+    print(f"\n=== TREASURY VIEW ({len(results)} customer(s)) ===")
+    print(f"\n{'Customer':<40}{'Accounts':>10}{'Seconds':>10}  Status")
+    print("-" * 70)
+    for result in sorted(results, key=lambda r: str(r["label"])):
+        status = f"error: {result['error']}" if result["error"] else "ok"
+        print(f"{str(result['label']):<40}{len(result['balances']):>10}{result['seconds']:>10.2f}  {status}")
+
+    print(f"\n{'Currency':<12}{'Accounts':>10}{'Available':>18}{'Reserved':>18}{'Total':>18}")
+    print("-" * 76)
+    for currency, total in totals.items():
+        print(
+            f"{currency:<12}{total['accounts']:>10}{format_amount(total['balanceAvailable'], total['scale']):>18}"
+            f"{format_amount(total['activeHoldsTotal'], total['scale']):>18}{format_amount(total['balance'], total['scale']):>18}"
+        )
+
+    slowest = max((result["seconds"] for result in results), default=0)
+    print(f"\nCompleted in {elapsed:.2f}s (slowest call {slowest:.2f}s, sum of calls {sum(r['seconds'] for r in results):.2f}s).")
+    if failed:
+        print(f"{len(failed)} customer(s) failed.", file=sys.stderr)
+    return len(failed)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Aggregate balances across many customers.")
+    parser.add_argument("input", type=Path, help="CSV or JSONL file of customers/credentials")
+    parser.add_argument("--workers", type=int, default=16, help="Balance calls in flight at once (default 16)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.input.is_file():
+        print(f"Error: Input file not found: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    rows = list(read_rows(args.input))
+    # One manager per login, shared by every row that uses it.
+    managers = {row["username"]: TokenManager(row["username"], row.get("password") or "") for row in rows if row.get("username")}
+
+    configure_session(pool_size=args.workers)
+    started = time.monotonic()
+    results = list(bounded_map(partial(fetch_customer, managers=managers), rows, args.workers))
+    elapsed = time.monotonic() - started
+    sys.exit(1 if report(results, elapsed, args.json, fetch_scales(rows, managers)) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Unified, non-interactive wallet command line.
+
+One entry point for the single-purpose scripts, with every input given as an
+option instead of a prompt:
+
+    login                       Full login; show user settings
+    balances                    Account balances
+    statement                   Statement of one account (--account, --days or --from/--to)
+    currencies                  Payment currencies
+    fx-currencies               FX buy/sell currencies
+    fx-deal                     Quote an FX deal; --book books it
+    pay                         Create and post an instant payment
+
+Modules are imported only when a command needs them, so ``--help`` and
+argument errors return without loading ``requests``. ``batch`` and ``shell``
+run many commands in this one process: ``.env`` is read once, the login is
+reused (and refreshed) across commands, and every request goes over the same
+pooled session. A failing command does not end a shell; in a batch it stops
+the run unless ``--keep-going`` is given.
+
+Batch input holds one command per line, quoted like a shell command line;
+blank lines and lines starting with ``#`` are skipped.
+
+``pay`` with a ``--reference`` goes through the payment journal (see
+``payment_journal.py``, default ``~/.cache/mini-wallet/payments.db``), so
+re-running the command, or a whole batch file after a failure, does not send
+a posted payment again and only posts one that was created but not posted.
+A ``pay`` without ``--reference`` is NOT retry-safe: every run sends a new
+payment.
+
+Usage:
+    python scripts/wallet.py balances
+    python scripts/wallet.py statement --account USD --days 30
+    python scripts/wallet.py fx-deal --buy EUR --sell USD --amount 1000 --amount-currency USD --book
+    python scripts/wallet.py pay --to WPAY123 --amount 25.50 --currency USD --reference INV-42 --memo "Invoice 42"
+    python scripts/wallet.py batch commands.txt --keep-going
+    printf 'balances\\ncurrencies\\n' | python scripts/wallet.py batch -
+    python scripts/wallet.py shell
+"""
+
+import argparse
+import shlex
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROMPT = "wallet> "
+
+PAY_JOURNAL = Path.home() / ".cache" / "mini-wallet" / "payments.db"
+
+
+def cmd_login(_args: argparse.Namespace) -> None:
+    import login
+
+    login.main()
+
+
+def cmd_balances(_args: argparse.Namespace) -> None:
+    import account_balances
+
+    account_balances.main()
+
+
+def cmd_currencies(_args: argparse.Namespace) -> None:
+    import currency_list
+
+    currency_list.main()
+
+
+def cmd_fx_currencies(_args: argparse.Namespace) -> None:
+    import fx_currency_list
+
+    fx_currency_list.main()
+
+
+def cmd_statement(args: argparse.Namespace) -> None:
+    import requests
+
+    from account_statement import find_account, show_statement
+    from api_client import authenticate, get_balances
+
+    end_date = args.end or datetime.now()
+    start_date = args.start or end_date - timedelta(days=args.days)
+    if start_date > end_date:
+        print("Error: Start date cannot be after end date.", file=sys.stderr)
+        sys.exit(1)
+
+    token, customer_id = authenticate()
+    try:
+        balances = get_balances(token, customer_id)
+    except requests.HTTPError as exc:
+        print(f"Failed to retrieve balances: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    account = find_account(balances, args.account)
+    if account is None:
+        available = ", ".join(str(bal.get("currencyCode")) for bal in balances)
+        print(f"Error: No account matches {args.account!r}. Accounts: {available}", file=sys.stderr)
+        sys.exit(1)
+    show_statement(token, account, start_date, end_date)
+
+
+def cmd_fx_deal(args: argparse.Namespace) -> None:
+    from api_client import authenticate
+    from fx_deal import book_quote, parse_deal, quote_deal
+    from reference_data import amount_scales, fx_currency_sides
+
+    token, _customer_id = authenticate()
+    buy_ccy, sell_ccy = args.buy.upper(), args.sell.upper()
+    amount_ccy = (args.amount_currency or buy_ccy).upper()
+    buy_currencies, sell_currencies = fx_currency_sides(token)
+    try:
+        amount = parse_deal(amount_scales(buy_currencies), amount_scales(sell_currencies), buy_ccy, sell_ccy, args.amount, amount_ccy)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    quote = quote_deal(token, buy_ccy, sell_ccy, amount, amount_ccy)
+    if not args.book:
+        print("\nQuote only; pass --book to book the deal.")
+        return
+    book_quote(token, quote.get("quoteId"))
+
+
+def cmd_pay(args: argparse.Namespace) -> None:
+    from api_client import authenticate
+    from instant_payment import payment_scale, send_payment
+    from money import parse_amount
+
+    token, _customer_id = authenticate()
+    currency = args.currency.upper()
+    try:
+        amount = parse_amount(args.amount, payment_scale(token, currency))
+        if amount <= 0:
+            raise ValueError("Amount must be a positive number.")
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    if not args.reference:
+        send_payment(token, args.to, amount, currency, args.reason, args.reference, args.memo)
+        return
+
+    from api_client import get_credentials
+    from batch_payment import process_payment
+    from money import format_amount, scale_of
+    from payment_journal import PaymentJournal
+
+    row = {"to_customer": args.to, "amount": amount, "currency": currency, "reason": args.reason, "reference": args.reference, "memo": args.memo}
+    args.journal.parent.mkdir(parents=True, exist_ok=True)
+    from_customer, _ = get_credentials()
+    with PaymentJournal(args.journal) as journal:
+        result = process_payment(row, token, from_customer, journal)
+
+    if result["status"] == "posted":
+        print(f"\nPayment of {format_amount(amount, scale_of(amount))} {currency} to {args.to} completed successfully.")
+        print(f"  Reference: {result['payment_reference']}")
+    elif result["status"] == "already_posted":
+        print(f"\nPayment {args.reference!r} was already posted (reference {result['payment_reference']}); not sent again.")
+    else:
+        print(f"Error: Payment {args.reference!r} {result['status'].replace('_', ' ')}: {result['error']}", file=sys.stderr)
+        sys.exit(1)
+
+
+def parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r} (expected yyyy-MM-dd)") from None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="wallet", description="Non-interactive wallet commands, singly or in batches over one session.")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    commands.add_parser("login", help="Log in and show user settings").set_defaults(func=cmd_login)
+    commands.add_parser("balances", help="Show account balances").set_defaults(func=cmd_balances)
+    commands.add_parser("currencies", help="List payment currencies").set_defaults(func=cmd_currencies)
+    commands.add_parser("fx-currencies", help="List FX buy and sell currencies").set_defaults(func=cmd_fx_currencies)
+
+    statement = commands.add_parser("statement", help="Show an account statement")
+    statement.add_argument("--account", required=True, help="Currency code, account number or account ID")
+    statement.add_argument("--days", type=int, default=30, help="Days back from today (default 30)")
+    statement.add_argument("--from", dest="start", type=parse_date, help="Start date (yyyy-MM-dd), overrides --days")
+    statement.add_argument("--to", dest="end", type=parse_date, help="End date (yyyy-MM-dd, default today)")
+    statement.set_defaults(func=cmd_statement)
+
+    fx_deal = commands.add_parser("fx-deal", help="Quote (and with --book, book) an FX deal")
+    fx_deal.add_argument("--buy", required=True, help="Currency to buy")
+    fx_deal.add_argument("--sell", required=True, help="Currency to sell")
+    fx_deal.add_argument("--amount", required=True, help="Deal amount")
+    fx_deal.add_argument("--amount-currency", help="Currency of --amount, the buy or sell currency (default buy)")
+    fx_deal.add_argument("--book", action="store_true", help="Book the quoted deal")
+    fx_deal.set_defaults(func=cmd_fx_deal)
+
+    pay = commands.add_parser("pay", help="Send an instant payment")
+    pay.add_argument("--to", required=True, help="Receiver PayID")
+    pay.add_argument("--amount", required=True, help="Payment amount")
+    pay.add_argument("--currency", default="USD", help="Currency (default USD)")
+    pay.add_argument("--reason", default="Instant Payment", help="Reason for payment")
+    pay.add_argument("--reference", default="", help="External reference; journals the payment so a re-run does not send it again")
+    pay.add_argument("--memo", default="", help="Memo")
+    pay.add_argument("--journal", type=Path, default=PAY_JOURNAL, help="Payment journal used with --reference (default ~/.cache/mini-wallet/payments.db)")
+    pay.set_defaults(func=cmd_pay)
+
+    batch = commands.add_parser("batch", help="Run commands from a file (or - for stdin) in this process")
+    batch.add_argument("file", nargs="?", default="-", help="Command file, one command per line (default stdin)")
+    batch.add_argument("--keep-going", action="store_true", help="Run the remaining commands after a failure")
+    batch.set_defaults(func=None)
+
+    commands.add_parser("shell", help="Read commands interactively in this process").set_defaults(func=None)
+    return parser
+
+
+def run_command(parser: argparse.ArgumentParser, argv: list[str]) -> int:
+    """Run one command line and return its exit status; failures do not end the process."""
+    try:
+        args = parser.parse_args(argv)
+        if args.func is None:
+            print(f"Error: {args.command} cannot be run from a batch or shell.", file=sys.stderr)
+            return 2
+        args.func(args)
+    except SystemExit as exc:
+        if exc.code is None or isinstance(exc.code, int):
+            return exc.code or 0
+        print(exc.code, file=sys.stderr)
+        return 1
+    except Exception as exc:  # one command's unexpected error must not end the batch
+        print(f"Error: {type(exc).__name__}: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        sys.stdout.flush()
+    return 0
+
+
+def run_lines(parser: argparse.ArgumentParser, lines, keep_going: bool = True, echo: bool = True) -> tuple[int, int]:
+    """Run each command line in turn. Returns (commands run, commands failed)."""
+    run = failed = 0
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line in ("exit", "quit"):
+            break
+        try:
+            argv = shlex.split(line)
+        except ValueError as exc:
+            print(f"Error: line {number}: {exc}", file=sys.stderr)
+            status = 2
+        else:
+            if echo:
+                print(f"\n>>> {line}")
+            status = run_command(parser, argv)
+        run += 1
+        if status:
+            failed += 1
+            if not keep_going:
+                print(f"Stopped at line {number} (exit status {status}).", file=sys.stderr)
+                break
+    return run, failed
+
+
+def shell_lines():
+    """Yield lines typed at the prompt until EOF."""
+    while True:
+        try:
+            yield input(PROMPT)
+        except EOFError:
+            print()
+            return
+        except KeyboardInterrupt:
+            print()
+
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if args.command == "shell":
+        print("Wallet shell: enter commands (help: -h, <command> -h); exit or Ctrl-D to leave.")
+        run_lines(parser, shell_lines(), echo=False)
+        return
+
+    if args.command != "batch":
+        args.func(args)
+        return
+
+    started = time.monotonic()
+    if args.file == "-":
+        run, failed = run_lines(parser, sys.stdin, keep_going=args.keep_going)
+    else:
+        try:
+            with open(args.file, encoding="utf-8") as handle:
+                run, failed = run_lines(parser, handle, keep_going=args.keep_going)
+        except OSError as exc:
+            print(f"Error: Cannot read {args.file}: {exc}", file=sys.stderr)
+            sys.exit(1)
+    print(f"\n{run} command(s) run, {failed} failed, in {time.monotonic() - started:.1f}s.", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()